@@ -1,17 +1,29 @@
 from django.contrib import admin
-from .models import BatteryType, Manufacturer, AlarmModel
+from common.admin import LargeTableAdmin
+from .models import BatteryType, Manufacturer, AlarmModel, InstalledAlarm
 
 @admin.register(BatteryType)
 class BatteryTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'life_span')
+    search_fields = ('name',)
 
 @admin.register(Manufacturer)
 class ManufacturerAdmin(admin.ModelAdmin):
     list_display = ('name', 'is_active')
+    search_fields = ('name',)
 
 @admin.register(AlarmModel)
 class AlarmModelAdmin(admin.ModelAdmin):
     list_display = ('manufacturer', 'name', 'battery_type', 'is_hardwired', 'is_wireless', 'is_active')
     list_filter = ('manufacturer', 'battery_type', 'is_hardwired', 'is_wireless', 'is_active')
+    list_select_related = ('manufacturer', 'battery_type')
+    autocomplete_fields = ('manufacturer', 'battery_type')
     search_fields = ('name', 'description', 'manufacturer__name')
 
+@admin.register(InstalledAlarm)
+class InstalledAlarmAdmin(LargeTableAdmin):
+    list_display = ('property', 'alarm_model', 'location', 'installed_on', 'battery_due', 'is_active')
+    # A date_hierarchy would scan every row for its year links; these are plain ranges
+    list_filter = ('is_active', 'battery_due')
+    list_select_related = ('property', 'alarm_model', 'alarm_model__manufacturer', 'alarm_model__battery_type')
+    autocomplete_fields = ('property', 'alarm_model')
@@ -0,0 +1,73 @@
+"""
+Battery replacement forecasting over installed alarms.
+"""
+from django.db import connection
+from django.db.models import Count, Min
+
+from .models import AlarmModel, BatteryType, InstalledAlarm
+
+
+def recompute_battery_due(battery_type_id=None, alarm_model_id=None):
+    """
+    Recompute battery_due for installations affected by a battery type or
+    alarm model change, in one UPDATE.
+    """
+    installed_table = InstalledAlarm._meta.db_table
+    model_table = AlarmModel._meta.db_table
+    battery_table = BatteryType._meta.db_table
+    conditions = []
+    params = []
+    if battery_type_id is not None:
+        conditions.append('bt.id = %s')
+        params.append(battery_type_id)
+    if alarm_model_id is not None:
+        conditions.append('am.id = %s')
+        params.append(alarm_model_id)
+    where = ' AND '.join(['ia.alarm_model_id = am.id', 'am.battery_type_id = bt.id'] + conditions)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {installed_table} ia
+            SET battery_due = (ia.installed_on + make_interval(years => bt.life_span))::date
+            FROM {model_table} am, {battery_table} bt
+            WHERE {where}
+              AND ia.battery_due IS DISTINCT FROM (ia.installed_on + make_interval(years => bt.life_span))::date
+            """,
+            params,
+        )
+        return cursor.rowcount
+
+
+def devices_due(due_from, due_to):
+    """Active installations whose battery falls due in [due_from, due_to]."""
+    return InstalledAlarm.objects.filter(is_active=True, battery_due__gte=due_from, battery_due__lte=due_to)
+
+
+def battery_forecast(due_from, due_to):
+    """
+    Devices due in the window grouped by suburb and agency, in one aggregate
+    query over the battery_due index.
+    """
+    groups = (
+        devices_due(due_from, due_to)
+        .values('property__suburb', 'property__state', 'property__agency_id', 'property__agency__name')
+        .annotate(
+            devices=Count('id'),
+            properties=Count('property_id', distinct=True),
+            earliest_due=Min('battery_due'),
+        )
+        .order_by('earliest_due', 'property__suburb', 'property__agency__name')
+    )
+    return [
+        {
+            'suburb': group['property__suburb'],
+            'state': group['property__state'],
+            'agency_id': group['property__agency_id'],
+            'agency': group['property__agency__name'] or 'Private',
+            'devices': group['devices'],
+            'properties': group['properties'],
+            'earliest_due': group['earliest_due'],
+        }
+        for group in groups
+    ]
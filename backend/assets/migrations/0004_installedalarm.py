@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:40
+
+import datetime
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0003_alter_alarmmodel_is_active_and_more'),
+        ('properties', '0015_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstalledAlarm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.CharField(default=uuid.uuid4, editable=False, max_length=100, unique=True)),
+                ('location', models.CharField(blank=True, max_length=100, null=True)),
+                ('installed_on', models.DateField(default=datetime.date.today)),
+                ('battery_due', models.DateField(editable=False)),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('alarm_model', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='installations', to='assets.alarmmodel')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installed_alarms', to='properties.property')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['battery_due'], name='installedalarm_due_active')],
+            },
+        ),
+    ]
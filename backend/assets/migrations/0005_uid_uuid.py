@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from common.uid_migration import convert_uid_to_uuid
+
+
+class Migration(migrations.Migration):
+    # The conversion commits batch by batch and builds indexes concurrently
+    atomic = False
+
+    dependencies = [
+        ('assets', '0004_installedalarm'),
+    ]
+
+    operations = [
+        convert_uid_to_uuid('assets', 'batterytype'),
+        convert_uid_to_uuid('assets', 'manufacturer'),
+        convert_uid_to_uuid('assets', 'alarmmodel'),
+        convert_uid_to_uuid('assets', 'installedalarm'),
+    ]
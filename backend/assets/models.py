@@ -1,8 +1,17 @@
 from django.db import models
+from datetime import date
 import uuid
 
+
+def add_years(start, years):
+    """`start` plus whole years; 29 February falls back to 28 February."""
+    try:
+        return start.replace(year=start.year + years)
+    except ValueError:
+        return start.replace(year=start.year + years, day=28)
+
 class BatteryType(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     life_span = models.IntegerField()
 
@@ -10,7 +19,7 @@ class BatteryType(models.Model):
         return f"{self.name} - {self.life_span} years"
 
 class Manufacturer(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
 
@@ -18,7 +27,7 @@ class Manufacturer(models.Model):
         return self.name
 
 class AlarmModel(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     manufacturer = models.ForeignKey(Manufacturer, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     description = models.TextField(max_length=1000)
@@ -39,4 +48,36 @@ class AlarmModel(models.Model):
         
         def save(self, *args, **kwargs):
             self.full_clean()
-            super().save(*args, **kwargs)
\ No newline at end of file
+            super().save(*args, **kwargs)
+
+class InstalledAlarm(models.Model):
+    """An alarm of a given model installed at a property."""
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
+    property = models.ForeignKey('properties.Property', on_delete=models.CASCADE, related_name='installed_alarms')
+    alarm_model = models.ForeignKey(AlarmModel, on_delete=models.PROTECT, related_name='installations')
+    location = models.CharField(max_length=100, null=True, blank=True)
+    installed_on = models.DateField(default=date.today)
+    # installed_on + the battery type's life span, kept up to date by save() and
+    # assets.forecast.recompute_battery_due so forecasts are a plain range scan
+    battery_due = models.DateField(editable=False)
+    is_active = models.BooleanField(default=True, verbose_name="Active")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['battery_due'],
+                name='installedalarm_due_active',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.alarm_model} @ {self.property_id} ({self.location or 'unspecified'})"
+
+    def save(self, *args, **kwargs):
+        life_span = BatteryType.objects.filter(alarmmodel=self.alarm_model_id).values_list('life_span', flat=True).get()
+        self.battery_due = add_years(self.installed_on, life_span)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'battery_due'}
+        super().save(*args, **kwargs)
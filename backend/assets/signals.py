@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .forecast import recompute_battery_due
+from .models import AlarmModel, BatteryType
+
+
+@receiver(post_init, sender=BatteryType)
+def remember_life_span(sender, instance, **kwargs):
+    instance._loaded_life_span = instance.__dict__.get('life_span')
+
+
+@receiver(post_save, sender=BatteryType)
+def battery_life_span_changed(sender, instance, created, **kwargs):
+    if not created and instance.life_span != instance._loaded_life_span:
+        transaction.on_commit(lambda: recompute_battery_due(battery_type_id=instance.pk))
+    instance._loaded_life_span = instance.life_span
+
+
+@receiver(post_init, sender=AlarmModel)
+def remember_battery_type(sender, instance, **kwargs):
+    instance._loaded_battery_type_id = instance.__dict__.get('battery_type_id')
+
+
+@receiver(post_save, sender=AlarmModel)
+def alarm_model_battery_changed(sender, instance, created, **kwargs):
+    if not created and instance.battery_type_id != instance._loaded_battery_type_id:
+        transaction.on_commit(lambda: recompute_battery_due(alarm_model_id=instance.pk))
+    instance._loaded_battery_type_id = instance.battery_type_id
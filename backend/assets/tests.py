@@ -1,3 +1,39 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.utils import timezone
+
+from common.testing import AUTH, QueryBudgetTestCase
+from properties.models import Property
+from .models import AlarmModel, BatteryType, InstalledAlarm, Manufacturer
+
+
+class QueryBudgetTests(QueryBudgetTestCase):
+    """Exact query counts for the assets endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        battery_type = BatteryType.objects.create(name='9V Lithium', life_span=1)
+        manufacturer = Manufacturer.objects.create(name='Clipsal')
+        alarm_model = AlarmModel.objects.create(name='755RL', manufacturer=manufacturer, battery_type=battery_type)
+        # Batteries due over the next couple of months
+        installed_on = timezone.localdate() - timedelta(days=360)
+        InstalledAlarm.objects.bulk_create([
+            InstalledAlarm(property=prop, alarm_model=alarm_model, installed_on=installed_on + timedelta(days=index),
+                           battery_due=installed_on + timedelta(days=365 + index))
+            for index, prop in enumerate(Property.objects.order_by('id')[:50])
+        ])
+
+    def test_battery_forecast(self):
+        cases = [({}, 2), ({'devices': 'true'}, 4)]
+        for params, budget in cases:
+            with self.subTest(**params):
+                for response in self.assertBudget(budget, '/api/assets/battery-forecast/', params):
+                    self.assertTrue(response.json()['groups'])
+
+    def test_invalid_dates(self):
+        for params in [{'from': '2025-02-30'}, {'to': '2025-13-01'}, {'from': 'soon'},
+                       {'from': '2025-03-01', 'to': '2025-02-01'}]:
+            with self.subTest(**params):
+                response = self.client.get('/api/assets/battery-forecast/', params, **AUTH)
+                self.assertEqual(response.status_code, 400)
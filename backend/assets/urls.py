@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('battery-forecast/', views.battery_forecast, name='battery_forecast'),
+]
@@ -1,3 +1,57 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+from backend.authentication import validate_kinde_token
+from common.pagination import CustomPageNumberPagination
+from .forecast import battery_forecast as build_battery_forecast, devices_due
+
+# Window used when `to` isn't given
+DEFAULT_FORECAST_DAYS = 90
+
+@api_view(['GET'])
+@validate_kinde_token
+def battery_forecast(request):
+    """
+    Installed alarms whose battery falls due between `from` and `to` (YYYY-MM-DD),
+    grouped by suburb and agency. Defaults to the next 90 days.
+
+    Pass `devices=true` to also get the matching devices, paginated and ordered
+    by suburb, agency and due date.
+    """
+    today = timezone.localdate()
+    due_from = request.query_params.get('from', None)
+    due_to = request.query_params.get('to', None)
+    try:
+        due_from = parse_date(due_from) if due_from else today
+        due_to = parse_date(due_to) if due_to else (due_from or today) + timedelta(days=DEFAULT_FORECAST_DAYS)
+    except ValueError:
+        # Well formed but impossible, like 2025-02-30
+        due_from = due_to = None
+    if not due_from or not due_to or due_from > due_to:
+        return Response({'error': 'from and to must be dates (YYYY-MM-DD) with from <= to'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    data = {
+        'from': due_from,
+        'to': due_to,
+        'groups': build_battery_forecast(due_from, due_to),
+    }
+
+    if request.query_params.get('devices', 'false').lower() == 'true':
+        devices = devices_due(due_from, due_to).order_by(
+            'property__suburb', 'property__agency__name', 'battery_due', 'id'
+        ).values(
+            'id', 'uid', 'location', 'installed_on', 'battery_due', 'property_id',
+            'property__unit_number', 'property__street_number', 'property__street_name',
+            'property__suburb', 'property__agency__name',
+            'alarm_model__name', 'alarm_model__manufacturer__name', 'alarm_model__battery_type__name',
+        )
+        paginator = CustomPageNumberPagination()
+        page = paginator.paginate_queryset(devices, request)
+        data['devices'] = paginator.get_paginated_response(page).data
+
+    return Response(data)
@@ -1,9 +1,98 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import IntegrityError
 import requests
 
+_acting_user = ContextVar('acting_user', default=None)
+
+def acting_user():
+    """The user whose request is being handled (see acting_as), or None."""
+    return _acting_user.get()
+
+@contextmanager
+def acting_as(user):
+    """Attribute writes made inside the block to `user`, e.g. in alarm history."""
+    token = _acting_user.set(user)
+    try:
+        yield user
+    finally:
+        _acting_user.reset(token)
+
+class KindeAuthError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+def kinde_user(token):
+    """
+    The Django user for a Kinde access token, created on first sight.
+
+    Raises KindeAuthError with the message and status to answer with.
+    """
+    try:
+        # Verify token with Kinde
+        response = requests.get(
+            f'{settings.KINDE_ISSUER_URL}/oauth2/v2/user_profile',
+            headers={'Authorization': f'Bearer {token}'},
+            timeout=10
+        )
+        
+        if response.status_code != 200:
+            raise KindeAuthError('Invalid token', status.HTTP_401_UNAUTHORIZED)
+        
+        user_data = response.json()
+        
+        # Get or create Django user based on Kinde user data
+        email = user_data.get('email')
+        if not email:
+            raise KindeAuthError('No email found in user profile', status.HTTP_400_BAD_REQUEST)
+        
+        # Try to get existing user by email
+        user = User.objects.filter(email=email).order_by('id').first()
+        if user is None:
+            # Create new user if doesn't exist
+            username = user_data.get('id', email.split('@')[0])
+            first_name = user_data.get('given_name', '')
+            last_name = user_data.get('family_name', '')
+            
+            # Ensure username is unique; a taken username with the same email
+            # means a concurrent first request just created this user
+            base_username = username
+            counter = 1
+            taken = User.objects.filter(username=username).first()
+            while taken is not None and taken.email != email:
+                username = f"{base_username}_{counter}"
+                counter += 1
+                taken = User.objects.filter(username=username).first()
+            
+            user = taken
+            if user is None:
+                try:
+                    user = User.objects.create_user(
+                        username=username,
+                        email=email,
+                        first_name=first_name,
+                        last_name=last_name,
+                        password=None  # No password for Kinde users
+                    )
+                except IntegrityError:
+                    user = User.objects.filter(email=email).order_by('id').first()
+                    if user is None:
+                        raise
+        return user
+            
+    except KindeAuthError:
+        raise
+    except requests.RequestException:
+        raise KindeAuthError('Failed to validate token', status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except Exception:
+        raise KindeAuthError('Authentication failed', status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 def validate_kinde_token(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
@@ -15,54 +104,13 @@ def validate_kinde_token(view_func):
         token = auth_header.split(' ')[1]
         
         try:
-            # Verify token with Kinde
-            response = requests.get(
-                'https://ghhs.kinde.com/oauth2/v2/user_profile',
-                headers={'Authorization': f'Bearer {token}'},
-                timeout=10
-            )
-            
-            if response.status_code != 200:
-                return Response({'error': 'Invalid token'}, status=status.HTTP_401_UNAUTHORIZED)
-            
-            user_data = response.json()
-            
-            # Get or create Django user based on Kinde user data
-            email = user_data.get('email')
-            if not email:
-                return Response({'error': 'No email found in user profile'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Try to get existing user by email
-            try:
-                user = User.objects.get(email=email)
-            except User.DoesNotExist:
-                # Create new user if doesn't exist
-                username = user_data.get('id', email.split('@')[0])
-                first_name = user_data.get('given_name', '')
-                last_name = user_data.get('family_name', '')
-                
-                # Ensure username is unique
-                base_username = username
-                counter = 1
-                while User.objects.filter(username=username).exists():
-                    username = f"{base_username}_{counter}"
-                    counter += 1
-                
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    first_name=first_name,
-                    last_name=last_name,
-                    password=None  # No password for Kinde users
-                )
-            
-            # Add the user to the request
-            request.user = user
+            user = kinde_user(token)
+        except KindeAuthError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        
+        # Add the user to the request; errors from the view itself are not authentication failures
+        request.user = user
+        with acting_as(user):
             return view_func(request, *args, **kwargs)
-                
-        except requests.RequestException:
-            return Response({'error': 'Failed to validate token'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except Exception as e:
-            return Response({'error': 'Authentication failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-    return wrapper 
\ No newline at end of file
+    return wrapper
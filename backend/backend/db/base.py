@@ -0,0 +1,119 @@
+"""
+PostgreSQL backend that rides out serverless cold starts.
+
+Neon suspends an idle compute. The first connection after that can be
+refused or time out while the compute starts, so get_new_connection retries
+connection errors up to CONNECT_RETRIES times with full-jitter exponential
+backoff (CONNECT_RETRY_BACKOFF seconds, doubling). Authentication and
+configuration errors fail at once. Both are top-level keys of the DATABASES
+entry.
+
+Everything else is the stock backend, including persistent connections
+(CONN_MAX_AGE with CONN_HEALTH_CHECKS) and psycopg 3's OPTIONS['pool'].
+`stats` counts connects, retries and health check failures in this process
+for the db metrics endpoint.
+"""
+import logging
+import random
+import threading
+import time
+
+from django.db.backends.postgresql import base
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_RETRIES = 4
+DEFAULT_CONNECT_RETRY_BACKOFF = 0.5
+
+# Messages of connect errors that waiting won't fix
+PERMANENT_ERRORS = (
+    'password authentication failed',
+    'no pg_hba.conf entry',
+    'does not exist',
+    'permission denied',
+    'invalid sslmode',
+    'invalid connection option',
+)
+
+
+def is_transient(error):
+    message = str(error).lower()
+    return not any(text in message for text in PERMANENT_ERRORS)
+
+
+class ConnectionStats:
+    """Counters for one process, shared by its threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.opened = 0
+            self.closed = 0
+            self.retries = 0
+            self.failures = 0
+            self.health_check_failures = 0
+            self.connect_seconds = 0.0
+            self.slowest_connect_seconds = 0.0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def connected(self, seconds):
+        with self.lock:
+            self.opened += 1
+            self.connect_seconds += seconds
+            self.slowest_connect_seconds = max(self.slowest_connect_seconds, seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'opened': self.opened,
+                'closed': self.closed,
+                'open': self.opened - self.closed,
+                'connect_retries': self.retries,
+                'connect_failures': self.failures,
+                'health_check_failures': self.health_check_failures,
+                'average_connect_ms': round(self.connect_seconds / self.opened * 1000, 1) if self.opened else None,
+                'slowest_connect_ms': round(self.slowest_connect_seconds * 1000, 1),
+            }
+
+
+stats = ConnectionStats()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        retries = self.settings_dict.get('CONNECT_RETRIES', DEFAULT_CONNECT_RETRIES)
+        backoff = self.settings_dict.get('CONNECT_RETRY_BACKOFF', DEFAULT_CONNECT_RETRY_BACKOFF)
+        for attempt in range(retries + 1):
+            started = time.monotonic()
+            try:
+                connection = super().get_new_connection(conn_params)
+            except base.Database.OperationalError as error:
+                if attempt == retries or not is_transient(error):
+                    stats.add(failures=1)
+                    raise
+                delay = random.uniform(0, backoff * 2 ** attempt)
+                stats.add(retries=1)
+                logger.warning(f'Connecting to {self.alias} failed (attempt {attempt + 1}), retrying in '
+                               f'{delay:.2f}s: {str(error).strip()}')
+                time.sleep(delay)
+            else:
+                stats.connected(time.monotonic() - started)
+                return connection
+
+    def is_usable(self):
+        usable = super().is_usable()
+        if not usable:
+            stats.add(health_check_failures=1)
+        return usable
+
+    def _close(self):
+        if self.connection is not None:
+            stats.add(closed=1)
+        return super()._close()
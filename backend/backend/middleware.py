@@ -1,7 +1,12 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from django.shortcuts import redirect
 from django.http import JsonResponse
+from urllib.parse import parse_qsl, urlencode
 import requests
 import json
+import threading
+import time
 
 class AdminLoginRedirectMiddleware:
     def __init__(self, get_response):
@@ -30,4 +35,38 @@ class AdminLoginRedirectMiddleware:
                 print("  ✗ No authentication found, redirecting to login")
                 return redirect('http://localhost:5173/signin')
         
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+def _loggable_query(query_string):
+    """The query string without `token`, which event streams accept in place of a header."""
+    if 'token=' not in query_string:
+        return query_string
+    return urlencode([(key, value) for key, value in parse_qsl(query_string, keep_blank_values=True) if key != 'token'])
+
+class RequestLogMiddleware:
+    """
+    Append every /api/ request to settings.REQUEST_LOG_PATH as one JSON line
+    (time, method, path, query string, status, duration) for replay with
+    `manage.py replay_requests`. Switched off unless the setting is set.
+    """
+    def __init__(self, get_response):
+        if not settings.REQUEST_LOG_PATH:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        started = time.time()
+        response = self.get_response(request)
+        if request.path.startswith('/api/'):
+            line = json.dumps({
+                'ts': round(started, 4),
+                'method': request.method,
+                'path': request.path,
+                'query': _loggable_query(request.META.get('QUERY_STRING', '')),
+                'status': response.status_code,
+                'ms': round((time.time() - started) * 1000, 2),
+            })
+            with self.lock, open(settings.REQUEST_LOG_PATH, 'a') as log:
+                log.write(line + '\n')
+        return response
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'properties',
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'backend.middleware.AdminLoginRedirectMiddleware',
+    'backend.middleware.RequestLogMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -78,24 +80,63 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+# The live update streams need ASGI; see DEPLOYMENT.md
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Worker processes serving the app, as uvicorn and gunicorn read it from the environment
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are kept for DB_CONN_MAX_AGE seconds and checked before reuse, so
+# requests don't each open a new TLS connection. backend.db retries connects
+# while a suspended Neon compute starts up; keep_db_warm stops it suspending.
+# With psycopg 3 installed, DB_POOL=true uses its connection pool instead of
+# persistent connections.
+DB_POOL = os.environ.get('DB_POOL', 'false').lower() == 'true'
+# Under ASGI (backend/asgi.py) sync code runs on executor threads, and a
+# persistent connection opened on one outlives the request that opened it, so
+# connections are closed after each request there unless DB_CONN_MAX_AGE says
+# otherwise; use DB_POOL for reuse. See DEPLOYMENT.md
+SERVER_INTERFACE = os.environ.get('DJANGO_SERVER_INTERFACE', 'wsgi')
+DEFAULT_CONN_MAX_AGE = 0 if SERVER_INTERFACE == 'asgi' else 600
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'neondb',
-        'USER': 'neondb_owner',
-        'PASSWORD': 'npg_fVIyZBP59HYb',
-        'HOST': 'ep-patient-bread-a7vjkfcx-pooler.ap-southeast-2.aws.neon.tech',
-        'PORT': '5432',
+        'ENGINE': os.environ.get('DB_ENGINE', 'backend.db'),
+        'NAME': os.environ.get('DB_NAME', 'neondb'),
+        'USER': os.environ.get('DB_USER', 'neondb_owner'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'npg_fVIyZBP59HYb'),
+        'HOST': os.environ.get('DB_HOST', 'ep-patient-bread-a7vjkfcx-pooler.ap-southeast-2.aws.neon.tech'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE)),
+        'CONN_HEALTH_CHECKS': True,
+        # The Neon pooler is PgBouncer in transaction mode: no cursors held across transactions
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 'true').lower() == 'true',
+        'CONNECT_RETRIES': int(os.environ.get('DB_CONNECT_RETRIES', 4)),
+        'CONNECT_RETRY_BACKOFF': float(os.environ.get('DB_CONNECT_RETRY_BACKOFF', 0.5)),
         'OPTIONS': {
-            'sslmode': 'require',
+            'sslmode': os.environ.get('DB_SSLMODE', 'require'),
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 10)),
+            # Notice connections dropped by the network or pooler within about a minute
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
         },
     }
 }
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
+# Seconds between keep_db_warm pings; Neon suspends after 5 idle minutes by default
+DB_KEEP_WARM_INTERVAL = int(os.environ.get('DB_KEEP_WARM_INTERVAL', 240))
 
 
 # Password validation
@@ -140,7 +181,8 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Kinde Configuration for Django Backend
-KINDE_ISSUER_URL = "https://ghhs.kinde.com"
+# Overridable so load tests can point token checks at a stub (see stub_identity_provider)
+KINDE_ISSUER_URL = os.environ.get('KINDE_ISSUER_URL', "https://ghhs.kinde.com")
 KINDE_CLIENT_ID = "8e219e4343ba4cd2b27ef9ab9f007d84"  # Your client ID from the docs
 KINDE_CLIENT_SECRET = os.environ.get('KINDE_CLIENT_SECRET')      
 KINDE_CALLBACK_URL = os.environ.get('KINDE_CALLBACK_URL')
@@ -203,4 +245,26 @@ REST_FRAMEWORK = {
 
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
-]
\ No newline at end of file
+]
+# How often (seconds) each worker checks whether its in-process typeahead
+# indexes are stale (see common/suggestions.py)
+SUGGESTION_INDEX_CHECK_INTERVAL = 5
+
+# Browser cache lifetime (seconds) for the reference data bundle (common/reference-data/)
+REFERENCE_DATA_MAX_AGE = 60 * 60
+
+# When set, every /api/ request is appended to this file as a JSON line so real
+# traffic can be replayed with `manage.py replay_requests`
+REQUEST_LOG_PATH = os.environ.get('REQUEST_LOG_PATH')
+
+# Carries live update events between server processes (see common/events.py).
+# LocalBackend suffices for a single process; with WEB_CONCURRENCY above one the
+# stream endpoint refuses to run on it. PostgresNotifyBackend needs a
+# direct (non-pooler) host for its LISTEN connection: on Neon, DB_HOST without
+# the `-pooler` suffix
+EVENT_BUS_BACKEND = os.environ.get('EVENT_BUS_BACKEND', 'common.events.LocalBackend')
+EVENT_BUS_LISTEN_HOST = os.environ.get('EVENT_BUS_LISTEN_HOST')
+
+# Where export_alarm_history writes (and restore_alarm_history reads) aged
+# alarm history; see maintenance/cold_storage.py
+ALARM_COLD_STORAGE_DIR = os.environ.get('ALARM_COLD_STORAGE_DIR', BASE_DIR / 'cold_storage')
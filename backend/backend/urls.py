@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import redirect
@@ -24,7 +25,7 @@ def admin_access(request):
         
         # Verify token with Kinde
         response = requests.get(
-            'https://ghhs.kinde.com/oauth2/v2/user_profile',
+            f'{settings.KINDE_ISSUER_URL}/oauth2/v2/user_profile',
             headers={'Authorization': f'Bearer {token}'},
             timeout=10
         )
@@ -85,4 +86,6 @@ urlpatterns = [
     path('api/beeping_alarms/', beeping_alarms, name='beeping_alarms'),
     path('api/maintenance/', include('maintenance.urls')),
     path('api/common/', include('common.urls')),
+    path('api/properties/', include('properties.urls')),
+    path('api/assets/', include('assets.urls')),
 ]
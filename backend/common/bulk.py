@@ -0,0 +1,66 @@
+"""
+Helpers for loading large amounts of rows quickly.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+from django.core.management.color import no_style
+from django.db import connection
+
+NULL = r'\N'
+
+
+def _csv_value(value):
+    if value is None:
+        return NULL
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def copy_rows(table, columns, rows):
+    """
+    Load `rows` (iterables matching `columns`) into `table` with COPY.
+
+    Values are written as CSV; None becomes NULL. Bypasses model save(),
+    signals and auto_now/auto_now_add, so callers must supply every
+    non-null column themselves.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        count += 1
+    if not count:
+        return 0
+    buffer.seek(0)
+
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            # psycopg2
+            raw_cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    return count
+
+
+def reset_sequences(*models):
+    """Move id sequences past rows inserted with explicit ids."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def max_id(model):
+    return model.objects.order_by('-id').values_list('id', flat=True).first() or 0
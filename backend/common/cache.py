@@ -0,0 +1,88 @@
+"""
+Versioned caching helpers.
+
+A dataset's version is a CacheGeneration row (common.generations), so every
+worker and process reads the same number whatever cache backend is
+configured; the default LocMemCache is private to each process. The version
+also carries the time of the last bump: a bump rolled back with its
+transaction hands the same number out again, which must not find the values
+cached for the first one. Values are
+cached under keys that include the version, and each worker also memoizes the
+last version it saw in process. Changing the data only means bumping the
+version (usually from a model signal); stale entries simply stop being read
+and expire on their own.
+"""
+import hashlib
+import threading
+
+from django.core.cache import cache
+
+from .generations import bump_generation
+from .models import CacheGeneration
+
+DATA_KEY_PREFIX = 'versioned'
+DATA_TIMEOUT = 60 * 60 * 24
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def get_version(name):
+    """Current version of a dataset (one primary-key lookup)."""
+    row = CacheGeneration.objects.filter(name=name).values_list('value', 'updated_at').first()
+    return f'{row[0]}.{row[1].timestamp():.6f}' if row else '0'
+
+
+def bump_version(name):
+    bump_generation(name)
+    return get_version(name)
+
+
+def get_versioned(name, builder, timeout=DATA_TIMEOUT):
+    """
+    Return (version, value) for a dataset, building it with `builder()` on a miss.
+
+    The steady state costs one query (the version); the value itself comes from
+    the in-process memo.
+    """
+    version = get_version(name)
+    memo = _local.get(name)
+    if memo is not None and memo[0] == version:
+        return memo
+
+    key = f'{DATA_KEY_PREFIX}:{name}:{version}'
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout)
+
+    with _local_lock:
+        _local[name] = (version, value)
+    return version, value
+
+
+def get_derived(name, key, builder, timeout=DATA_TIMEOUT, version=None):
+    """
+    A value worked out from dataset `name`, such as a row count for one filter,
+    cached under `key` until the dataset's version moves on. Pass `version` when
+    the caller has already read it.
+    """
+    if version is None:
+        version = get_version(name)
+    cache_key = f'{DATA_KEY_PREFIX}:{name}:{version}:{key}'
+    value = cache.get(cache_key)
+    if value is None:
+        value = builder()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+def make_etag(*parts):
+    """Strong ETag from the parts that determine a response body."""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in header.split(',')] or header.strip() == '*'
@@ -0,0 +1,37 @@
+"""
+Cached directory of active users, used by allocation dropdowns and typeahead.
+"""
+from django.contrib.auth.models import User
+
+from .cache import get_versioned
+from .serializer import UserSerializer
+
+USER_DIRECTORY = 'common.users'
+
+
+def _build_user_directory():
+    users = User.objects.filter(is_active=True).order_by('first_name')
+    return list(UserSerializer(users, many=True).data)
+
+
+def get_user_directory():
+    """Return (version, users) where users are serialized like UserSerializer."""
+    return get_versioned(USER_DIRECTORY, _build_user_directory)
+
+
+def filter_users(users, search):
+    """
+    Users with a name, username or email starting with every term in `search`.
+    """
+    terms = search.casefold().split()
+    if not terms:
+        return users
+
+    def matches(user):
+        values = [
+            (user.get(field) or '').casefold()
+            for field in ('first_name', 'last_name', 'username', 'email')
+        ]
+        return all(any(value.startswith(term) for value in values) for term in terms)
+
+    return [user for user in users if matches(user)]
@@ -0,0 +1,222 @@
+"""
+Publish/subscribe for live updates pushed to browsers.
+
+Publishers call publish(channel, data) from ordinary code, normally in
+transaction.on_commit. The configured backend (settings.EVENT_BUS_BACKEND)
+carries the event to every server process, where the bus hands it to each
+local subscriber's asyncio queue on that subscriber's event loop. Subscribers
+are cheap (a queue, no thread), so an ASGI worker can hold thousands.
+
+LocalBackend, the default, only reaches subscribers in the publishing
+process: fine for tests and single-worker deployments.
+PostgresNotifyBackend sends NOTIFY and runs one LISTEN thread per process.
+Streams are served only where they can work (stream_unavailable): under
+ASGI, and with a shared backend when settings.WEB_CONCURRENCY is above one.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Events a subscriber may fall behind by before it's told to resync
+SUBSCRIBER_QUEUE_SIZE = 1000
+# Neon's transaction-mode pooler hosts carry this in their endpoint name
+POOLER_HOST_MARKER = '-pooler'
+
+
+class Subscription:
+    """A subscriber's queue, owned by the event loop that subscribed."""
+
+    def __init__(self, bus, channel, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self.bus = bus
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_queue)
+        self.overflowed = False
+
+    def _put(self, data):
+        # Runs on the subscriber's loop
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def offer(self, data):
+        """Queue `data` from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, data)
+        except RuntimeError:
+            # The loop is gone; the stream will unsubscribe as it unwinds
+            pass
+
+    async def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, backend):
+        self.backend = backend
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Subscribe from inside a running event loop; close() the result when done."""
+        subscription = Subscription(self, channel)
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(subscription)
+        self.backend.start(self)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.get(subscription.channel, set()).discard(subscription)
+
+    def publish(self, channel, data):
+        self.backend.publish(self, channel, json.dumps(data, cls=DjangoJSONEncoder))
+
+    def deliver(self, channel, payload):
+        """Hand an event from the backend to this process's subscribers."""
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        if not subscribers:
+            return
+        data = json.loads(payload)
+        for subscription in subscribers:
+            subscription.offer(data)
+
+
+class LocalBackend:
+    """Delivers events to subscribers in this process only."""
+
+    def start(self, bus):
+        pass
+
+    def publish(self, bus, channel, payload):
+        bus.deliver(channel, payload)
+
+
+class PostgresNotifyBackend:
+    """
+    Carries events between processes with PostgreSQL NOTIFY/LISTEN.
+
+    The listener needs a session that stays on one server connection, so it
+    won't work through a transaction-mode pooler such as Neon's `-pooler`
+    endpoints. It connects to settings.EVENT_BUS_LISTEN_HOST (the database's
+    direct host) when that is set, and the backend refuses to start when it
+    would otherwise listen through a pooler. NOTIFY payloads are limited to
+    8000 bytes; bigger events are dropped with a warning.
+    """
+    PG_CHANNEL = 'ghhs_events'
+    MAX_PAYLOAD = 7900
+    POLL_SECONDS = 5
+    RECONNECT_SECONDS = 2
+
+    def __init__(self, database='default'):
+        self.database = database
+        self.thread = None
+        self.lock = threading.Lock()
+        host = self.listen_params().get('host') or ''
+        if POOLER_HOST_MARKER in host:
+            raise ImproperlyConfigured(
+                f"PostgresNotifyBackend can't LISTEN through the pooler at {host}; set EVENT_BUS_LISTEN_HOST to "
+                f"the direct host or use common.events.LocalBackend")
+
+    def listen_params(self):
+        """Connection parameters for the listener: the database's, on the direct host if one is set."""
+        params = connections[self.database].get_connection_params()
+        listen_host = getattr(settings, 'EVENT_BUS_LISTEN_HOST', None)
+        if listen_host:
+            params['host'] = listen_host
+        return params
+
+    def publish(self, bus, channel, payload):
+        message = json.dumps({'channel': channel, 'payload': payload})
+        if len(message) > self.MAX_PAYLOAD:
+            logger.warning(f'Dropped a {len(message)} byte event on {channel}: too large for NOTIFY')
+            return
+        with connections[self.database].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.PG_CHANNEL, message])
+
+    def start(self, bus):
+        # Only processes with subscribers listen
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._listen, args=(bus,), name='event-bus-listener',
+                                               daemon=True)
+                self.thread.start()
+
+    def _listen(self, bus):
+        while True:
+            raw = None
+            try:
+                raw = connections[self.database].Database.connect(**self.listen_params())
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.PG_CHANNEL}')
+                logger.info('Event bus listening')
+                while True:
+                    if select.select([raw], [], [], self.POLL_SECONDS) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        notify = raw.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        bus.deliver(message['channel'], message['payload'])
+            except Exception:
+                logger.exception('Event bus listener failed; reconnecting')
+                if raw is not None:
+                    raw.close()
+                time.sleep(self.RECONNECT_SECONDS)
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    """The process-wide bus for settings.EVENT_BUS_BACKEND."""
+    global _bus
+    backend_path = settings.EVENT_BUS_BACKEND
+    with _bus_lock:
+        if _bus is None or _bus.backend_path != backend_path:
+            _bus = EventBus(import_string(backend_path)())
+            _bus.backend_path = backend_path
+    return _bus
+
+
+def publish(channel, data):
+    get_event_bus().publish(channel, data)
+
+
+def stream_unavailable(request):
+    """
+    Why this process can't serve a live stream for `request`, or None.
+
+    Under WSGI an endless response holds a worker until the browser goes away.
+    With LocalBackend and more than one worker, a subscriber would only see
+    the events published by its own worker.
+    """
+    if not isinstance(request, ASGIRequest):
+        return 'Live updates need an ASGI server'
+    if isinstance(get_event_bus().backend, LocalBackend) and settings.WEB_CONCURRENCY > 1:
+        return (f'Live updates need a shared event bus with {settings.WEB_CONCURRENCY} workers; '
+                f'set EVENT_BUS_BACKEND to common.events.PostgresNotifyBackend')
+    return None
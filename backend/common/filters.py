@@ -1,6 +1,12 @@
-from django.db.models import Q
-from typing import List, Dict, Any, Optional
+import copy
+import hashlib
+from datetime import datetime, time
+from datetime import timezone as dt_timezone
+from django.db.models import Exists, OuterRef, Q
+from typing import List, Dict, Any, Hashable, Optional, Tuple
 from django.db.models.query import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 def apply_search_filter(queryset: QuerySet, 
                        search_term: Optional[str], 
@@ -92,4 +98,268 @@ def apply_boolean_filters(queryset: QuerySet,
                 value = value.lower() == 'true'
             queryset = queryset.filter(**{field: value})
     
-    return queryset 
\ No newline at end of file
+    return queryset
+
+
+class FilterError(ValueError):
+    """A query parameter that doesn't parse; the message is meant for the client."""
+
+
+class FilterSignature(tuple):
+    """
+    Parsed filters as sorted (name, value) pairs.
+
+    Requests that mean the same thing get equal signatures whatever their
+    parameter order, letter case or spelling of booleans, so a signature can
+    key caches of counts and responses.
+    """
+
+    def get(self, name: str, default: Any = None) -> Any:
+        for key, value in self:
+            if key == name:
+                return value
+        return default
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha1(repr(tuple(self)).encode('utf-8')).hexdigest()
+
+
+def _prefixed(q: Q, prefix: str) -> Q:
+    """`q` with every lookup moved under the relation `prefix`."""
+    clone = Q()
+    clone.connector, clone.negated = q.connector, q.negated
+    clone.children = [_prefixed(child, prefix) if isinstance(child, Q) else (f'{prefix}__{child[0]}', child[1])
+                      for child in q.children]
+    return clone
+
+
+def related_exists(model, relation: str, condition: Q) -> Exists:
+    """
+    EXISTS (a related row matching `condition`) for a to-many relation of `model`.
+
+    Unlike filtering across the join, a row with several matches stays one row,
+    so no DISTINCT is needed and the outer query keeps its index order.
+    `condition` is written relative to the related model.
+    """
+    field = model._meta.get_field(relation)
+    if field.many_to_many and not field.auto_created:
+        # Forward many-to-many: only the link table is needed for id matches
+        through = field.remote_field.through
+        return Exists(through.objects.filter(Q(**{field.m2m_field_name(): OuterRef('pk')}),
+                                             _prefixed(condition, field.m2m_reverse_field_name())))
+    return Exists(field.related_model.objects.filter(Q(**{field.remote_field.name: OuterRef('pk')}), condition))
+
+
+class Filter:
+    """
+    One filter of a FilterSpec, named by its attribute.
+
+    parse() reads the filter's query parameters and returns a hashable value,
+    or None when the filter isn't used; q() turns that value into a condition.
+    """
+
+    def __init__(self, field: Optional[str] = None):
+        self.field = field
+
+    def bind(self, name: str, model) -> None:
+        self.name = name
+        self.field = self.field or name
+        self.model = model
+
+    def raw(self, params, param: Optional[str] = None) -> str:
+        return (params.get(param or self.name) or '').strip()
+
+    def parse(self, params) -> Hashable:
+        value = self.raw(params)
+        return value or None
+
+    def q(self, value: Hashable) -> Q:
+        return Q(**{self.field: value})
+
+
+class BooleanFilter(Filter):
+    VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+    def parse(self, params) -> Optional[bool]:
+        value = self.raw(params).lower()
+        if not value:
+            return None
+        if value not in self.VALUES:
+            raise FilterError(f'{self.name} must be true or false')
+        return self.VALUES[value]
+
+
+class ChoiceFilter(Filter):
+    """Exact match against `choices`, by default the model field's choices."""
+
+    def __init__(self, field: Optional[str] = None, choices: Optional[List[str]] = None):
+        super().__init__(field)
+        self.choices = choices
+
+    def bind(self, name: str, model) -> None:
+        super().bind(name, model)
+        if self.choices is None:
+            self.choices = [value for value, _ in model._meta.get_field(self.field).choices]
+
+    def parse(self, params) -> Optional[str]:
+        value = self.raw(params)
+        if value and value not in self.choices:
+            raise FilterError(f"{self.name} must be one of {', '.join(self.choices)}")
+        return value or None
+
+
+class OptionFilter(Filter):
+    """Named conditions, e.g. {'agency': Q(is_agency=True)}; the name is case-insensitive."""
+
+    def __init__(self, options: Dict[str, Q]):
+        super().__init__()
+        self.options = options
+
+    def parse(self, params) -> Optional[str]:
+        value = self.raw(params).lower()
+        if value and value not in self.options:
+            raise FilterError(f"{self.name} must be one of {', '.join(self.options)}")
+        return value or None
+
+    def q(self, value: str) -> Q:
+        return self.options[value]
+
+
+class IdFilter(Filter):
+    """
+    A related record by id. Foreign keys compare the column; to-many relations
+    use EXISTS on the link table.
+    """
+
+    def parse(self, params) -> Optional[int]:
+        value = self.raw(params)
+        if not value:
+            return None
+        if not value.isdigit():
+            raise FilterError(f'{self.name} must be an id')
+        return int(value)
+
+    def q(self, value: int) -> Q:
+        field = self.model._meta.get_field(self.field)
+        if field.many_to_one or field.one_to_one:
+            return Q(**{field.attname: value})
+        return Q(related_exists(self.model, self.field, Q(pk=value)))
+
+
+class DateTimeRangeFilter(Filter):
+    """
+    `<name>_from` and `<name>_to`, both inclusive, as a plain range on the column
+    so an index on it applies. A bare date covers the whole day.
+    """
+
+    def parse(self, params) -> Optional[Tuple[Optional[datetime], Optional[datetime]]]:
+        lower = self._moment(params, f'{self.name}_from', time.min)
+        upper = self._moment(params, f'{self.name}_to', time.max)
+        if lower is None and upper is None:
+            return None
+        if lower and upper and lower > upper:
+            raise FilterError(f'{self.name}_from must not be after {self.name}_to')
+        return lower, upper
+
+    def _moment(self, params, param: str, day_time: time) -> Optional[datetime]:
+        value = self.raw(params, param)
+        if not value:
+            return None
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                moment = datetime.combine(day, day_time) if day else None
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise FilterError(f'{param} must be a date or ISO 8601 date and time')
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        # One spelling per instant, so equal ranges share cache entries
+        return moment.astimezone(dt_timezone.utc)
+
+    def q(self, value) -> Q:
+        lower, upper = value
+        q = Q()
+        if lower:
+            q &= Q(**{f'{self.field}__gte': lower})
+        if upper:
+            q &= Q(**{f'{self.field}__lte': upper})
+        return q
+
+
+class SearchFilter(Filter):
+    """
+    Whitespace separated terms, all of which must match (icontains) one of
+    `fields` or, through EXISTS, one of the `related` fields, given as
+    {relation: [fields of the related model]}.
+    """
+
+    def __init__(self, fields: List[str], related: Optional[Dict[str, List[str]]] = None):
+        super().__init__()
+        self.fields = fields
+        self.related = related or {}
+
+    def parse(self, params) -> Optional[Tuple[str, ...]]:
+        terms = self.raw(params).casefold().split()
+        return tuple(sorted(set(terms))) or None
+
+    def q(self, value: Tuple[str, ...]) -> Q:
+        q = Q()
+        for term in value:
+            term_q = Q()
+            for field in self.fields:
+                term_q |= Q(**{f'{field}__icontains': term})
+            for relation, fields in self.related.items():
+                condition = Q()
+                for field in fields:
+                    condition |= Q(**{f'{field}__icontains': term})
+                term_q |= Q(related_exists(self.model, relation, condition))
+            q &= term_q
+        return q
+
+
+class FilterSpec:
+    """
+    Declarative filters for a list endpoint.
+
+    Subclasses set `model` and declare Filters as attributes, named after the
+    query parameter they read:
+
+        class AlarmFilters(FilterSpec):
+            model = BeepingAlarm
+            status = ChoiceFilter()
+            property = IdFilter()
+
+    parse() validates the request's parameters once into a FilterSignature
+    (raising FilterError), and apply() filters a queryset by it. scope() adds
+    conditions that depend on the whole signature, such as hiding archived
+    rows unless they are asked for.
+    """
+    model = None
+    filters: Dict[str, Filter] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Inherited filters are copied so a subclass can point them at another model
+        # with the same field names (e.g. an archive table)
+        cls.filters = {name: copy.copy(spec) for name, spec in cls.filters.items()}
+        cls.filters.update((name, value) for name, value in vars(cls).items() if isinstance(value, Filter))
+        for name, spec in cls.filters.items():
+            spec.bind(name, cls.model)
+
+    @classmethod
+    def parse(cls, params) -> FilterSignature:
+        values = ((name, spec.parse(params)) for name, spec in cls.filters.items())
+        return FilterSignature(sorted((name, value) for name, value in values if value is not None))
+
+    @classmethod
+    def scope(cls, signature: FilterSignature) -> Q:
+        return Q()
+
+    @classmethod
+    def apply(cls, queryset: QuerySet, signature: FilterSignature) -> QuerySet:
+        conditions = [cls.filters[name].q(value) for name, value in signature]
+        return queryset.filter(cls.scope(signature), *conditions)
@@ -0,0 +1,29 @@
+from django.db import connection
+from django.utils import timezone
+
+from .models import CacheGeneration
+
+
+def get_generation(name):
+    """Return the current generation for `name` (0 if it has never been bumped)."""
+    value = CacheGeneration.objects.filter(name=name).values_list('value', flat=True).first()
+    return value or 0
+
+
+def bump_generation(name):
+    """
+    Atomically increment the generation for `name` and return the new value.
+
+    Uses a single upsert so concurrent bumps from several workers never lose an increment.
+    """
+    table = CacheGeneration._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (name, value, updated_at) VALUES (%s, 1, %s)
+            ON CONFLICT (name) DO UPDATE SET value = {table}.value + 1, updated_at = EXCLUDED.updated_at
+            RETURNING value
+            """,
+            [name, timezone.now()],
+        )
+        return cursor.fetchone()[0]
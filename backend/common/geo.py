@@ -0,0 +1,143 @@
+"""
+Small geospatial helpers that don't need PostGIS.
+
+Points are indexed with a geohash string column; a spatial query turns its
+bounding box into a handful of geohash prefixes (an indexed LIKE 'prefix%'
+each), narrows with a plain lat/lng range and finishes with an exact haversine
+check. A box with west > east wraps across the antimeridian and is searched as
+two boxes (split_antimeridian); a circle that reaches a pole covers every
+longitude.
+"""
+import math
+
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m cells
+EARTH_RADIUS_KM = 6371.0088
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Upper bound on the number of prefixes a single bounding box expands to
+MAX_COVER_CELLS = 16
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of a point."""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        target, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            target[0] = middle
+        else:
+            bits = bits << 1
+            target[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell at `precision`."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def _steps(start, stop, step):
+    values = []
+    value = start
+    while value < stop:
+        values.append(value)
+        value += step
+    values.append(stop)
+    return values
+
+
+def covering_prefixes(south, west, north, east, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash prefixes whose cells together cover the bounding box.
+
+    Picks the longest prefix length that needs at most `max_cells` cells, so
+    small boxes get tight prefixes and large ones a few coarse ones.
+    """
+    south, north = max(south, -90.0), min(north, 90.0)
+    west, east = max(west, -180.0), min(east, 180.0)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.ceil((north - south) / height) + 1
+        columns = math.ceil((east - west) / width) + 1
+        if rows * columns <= max_cells or precision == 1:
+            return sorted({
+                encode_geohash(lat, lng, precision)
+                for lat in _steps(south, north, height)
+                for lng in _steps(west, east, width)
+            })
+    return []
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bounds(latitude, longitude, radius_km):
+    """
+    (south, west, north, east) of the box enclosing a circle.
+
+    Latitudes stop at the poles, and a circle reaching one spans every
+    longitude. Longitudes wrap into -180..180, so a circle crossing the
+    antimeridian gives west > east.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    angle = radius_km / EARTH_RADIUS_KM
+    south, north = latitude - math.degrees(angle), latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    # The circle's widest point is poleward of its centre, so this is more than angle / cos(latitude)
+    lng_delta = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(latitude)))))
+    west, east = longitude - lng_delta, longitude + lng_delta
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def split_antimeridian(south, west, north, east):
+    """The box as [(south, west, north, east)] boxes with west <= east: two when it wraps (west > east)."""
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def parse_point(value):
+    """Parse 'lat,lng' into floats. Raises ValueError when malformed or out of range."""
+    latitude, longitude = (float(part) for part in value.split(','))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordinates out of range')
+    return latitude, longitude
+
+
+def parse_bounds(value):
+    """
+    Parse 'south,west,north,east' into floats. west > east is a box across the
+    antimeridian. Raises ValueError when malformed, out of range or south > north.
+    """
+    south, west, north, east = (float(part) for part in value.split(','))
+    # Written so NaN fails every check
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError('Bounds must be south,west,north,east')
+    return south, west, north, east
@@ -0,0 +1,15 @@
+from django.contrib.postgres.indexes import OpClass
+from django.db import models
+from django.db.models.functions import Upper
+
+
+def prefix_search_index(field, name):
+    """
+    Index for case-insensitive prefix searches on the text column `field`, such
+    as admin '^field' search fields or istartswith filters.
+
+    Django runs those as UPPER("field"::text) LIKE UPPER('term%') on PostgreSQL,
+    which only an index on that expression with text_pattern_ops serves
+    (PostgreSQL adds the ::text cast to UPPER("field") by itself).
+    """
+    return models.Index(OpClass(Upper(field), name='text_pattern_ops'), name=name)
@@ -0,0 +1,10 @@
+from .kinde import provision_user
+from .queue import job_handler
+
+
+@job_handler('common.provision_user', max_attempts=8)
+def provision_user_job(context, email, first_name, last_name, superuser=False):
+    """Create a Kinde account and its Django user; Kinde outages and rate limits are retried."""
+    context.progress(0, message=f'Provisioning {email}')
+    kinde_user, user, created = provision_user(email, first_name, last_name, superuser)
+    return {'user_id': user.pk, 'kinde': kinde_user.get('status', 'created'), 'created': created}
@@ -0,0 +1,163 @@
+"""
+Kinde Management API calls used to provision staff accounts.
+
+Used by create_superuser.py (interactively), the common.provision_user job
+(see common/jobs.py) and bulk imports (common.user_import). Failures raise
+KindeError; `retryable` tells callers whether trying again later can help
+(network errors, 429, 5xx) or not (bad credentials, rejected input).
+
+The M2M access token is cached in the process until shortly before it
+expires, and threads share a single fetch.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .cache import bump_version
+from .directory import USER_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 15
+# Fetch a new token this many seconds before the cached one expires
+TOKEN_EXPIRY_MARGIN = 60
+BULK_CREATE_BATCH_SIZE = 500
+
+_m2m_token = {}
+_m2m_token_lock = threading.Lock()
+
+
+class KindeError(Exception):
+    def __init__(self, message, retryable=False, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+        # Seconds, from a 429's Retry-After header
+        self.retry_after = retry_after
+
+
+def _details(response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+def _raise_for(response, action):
+    retryable = response.status_code == 429 or response.status_code >= 500
+    try:
+        retry_after = float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        retry_after = None
+    raise KindeError(f'Failed to {action} (HTTP {response.status_code}): {_details(response)}', retryable,
+                     response.status_code, retry_after)
+
+
+def get_m2m_token(stale=None):
+    """
+    An access token for the Management API, cached until it nearly expires.
+    Pass a token the API rejected as `stale` to replace it; other threads
+    that were rejected with the same token then reuse the replacement.
+    """
+    with _m2m_token_lock:
+        cached = _m2m_token.get('value')
+        if cached is None or cached == stale or time.monotonic() >= _m2m_token['expires']:
+            token, expires_in = _fetch_m2m_token()
+            _m2m_token.update(value=token, expires=time.monotonic() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0))
+        return _m2m_token['value']
+
+
+def _fetch_m2m_token():
+    """(token, lifetime in seconds) from the M2M client credentials."""
+    if not settings.KINDE_CLIENT_ID_M2M or not settings.KINDE_CLIENT_SECRET_M2M:
+        raise KindeError('Kinde M2M client ID or secret not configured')
+    try:
+        response = requests.post(f'{settings.KINDE_ISSUER_URL}/oauth2/token', data={
+            'grant_type': 'client_credentials',
+            'client_id': settings.KINDE_CLIENT_ID_M2M,
+            'client_secret': settings.KINDE_CLIENT_SECRET_M2M,
+            'audience': settings.KINDE_MGMNT_AUDIENCE,
+        }, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        raise KindeError(f'Failed to get Kinde M2M token: {e}', retryable=True)
+    if response.status_code != 200:
+        _raise_for(response, 'get Kinde M2M token')
+    body = response.json()
+    if not body.get('access_token'):
+        raise KindeError("'access_token' missing from Kinde M2M response")
+    return body['access_token'], int(body.get('expires_in') or 0)
+
+
+def create_kinde_user(email, first_name, last_name, access_token, session=None):
+    """
+    Create a Kinde user with email + password sign in; Kinde emails them to
+    set a password. Returns Kinde's response, or {'status': 'exists'} when
+    the email is already registered. Pass a requests.Session to reuse its
+    connections across calls.
+    """
+    data = {
+        'profile': {'given_name': first_name, 'family_name': last_name},
+        # No password: Kinde sends a password setup email
+        'identities': [{'type': 'email', 'details': {'email': email, 'password': None}}],
+        'is_password_reset_required': True,
+    }
+    try:
+        response = (session or requests).post(f'{settings.KINDE_ISSUER_URL}/api/v1/user', json=data, timeout=REQUEST_TIMEOUT,
+                                 headers={'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'})
+    except requests.RequestException as e:
+        raise KindeError(f'Failed to create Kinde user {email}: {e}', retryable=True)
+    if response.status_code in (200, 201):
+        return response.json()
+    if response.status_code == 409 or (response.status_code == 400 and
+                                       'already exists' in str(_details(response)).lower()):
+        return {'status': 'exists', 'email': email}
+    _raise_for(response, f'create Kinde user {email}')
+
+
+def create_django_user(email, first_name, last_name, superuser=True):
+    """The Django user for a Kinde account (no usable password: sign in goes through Kinde)."""
+    User = get_user_model()
+    with transaction.atomic():
+        user, created = User.objects.get_or_create(username=email, defaults={
+            'email': email, 'first_name': first_name, 'last_name': last_name,
+            'is_staff': superuser, 'is_superuser': superuser,
+        })
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+    return user, created
+
+
+def create_django_users(users):
+    """
+    Django users for many Kinde accounts in one bulk_create. `users` are
+    (email, first_name, last_name, superuser) tuples; emails that already
+    have a user are left alone. Returns the emails created.
+    """
+    User = get_user_model()
+    emails = [email for email, *_ in users]
+    existing = set(User.objects.filter(username__in=emails).values_list('username', flat=True))
+    # Sign in goes through Kinde; the same unusable password create_django_user sets
+    new = [User(username=email, email=email, first_name=first_name, last_name=last_name, is_staff=superuser,
+                is_superuser=superuser, password=make_password(None))
+           for email, first_name, last_name, superuser in users if email not in existing]
+    with transaction.atomic():
+        User.objects.bulk_create(new, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+        # bulk_create sends no post_save, so the directory is not invalidated by the signal
+        transaction.on_commit(lambda: bump_version(USER_DIRECTORY))
+    return [user.username for user in new]
+
+
+def provision_user(email, first_name, last_name, superuser=True, access_token=None):
+    """Create the user in Kinde (if needed) and then in Django; returns (kinde response, user, created)."""
+    kinde_user = create_kinde_user(email, first_name, last_name, access_token or get_m2m_token())
+    user, created = create_django_user(email, first_name, last_name, superuser)
+    logger.info(f"Provisioned {email} (Kinde: {kinde_user.get('status', 'created')}, Django: "
+                f"{'created' if created else 'existing'})")
+    return kinde_user, user, created
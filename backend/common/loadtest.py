@@ -0,0 +1,253 @@
+"""
+Replay recorded API traffic against a running server.
+
+A request log is a file of JSON lines, one per request, as written by
+backend.middleware.RequestLogMiddleware or maintenance.loadtest:
+
+    {"ts": 1718000000.12, "method": "GET", "path": "/api/beeping_alarms/", "query": "page=2", "user": "u1"}
+
+`ts` only matters relative to the other lines: requests are sent with the
+recorded gaps between them (multiplied by a time scale) from a pool of worker
+threads. Only safe methods are replayed, since the log does not keep bodies.
+
+Tokens are `loadtest-<user>`; run the server with KINDE_ISSUER_URL pointing at
+the stub identity provider (`manage.py stub_identity_provider`), which turns
+such tokens into user profiles instead of asking Kinde.
+"""
+import json
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.urls import Resolver404, resolve
+
+STUB_TOKEN_PREFIX = 'loadtest-'
+STUB_M2M_TOKEN_PREFIX = 'stub-m2m-'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def read_log(path, limit=None):
+    """
+    Load a request log, oldest first, adding `at` (seconds since the first
+    request) to every entry. Returns (entries, skipped) where skipped counts
+    requests with unsafe methods.
+    """
+    entries = []
+    skipped = 0
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            method = entry.get('method', 'GET').upper()
+            if method not in SAFE_METHODS:
+                skipped += 1
+                continue
+            entries.append({
+                'ts': float(entry['ts']),
+                'method': method,
+                'path': entry['path'],
+                'query': entry.get('query', ''),
+                'user': entry.get('user'),
+            })
+    entries.sort(key=lambda entry: entry['ts'])
+    if limit:
+        entries = entries[:limit]
+    if entries:
+        first = entries[0]['ts']
+        for entry in entries:
+            entry['at'] = entry['ts'] - first
+    return entries, skipped
+
+
+def url_name(path):
+    """The URL pattern name a path resolves to, so stats group by endpoint."""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return 'unresolved'
+    return match.url_name or match.route
+
+
+class _Sender:
+    """Sends requests with one keep-alive session per worker thread."""
+
+    def __init__(self, base_url, default_user, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.default_user = default_user
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def send(self, entry, due):
+        started = time.perf_counter()
+        url = self.base_url + entry['path'] + (f"?{entry['query']}" if entry['query'] else '')
+        token = STUB_TOKEN_PREFIX + (entry['user'] or self.default_user)
+        result = {'name': url_name(entry['path']), 'lag_ms': (started - due) * 1000}
+        try:
+            response = self.session().request(entry['method'], url, timeout=self.timeout,
+                                              headers={'Authorization': f'Bearer {token}'})
+            result['status'] = response.status_code
+            result['bytes'] = len(response.content)
+        except requests.RequestException as e:
+            result['status'] = type(e).__name__
+            result['bytes'] = 0
+        result['ms'] = (time.perf_counter() - started) * 1000
+        return result
+
+
+def replay(entries, base_url, concurrency=10, time_scale=1.0, user='replay', timeout=30):
+    """
+    Send `entries` to `base_url` and return the summary from summarize().
+
+    `time_scale` multiplies the recorded gaps: 1 replays in real time, 0.5 at
+    double speed and 0 as fast as `concurrency` workers allow. When every
+    worker is busy, requests wait; that wait is reported as lag.
+    """
+    sender = _Sender(base_url, user, timeout)
+    started = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in entries:
+            due = started + entry['at'] * time_scale
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(sender.send, entry, due))
+        results = [future.result() for future in futures]
+    return summarize(results, time.perf_counter() - started)
+
+
+def _is_error(status):
+    return not isinstance(status, int) or status >= 400
+
+
+def _latency_stats(results):
+    latencies = [result['ms'] for result in results]
+    errors = sum(1 for result in results if _is_error(result['status']))
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': round(errors / len(results), 4),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2),
+        'statuses': dict(Counter(str(result['status']) for result in results)),
+    }
+
+
+def summarize(results, elapsed):
+    """Throughput, error rate and latency percentiles overall and per URL name."""
+    if not results:
+        return {'requests': 0, 'elapsed_s': round(elapsed, 2), 'endpoints': {}}
+    by_name = defaultdict(list)
+    for result in results:
+        by_name[result['name']].append(result)
+    lags = [result['lag_ms'] for result in results]
+    summary = _latency_stats(results)
+    summary.update({
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+        'bytes': sum(result['bytes'] for result in results),
+        'lag_p95_ms': round(percentile(lags, 95), 2),
+        'endpoints': {name: _latency_stats(group) for name, group in sorted(by_name.items())},
+    })
+    return summary
+
+
+class StubIdentityProviderHandler(BaseHTTPRequestHandler):
+    """
+    Answers /oauth2/v2/user_profile like Kinde does, for `loadtest-<name>`
+    bearer tokens only; anything else gets a 401.
+
+    It also stands in for the M2M parts of the Management API that
+    common.kinde uses. POST /oauth2/token issues tokens. POST /api/v1/user
+    records users in the server's `kinde_users` (409 for a known email).
+    With `throttle_every` set, every Nth user request gets a 429.
+    """
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/oauth2/v2/user_profile':
+            return self._reply(404, {'error': 'Not found'})
+        header = self.headers.get('Authorization', '')
+        token = header[len('Bearer '):] if header.startswith('Bearer ') else ''
+        if not token.startswith(STUB_TOKEN_PREFIX) or len(token) == len(STUB_TOKEN_PREFIX):
+            return self._reply(401, {'error': 'Invalid token'})
+        name = token[len(STUB_TOKEN_PREFIX):]
+        self._reply(200, {
+            'id': f'loadtest_{name}',
+            'email': f'{name}@loadtest.local',
+            'given_name': name.title(),
+            'family_name': 'Loadtest',
+        })
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        path = self.path.split('?')[0]
+        server = self.server
+        if path == '/oauth2/token':
+            with server.lock:
+                server.m2m_tokens.append(f'{STUB_M2M_TOKEN_PREFIX}{len(server.m2m_tokens)}')
+                token = server.m2m_tokens[-1]
+            return self._reply(200, {'access_token': token, 'expires_in': 86400, 'token_type': 'bearer'})
+        if path != '/api/v1/user':
+            return self._reply(404, {'error': 'Not found'})
+        if self.headers.get('Authorization', '') not in {f'Bearer {token}' for token in server.m2m_tokens}:
+            return self._reply(401, {'error': 'Invalid token'})
+        data = json.loads(body or b'{}')
+        email = data['identities'][0]['details']['email'].lower()
+        with server.lock:
+            server.user_requests += 1
+            if server.throttle_every and server.user_requests % server.throttle_every == 0:
+                return self._reply(429, {'error': 'Too many requests'}, {'Retry-After': '0'})
+            if email in server.kinde_users:
+                return self._reply(409, {'error': 'User already exists'})
+            server.kinde_users[email] = data['profile']
+        self._reply(201, {'id': f'kp_{len(server.kinde_users)}', 'created': True})
+
+    def _reply(self, status_code, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubIdentityProvider(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, throttle_every=0):
+        super().__init__(address, StubIdentityProviderHandler)
+        self.lock = threading.Lock()
+        self.m2m_tokens = []
+        self.kinde_users = {}
+        self.user_requests = 0
+        self.throttle_every = throttle_every
+
+
+def stub_identity_provider(host='127.0.0.1', port=8765, throttle_every=0):
+    return StubIdentityProvider((host, port), throttle_every)
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = ('Queue a background job, e.g. from cron: '
+            'enqueue_job maintenance.export_alarm_history --payload \'{"before": "2024-01-01T00:00:00+00:00"}\'')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind')
+        parser.add_argument('--payload', default='{}', help="The handler's keyword arguments as a JSON object")
+        parser.add_argument('--unique-key', help='Skip queuing if a job of this kind and key is queued or running')
+        parser.add_argument('--delay', type=int, default=0, help='Seconds before the job is due')
+
+    def handle(self, *args, **options):
+        try:
+            payload = json.loads(options['payload'])
+        except ValueError as error:
+            raise CommandError(f'--payload is not valid JSON: {error}')
+        if not isinstance(payload, dict):
+            raise CommandError('--payload must be a JSON object')
+        try:
+            job = enqueue(options['kind'], payload, unique_key=options['unique_key'], delay=options['delay'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(f'Queued {job}')
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from common.kinde import KindeError
+from common.user_import import (DEFAULT_RATE, DEFAULT_RETRIES, DEFAULT_WORKERS, UserImportError, import_users,
+                                read_users)
+
+
+class Command(BaseCommand):
+    help = ('Create Kinde accounts and Django users from a CSV with email, first_name, last_name and optionally '
+            'superuser columns. Safe to run again: existing accounts and users are kept.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help='Path to the CSV file')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                            help=f'Concurrent Kinde requests (default {DEFAULT_WORKERS})')
+        parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                            help=f'Most Kinde requests per second (default {DEFAULT_RATE}; 0 for no limit)')
+        parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                            help=f'Retries per user after network errors, 429s and 5xx (default {DEFAULT_RETRIES})')
+        parser.add_argument('--superuser', action='store_true', help='Make every imported user staff and superuser')
+        parser.add_argument('--dry-run', action='store_true', help='Check the CSV without creating anyone')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['retries'] < 0 or options['rate'] < 0:
+            raise CommandError('--workers must be at least 1, and --retries and --rate not negative')
+        try:
+            with open(options['csv'], newline='', encoding='utf-8-sig') as handle:
+                rows, problems = read_users(handle, options['superuser'])
+        except (OSError, UserImportError) as error:
+            raise CommandError(str(error))
+        for problem in problems:
+            self.stderr.write(f'Skipping {problem}')
+        self.stdout.write(f'{len(rows)} users to import')
+        if options['dry_run'] or not rows:
+            return
+
+        try:
+            summary = import_users(rows, options['workers'], options['rate'], options['retries'],
+                                   log=self.stdout.write)
+        except KindeError as error:
+            raise CommandError(str(error))
+        self.stdout.write(f"Kinde: {summary['kinde_created']} created, {summary['kinde_existing']} already there. "
+                          f"Django: {summary['django_created']} created, {summary['django_existing']} already there.")
+        if summary['failed']:
+            for email, error in summary['failed'].items():
+                self.stderr.write(f'{email}: {error}')
+            raise CommandError(f"{len(summary['failed'])} users failed; run the import again to retry them")
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import Error, connections
+
+
+class Command(BaseCommand):
+    help = ('Ping the database every --interval seconds so a serverless (Neon) compute is not suspended and the '
+            'next request does not pay its cold start. Use --once from cron instead of running it continuously.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=settings.DB_KEEP_WARM_INTERVAL,
+                            help=f'Seconds between pings (default DB_KEEP_WARM_INTERVAL, '
+                                 f'{settings.DB_KEEP_WARM_INTERVAL})')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--once', action='store_true', help='Ping once and exit')
+
+    def ping(self, alias):
+        started = time.monotonic()
+        for attempt in range(2):
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                break
+            except Error as error:
+                # Dropped by the server or pooler while idle: reconnect once
+                connections[alias].close()
+                if attempt:
+                    self.stderr.write(f'Ping failed after {(time.monotonic() - started) * 1000:.0f}ms: {error}')
+                    return False
+        self.stdout.write(f'Ping {(time.monotonic() - started) * 1000:.0f}ms')
+        return True
+
+    def handle(self, *args, **options):
+        if options['once']:
+            if not self.ping(options['database']):
+                raise SystemExit(1)
+            return
+        try:
+            while True:
+                self.ping(options['database'])
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.loadtest import read_log, replay
+
+
+class Command(BaseCommand):
+    help = ('Replay a recorded request log against a running server and report throughput, '
+            'latency percentiles per URL name and error rates.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', help='Request log (JSON lines) from REQUEST_LOG_PATH or synthetic_request_log')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to send requests to')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at most')
+        parser.add_argument('--time-scale', type=float, default=1.0,
+                            help='Multiplier for recorded gaps between requests: 0.5 is double speed, '
+                                 '0 is as fast as possible')
+        parser.add_argument('--user', default='replay',
+                            help="Stub user for entries that don't name one (token 'loadtest-<user>')")
+        parser.add_argument('--limit', type=int, help='Only replay the first N requests')
+        parser.add_argument('--timeout', type=float, default=30, help='Per request timeout in seconds')
+        parser.add_argument('--output', help='Also write the full report as JSON to this path')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['time_scale'] < 0:
+            raise CommandError('--concurrency must be positive and --time-scale not negative')
+        try:
+            entries, skipped = read_log(options['log'], options['limit'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read {options["log"]}: {e}')
+        if not entries:
+            raise CommandError('No replayable requests in the log')
+
+        span = entries[-1]['at'] * options['time_scale']
+        self.stdout.write(f"Replaying {len(entries)} requests over ~{span:.0f}s against {options['base_url']} "
+                          f"with {options['concurrency']} workers"
+                          + (f' ({skipped} non-GET requests skipped)' if skipped else ''))
+
+        report = replay(entries, options['base_url'], options['concurrency'], options['time_scale'],
+                        options['user'], options['timeout'])
+
+        self.stdout.write(f"\n{report['requests']} requests in {report['elapsed_s']}s: "
+                          f"{report['throughput_rps']} req/s, {report['error_rate']:.2%} errors, "
+                          f"p50 {report['p50_ms']}ms, p95 {report['p95_ms']}ms, p99 {report['p99_ms']}ms, "
+                          f"client lag p95 {report['lag_p95_ms']}ms\n")
+        self.stdout.write(f"{'endpoint':<28} {'requests':>8} {'errors':>7} {'p50':>9} {'p90':>9} "
+                          f"{'p95':>9} {'p99':>9} {'max':>9}")
+        for name, stats in report['endpoints'].items():
+            self.stdout.write(f"{name:<28} {stats['requests']:>8} {stats['error_rate']:>7.1%} "
+                              f"{stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                              f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+                handle.write('\n')
+            self.stdout.write(f"\nReport written to {options['output']}")
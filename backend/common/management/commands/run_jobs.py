@@ -0,0 +1,48 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from common.queue import Worker
+
+
+def _serve(options, log):
+    worker = Worker(options['threads'], options['kinds'], options['poll_interval'], options['burst'], log)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: worker.stop())
+    worker.run()
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs (common.queue) until stopped. SIGTERM or Ctrl-C lets running jobs '
+            'finish first. Start as many of these, on as many hosts, as the load needs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Jobs run at once per process (default 4)')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes to fork, for CPU-bound jobs (default 1)')
+        parser.add_argument('--kinds', nargs='+', help='Only run these job kinds')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds an idle thread waits before looking for due jobs again (default 1)')
+        parser.add_argument('--burst', action='store_true', help='Exit once no jobs are due')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['processes'] < 1:
+            raise CommandError('--threads and --processes must be at least 1')
+        self.stdout.write(f"Running jobs with {options['processes']} process(es) x {options['threads']} thread(s)")
+        if options['processes'] == 1:
+            _serve(options, self.stdout.write)
+            return
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [context.Process(target=_serve, args=(options, self.stdout.write))
+                    for _ in range(options['processes'])]
+        for child in children:
+            child.start()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: [child.terminate() for child in children if child.is_alive()])
+        for child in children:
+            child.join()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from common.loadtest import STUB_TOKEN_PREFIX, stub_identity_provider
+
+
+class Command(BaseCommand):
+    help = ('Serve a fake Kinde user profile endpoint for load testing, plus the M2M token and user creation '
+            'endpoints import_users needs. Start the API with KINDE_ISSUER_URL=http://<host>:<port> so token '
+            'checks go here instead of Kinde.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--throttle-every', type=int, default=0,
+                            help='Answer every Nth user creation with a 429, to exercise retries')
+
+    def handle(self, *args, **options):
+        server = stub_identity_provider(options['host'], options['port'], options['throttle_every'])
+        self.stdout.write(f"Stub identity provider on http://{options['host']}:{options['port']} "
+                          f"(accepts '{STUB_TOKEN_PREFIX}<name>' tokens). Ctrl-C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
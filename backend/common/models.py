@@ -1,3 +1,73 @@
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class CacheGeneration(models.Model):
+    """
+    Monotonic counter per cached dataset.
+
+    Workers keep in-process copies of some data (e.g. typeahead indexes) and compare
+    their generation with this row to find out when another worker changed it.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.value})"
+
+
+class Job(models.Model):
+    """
+    A unit of slow work run outside the request by a run_jobs worker (see common.queue).
+
+    `kind` names a handler registered with common.queue.job_handler and
+    `payload` holds its keyword arguments. Queued jobs become due at
+    run_after; failed attempts are queued again with backoff until
+    max_attempts. `unique_key` keeps at most one queued or running job per
+    (kind, key).
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    unique_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.FloatField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due job; only queued rows are in the index
+            models.Index(fields=['run_after', 'id'], name='job_queued', condition=models.Q(status='queued')),
+            models.Index(fields=['heartbeat_at'], name='job_running', condition=models.Q(status='running')),
+            models.Index(fields=['finished_at'], name='job_finished'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'unique_key'], name='job_unique_active',
+                                    condition=models.Q(status__in=['queued', 'running'])),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
@@ -1,6 +1,19 @@
+from functools import partial
+
+from django.core.paginator import Paginator as DjangoPaginator
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
+
+class CountedPaginator(DjangoPaginator):
+    """Django's paginator, optionally handed a count worked out (or cached) elsewhere."""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
 class CustomPageNumberPagination(PageNumberPagination):
     """
     Custom pagination class that can be reused across the project.
@@ -11,6 +24,11 @@ class CustomPageNumberPagination(PageNumberPagination):
     max_page_size = 200
     page_query_param = 'page'
 
+    def paginate_queryset(self, queryset, request, view=None, count=None):
+        """As DRF's, but a known `count` saves the COUNT query."""
+        self.django_paginator_class = partial(CountedPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data):
         return Response({
             'count': self.page.paginator.count,
@@ -0,0 +1,277 @@
+"""
+Background jobs kept in Postgres (common.models.Job); no broker needed.
+
+enqueue() inserts a row in the caller's transaction, so a job about data
+written by the same request only becomes visible once that data is.
+run_jobs workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED. Any
+number of threads, processes and hosts can share the table without waiting
+on one another or running a job twice.
+
+Handlers are functions registered with @job_handler in an app's jobs.py,
+which autodiscover() imports at startup. A handler is called with a
+JobContext and the job's payload as keyword arguments, and returns a
+JSON-serializable result.
+An exception makes the job wait (exponential backoff with jitter) and try
+again, up to max_attempts. PermanentJobError, or any exception whose
+`retryable` attribute is False, fails it straight away. Workers heartbeat
+their running jobs. A job whose heartbeat stops because its worker was
+killed is queued again after STALE_AFTER seconds.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import Avg, Count, F, Max, Min
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = (Job.QUEUED, Job.RUNNING)
+
+# Seconds before the first retry; doubles per attempt up to BACKOFF_MAX
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+HEARTBEAT_INTERVAL = 30
+STALE_AFTER = 5 * 60
+# Progress writes from one job are at most this often (seconds)
+PROGRESS_INTERVAL = 1
+JOB_RETENTION_DAYS = 14
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler to fail its job without retrying."""
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    kind: str
+    func: Callable
+    max_attempts: int
+
+
+_handlers = {}
+
+
+def job_handler(kind, max_attempts=5):
+    """Register the decorated function as the handler for `kind` jobs."""
+    def register(func):
+        _handlers[kind] = JobHandler(kind, func, max_attempts)
+        return func
+    return register
+
+
+def autodiscover():
+    """Import every app's jobs module; run from CommonConfig.ready()."""
+    autodiscover_modules('jobs')
+
+
+def get_handler(kind):
+    try:
+        return _handlers[kind]
+    except KeyError:
+        raise ValueError(f"Unknown job kind '{kind}'")
+
+
+def enqueue(kind, payload=None, *, unique_key=None, delay=0, user=None):
+    """
+    Queue a `kind` job. With `unique_key`, an already queued or running job of
+    the same kind and key is returned instead of adding another.
+    """
+    handler = get_handler(kind)
+    fields = {'kind': kind, 'payload': payload or {}, 'unique_key': unique_key, 'created_by': user,
+              'max_attempts': handler.max_attempts, 'run_after': timezone.now() + timedelta(seconds=delay)}
+    if unique_key is None:
+        return Job.objects.create(**fields)
+    existing = Job.objects.filter(kind=kind, unique_key=unique_key, status__in=ACTIVE).first()
+    if existing is not None:
+        return existing
+    try:
+        with transaction.atomic():
+            return Job.objects.create(**fields)
+    except IntegrityError:
+        # Someone queued the same job a moment ago
+        return Job.objects.get(kind=kind, unique_key=unique_key, status__in=ACTIVE)
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying after `attempts` failed attempts: 10s, 20s, 40s... with jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim(worker, kinds=None):
+    """Mark the oldest due job running for `worker`, skipping rows other workers hold; None if there is none."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (Job.objects.filter(status=Job.QUEUED, run_after__lte=now, kind__in=kinds or list(_handlers))
+               .order_by('run_after', 'id').select_for_update(skip_locked=True).first())
+        if job is None:
+            return None
+        job.status, job.worker, job.attempts = Job.RUNNING, worker, job.attempts + 1
+        job.started_at = job.heartbeat_at = now
+        job.save(update_fields=['status', 'worker', 'attempts', 'started_at', 'heartbeat_at'])
+    return job
+
+
+class JobContext:
+    """Handed to a handler: the job itself and a way to report progress."""
+
+    def __init__(self, job):
+        self.job = job
+        self._reported = None
+
+    def progress(self, done=None, total=None, message=None):
+        """Record `done` of `total` (or `done` as a fraction) and/or a status message; throttled."""
+        now = time.monotonic()
+        finished = done is not None and done == (total or 1)
+        if self._reported is not None and now - self._reported < PROGRESS_INTERVAL and not finished:
+            return
+        self._reported = now
+        fields = {'heartbeat_at': timezone.now()}
+        if done is not None:
+            fields['progress'] = min(max(done / total if total else done, 0), 1)
+        if message is not None:
+            fields['progress_message'] = message[:255]
+        Job.objects.filter(pk=self.job.pk, status=Job.RUNNING, worker=self.job.worker).update(**fields)
+
+
+def run_job(job):
+    """Run a claimed job and record how it went; returns the finished status."""
+    handler = _handlers.get(job.kind)
+    running = Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker)
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind '{job.kind}'")
+        result = handler.func(JobContext(job), **job.payload)
+    except Exception as error:
+        message = f'{type(error).__name__}: {error}'
+        now = timezone.now()
+        retry = (not isinstance(error, PermanentJobError) and getattr(error, 'retryable', True)
+                 and job.attempts < job.max_attempts)
+        if retry:
+            delay = backoff(job.attempts)
+            logger.warning(f'{job.kind} #{job.pk} attempt {job.attempts} failed, retrying in {delay:.0f}s: {message}')
+            running.update(status=Job.QUEUED, worker='', error=message, run_after=now + timedelta(seconds=delay))
+            return Job.QUEUED
+        logger.exception(f'{job.kind} #{job.pk} failed after {job.attempts} attempts')
+        running.update(status=Job.FAILED, error=message, finished_at=now)
+        return Job.FAILED
+    running.update(status=Job.SUCCEEDED, result=result, progress=1, error='', finished_at=timezone.now())
+    return Job.SUCCEEDED
+
+
+def requeue_stale(now=None):
+    """Queue again (or fail, when out of attempts) running jobs whose worker stopped heartbeating."""
+    now = now or timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now - timedelta(seconds=STALE_AFTER))
+    error = 'Worker stopped responding'
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(status=Job.QUEUED, worker='', error=error,
+                                                                   run_after=now)
+    failed = stale.update(status=Job.FAILED, error=error, finished_at=now)
+    if requeued or failed:
+        logger.warning(f'Requeued {requeued} and failed {failed} jobs of unresponsive workers')
+    return requeued + failed
+
+
+def prune_jobs(days=JOB_RETENTION_DAYS):
+    count, _ = Job.objects.filter(finished_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return count
+
+
+def metrics(now=None):
+    """Queue depth, lag and the last hour's throughput, overall and by kind."""
+    now = now or timezone.now()
+    hour_ago = now - timedelta(hours=1)
+    active = Job.objects.filter(status__in=ACTIVE)
+    due = active.filter(status=Job.QUEUED, run_after__lte=now)
+    recent = Job.objects.filter(finished_at__gte=hour_ago)
+
+    by_kind = {}
+    for row in active.values('kind', 'status').annotate(count=Count('id')):
+        by_kind.setdefault(row['kind'], {})[row['status']] = row['count']
+    for row in recent.values('kind', 'status').annotate(count=Count('id')):
+        by_kind.setdefault(row['kind'], {})[f"{row['status']}_last_hour"] = row['count']
+
+    oldest_due = due.aggregate(oldest=Min('run_after'))['oldest']
+    durations = recent.filter(status=Job.SUCCEEDED).aggregate(
+        average=Avg(F('finished_at') - F('started_at')), longest=Max(F('finished_at') - F('started_at')))
+    return {
+        'queued': active.filter(status=Job.QUEUED).count(),
+        'due': due.count(),
+        'running': active.filter(status=Job.RUNNING).count(),
+        'retrying': active.filter(status=Job.QUEUED, attempts__gt=0).count(),
+        'oldest_due_seconds': (now - oldest_due).total_seconds() if oldest_due else 0,
+        'succeeded_last_hour': recent.filter(status=Job.SUCCEEDED).count(),
+        'failed_last_hour': recent.filter(status=Job.FAILED).count(),
+        'average_seconds': durations['average'].total_seconds() if durations['average'] else None,
+        'longest_seconds': durations['longest'].total_seconds() if durations['longest'] else None,
+        'workers': active.filter(status=Job.RUNNING).values('worker').distinct().count(),
+        'by_kind': by_kind,
+    }
+
+
+class Worker:
+    """
+    `concurrency` threads claiming and running jobs, with this (main) thread
+    heartbeating their jobs and doing housekeeping. stop() lets running jobs
+    finish; with `burst` the threads also stop once nothing is due.
+    """
+
+    def __init__(self, concurrency=1, kinds=None, poll_interval=1.0, burst=False, log=logger.info):
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.concurrency = concurrency
+        self.kinds = kinds
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.log = log
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self, name):
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                job = claim(name, self.kinds)
+                if job is None:
+                    if self.burst:
+                        return
+                    self._stop.wait(self.poll_interval)
+                    continue
+                started = time.monotonic()
+                outcome = run_job(job)
+                self.log(f'{job.kind} #{job.pk} {outcome} in {time.monotonic() - started:.1f}s')
+        finally:
+            connections.close_all()
+
+    def _housekeeping(self):
+        close_old_connections()
+        Job.objects.filter(status=Job.RUNNING, worker__startswith=f'{self.name}:').update(heartbeat_at=timezone.now())
+        requeue_stale()
+        prune_jobs()
+
+    def run(self):
+        threads = [threading.Thread(target=self._loop, args=(f'{self.name}:{number}',), daemon=True)
+                   for number in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                alive = [thread for thread in threads if thread.is_alive()]
+                if not alive:
+                    return
+                self._housekeeping()
+                alive[0].join(HEARTBEAT_INTERVAL)
+        finally:
+            connections.close_all()
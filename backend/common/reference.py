@@ -0,0 +1,39 @@
+"""
+Reference data bundle: the small, rarely changing lookup tables the frontend
+needs to render forms (issue types, alarm statuses and the assets catalog).
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from assets.models import AlarmModel, BatteryType, Manufacturer
+from maintenance.models import BeepingAlarm, IssueType
+from .cache import get_versioned
+
+REFERENCE_DATA = 'common.reference_data'
+
+# Models whose changes invalidate the bundle (see common/signals.py)
+REFERENCE_MODELS = (IssueType, Manufacturer, BatteryType, AlarmModel)
+
+
+def _build_reference_data():
+    data = {
+        'statuses': [{'value': value, 'label': label} for value, label in BeepingAlarm.STATUS_CHOICES],
+        'issue_types': list(IssueType.objects.order_by('name').values('id', 'uid', 'name', 'description')),
+        'manufacturers': list(Manufacturer.objects.order_by('name').values('id', 'uid', 'name', 'is_active')),
+        'battery_types': list(BatteryType.objects.order_by('name').values('id', 'uid', 'name', 'life_span')),
+        'alarm_models': list(AlarmModel.objects.order_by('manufacturer__name', 'name').values(
+            'id', 'uid', 'name', 'description', 'manufacturer_id', 'battery_type_id',
+            'is_hardwired', 'is_wireless', 'is_active',
+        )),
+    }
+    # Serialize once here so the ETag is a hash of the exact body we send
+    body = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return {'body': body, 'etag': f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'}
+
+
+def get_reference_data():
+    """Return {'body': <json string>, 'etag': <strong etag>} for the current bundle."""
+    _, bundle = get_versioned(REFERENCE_DATA, _build_reference_data)
+    return bundle
@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .directory import USER_DIRECTORY
+from .reference import REFERENCE_DATA, REFERENCE_MODELS
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_directory(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_version(USER_DIRECTORY))
+
+
+def invalidate_reference_data(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_version(REFERENCE_DATA))
+
+
+for model in REFERENCE_MODELS:
+    post_save.connect(invalidate_reference_data, sender=model, dispatch_uid=f'reference_data_save_{model.__name__}')
+    post_delete.connect(invalidate_reference_data, sender=model, dispatch_uid=f'reference_data_delete_{model.__name__}')
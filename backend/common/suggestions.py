@@ -0,0 +1,198 @@
+"""
+In-process prefix index for typeahead suggestions.
+
+Each index keeps a sorted array of (token, id) pairs so a prefix lookup is two
+bisects, plus a browse order for empty queries. It is built lazily on first use
+and kept current in two ways:
+
+* the worker that made a change refreshes the affected ids incrementally
+  (see `refresh`), and
+* every worker compares its generation with the database at most once per
+  `check_interval` seconds and rebuilds when another worker has bumped it.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+
+from .generations import bump_generation, get_generation
+
+_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into lower-cased alphanumeric tokens."""
+    return _TOKEN_RE.findall((text or '').casefold())
+
+
+def digits_only(text):
+    return ''.join(char for char in (text or '') if char.isdigit())
+
+
+def digit_suffixes(text, min_length=2):
+    """
+    All suffixes of the digits in `text`.
+
+    Prefix-matching against suffixes gives substring matching, so '345' finds
+    '0412 345 678' the same way the old digit-stripped phone comparison did.
+    """
+    digits = digits_only(text)
+    return [digits[i:] for i in range(len(digits) - min_length + 1)]
+
+
+class SuggestionIndex:
+    """
+    Generic prefix index.
+
+    `loader(ids=None)` must return an iterable of (id, label, sort_key, tokens)
+    for every indexable entity, or only for `ids` when given. Entities that are
+    missing from a partial load are removed from the index.
+    """
+
+    def __init__(self, name, loader, check_interval=None):
+        self.name = name
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._generation = None
+        self._checked_at = 0.0
+        self._entries = {}
+        self._tokens = []
+        self._browse = []
+
+    # -- freshness -------------------------------------------------------
+
+    def _interval(self):
+        if self.check_interval is not None:
+            return self.check_interval
+        return getattr(settings, 'SUGGESTION_INDEX_CHECK_INTERVAL', 5)
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._generation is not None and now - self._checked_at < self._interval():
+            return
+        with self._lock:
+            if self._generation is not None and now - self._checked_at < self._interval():
+                return
+            generation = get_generation(self.name)
+            if generation != self._generation:
+                self._rebuild(generation)
+            self._checked_at = now
+
+    def _rebuild(self, generation):
+        entries = {}
+        for entity_id, label, sort_key, tokens in self.loader():
+            entries[entity_id] = (label, sort_key, tuple(set(tokens)))
+        self._entries = entries
+        self._tokens = sorted((token, entity_id) for entity_id, (_, _, tokens) in entries.items() for token in tokens)
+        self._browse = sorted((sort_key, entity_id) for entity_id, (_, sort_key, _) in entries.items())
+        self._generation = generation
+
+    def invalidate(self):
+        """Drop the in-process copy; the next lookup rebuilds it."""
+        with self._lock:
+            self._generation = None
+
+    # -- incremental maintenance ----------------------------------------
+
+    def _remove(self, entity_id):
+        entry = self._entries.pop(entity_id, None)
+        if entry is None:
+            return
+        _, sort_key, tokens = entry
+        for token in tokens:
+            position = bisect_left(self._tokens, (token, entity_id))
+            if position < len(self._tokens) and self._tokens[position] == (token, entity_id):
+                del self._tokens[position]
+        position = bisect_left(self._browse, (sort_key, entity_id))
+        if position < len(self._browse) and self._browse[position] == (sort_key, entity_id):
+            del self._browse[position]
+
+    def _apply(self, ids):
+        ids = set(ids)
+        loaded = {entity_id: (label, sort_key, tuple(set(tokens)))
+                  for entity_id, label, sort_key, tokens in self.loader(ids=ids)}
+        for entity_id in ids:
+            self._remove(entity_id)
+        for entity_id, entry in loaded.items():
+            label, sort_key, tokens = entry
+            self._entries[entity_id] = entry
+            for token in tokens:
+                insort(self._tokens, (token, entity_id))
+            insort(self._browse, (sort_key, entity_id))
+
+    def refresh(self, ids):
+        """
+        Re-read `ids` once the current transaction commits and bump the shared
+        generation so other workers rebuild on their next check.
+        """
+        ids = {entity_id for entity_id in ids if entity_id is not None}
+        if ids:
+            transaction.on_commit(lambda: self._refresh_now(ids))
+
+    def changed(self):
+        """Signal a change that can't be applied incrementally (e.g. a bulk update)."""
+        transaction.on_commit(self._changed_now)
+
+    def _refresh_now(self, ids):
+        with self._lock:
+            generation = bump_generation(self.name)
+            if self._generation is not None and generation == self._generation + 1:
+                # Nobody else changed anything since our last build: patch in place
+                self._apply(ids)
+                self._generation = generation
+            else:
+                self._generation = None
+
+    def _changed_now(self):
+        with self._lock:
+            bump_generation(self.name)
+            self._generation = None
+
+    # -- lookups ---------------------------------------------------------
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        position = bisect_left(self._tokens, (prefix,))
+        tokens = self._tokens
+        while position < len(tokens) and tokens[position][0].startswith(prefix):
+            ids.add(tokens[position][1])
+            position += 1
+        return ids
+
+    def browse(self, limit):
+        """First `limit` entries in browse order, as (id, label) pairs."""
+        self._ensure_fresh()
+        with self._lock:
+            return [(entity_id, self._entries[entity_id][0]) for _, entity_id in self._browse[:limit]]
+
+    def search(self, terms, limit):
+        """
+        Entries that have a token starting with every term, best first.
+
+        Matches where the first term prefixes the entity's first token rank ahead
+        of the rest, then browse order decides.
+        """
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            matches = None
+            for term in sorted(terms, key=len, reverse=True):
+                ids = self._prefix_ids(term)
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return []
+            ranked = sorted(
+                matches,
+                key=lambda entity_id: (
+                    not self._entries[entity_id][0].casefold().startswith(terms[0]),
+                    self._entries[entity_id][1],
+                    entity_id,
+                ),
+            )
+            return [(entity_id, self._entries[entity_id][0]) for entity_id in ranked[:limit]]
@@ -0,0 +1,66 @@
+"""
+Fixtures shared by the apps' tests.
+
+Every app checks its endpoints against exact query budgets on the same
+generated data set; QueryBudgetTestCase holds that set-up, and seed() makes
+the data for other tests that need it.
+"""
+import math
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.test import TestCase
+
+from maintenance.benchmark import BENCHMARK_TOKEN, stubbed_auth
+from maintenance.fake_data import generate
+from .geo import EARTH_RADIUS_KM
+
+AUTH = {'HTTP_AUTHORIZATION': f'Bearer {BENCHMARK_TOKEN}'}
+# A budget must hold whatever the page size; paginated endpoints are checked at each
+PAGE_SIZES = [10, 100]
+
+
+def seed(scale):
+    """Generated data for 2025, the same on every run."""
+    generate(scale=scale, seed=0, start=datetime(2025, 1, 1, tzinfo=dt_timezone.utc),
+             end=datetime(2026, 1, 1, tzinfo=dt_timezone.utc), log=lambda message: None)
+
+
+def destination(latitude, longitude, bearing, km):
+    """The point `km` from (latitude, longitude) on the initial `bearing` (degrees), as (lat, lng)."""
+    lat1, lng1, bearing = math.radians(latitude), math.radians(longitude), math.radians(bearing)
+    angle = km / EARTH_RADIUS_KM
+    lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(bearing))
+    lng2 = lng1 + math.atan2(math.sin(bearing) * math.sin(angle) * math.cos(lat1),
+                             math.cos(angle) - math.sin(lat1) * math.sin(lat2))
+    return math.degrees(lat2), (math.degrees(lng2) + 540) % 360 - 180
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Base for each app's QueryBudgetTests: seeded data, the benchmark user
+    signed in, and assertBudget(). The user lookup counts as one query.
+    """
+    SCALE = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(cls.SCALE)
+
+    def setUp(self):
+        self.enterContext(stubbed_auth())
+
+    def assertBudget(self, budget, path, params):
+        """
+        GET `path` with `params` at each of PAGE_SIZES (once, for an explicit
+        page) in exactly `budget` queries, expecting a 200. Returns the responses.
+        """
+        # Explicit pages only exist at the page size they were computed for
+        variants = [params] if 'page' in params else [{**params, 'page_size': size} for size in PAGE_SIZES]
+        responses = []
+        for variant in variants:
+            with self.assertNumQueries(budget):
+                response = self.client.get(path, variant, **AUTH)
+            self.assertEqual(response.status_code, 200, response.content[:200])
+            responses.append(response)
+        return responses
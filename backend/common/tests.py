@@ -1,3 +1,573 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import math
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.backends.postgresql import base as postgresql
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from backend.db.base import DatabaseWrapper, stats as connection_stats
+from maintenance.benchmark import stubbed_auth
+from maintenance.models import BeepingAlarm, IssueType
+from .admin import EstimatedCountPaginator, LargeTableAdmin
+from .cache import bump_version, get_version
+from .directory import USER_DIRECTORY
+from .events import LocalBackend, PostgresNotifyBackend, get_event_bus
+from .generations import bump_generation
+from .geo import (EARTH_RADIUS_KM, MAX_COVER_CELLS, cell_size, covering_prefixes, encode_geohash, radius_bounds,
+                  split_antimeridian)
+from .kinde import KindeError, get_m2m_token
+from .loadtest import percentile, read_log, stub_identity_provider, summarize, url_name
+from .models import Job
+from .queue import JobHandler, Worker, claim, enqueue, metrics, requeue_stale, run_job
+from .testing import AUTH, destination, seed
+from .user_import import RateLimiter, UserImportError, import_users, read_users
+
+class AdminChangelistTests(TestCase):
+    # Session, user, count, rows and a little slack: anything per row blows through it
+    QUERY_BUDGET = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(200)
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@ghhs.local', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def changelist(self, model, params=None):
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        for model, model_admin in admin.site._registry.items():
+            with self.subTest(model.__name__):
+                self.assertLessEqual(self.changelist(model), self.QUERY_BUDGET)
+                if model_admin.search_fields:
+                    self.assertLessEqual(self.changelist(model, {'q': 'a'}), self.QUERY_BUDGET + 1)
+
+    def test_large_tables_skip_the_full_count(self):
+        for model, model_admin in admin.site._registry.items():
+            if isinstance(model_admin, LargeTableAdmin):
+                self.assertFalse(model_admin.show_full_result_count)
+                self.assertIs(model_admin.paginator, EstimatedCountPaginator)
+
+    def test_alarm_search_by_uid(self):
+        alarm = BeepingAlarm.objects.order_by('id').first()
+        url = reverse('admin:maintenance_beepingalarm_changelist')
+        response = self.client.get(url, {'q': str(alarm.uid)})
+        self.assertEqual(list(response.context['cl'].result_list), [alarm])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Row estimates come from pg_class')
+    def test_estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE maintenance_beepingalarm')
+        alarms = BeepingAlarm.objects.order_by('id')
+        with mock.patch.object(EstimatedCountPaginator, 'ESTIMATE_THRESHOLD', 0):
+            with CaptureQueriesContext(connection) as queries:
+                estimate = EstimatedCountPaginator(alarms, 50).count
+            self.assertNotIn('COUNT(', queries[0]['sql'])
+            self.assertEqual(estimate, alarms.count())
+            # Anything filtered is counted exactly
+            open_alarms = alarms.filter(is_completed=False)
+            self.assertEqual(EstimatedCountPaginator(open_alarms, 50).count, open_alarms.count())
+        # Small tables are always counted
+        self.assertEqual(EstimatedCountPaginator(alarms, 50).count, alarms.count())
+
+
+def _echo(context, value):
+    context.progress(1, 2, 'halfway')
+    return {'value': value}
+
+
+def _fail(context, error):
+    raise {'transient': ValueError('try again'), 'permanent': KindeError('rejected')}[error]
+
+
+TEST_HANDLERS = {
+    'test.echo': JobHandler('test.echo', _echo, 5),
+    'test.fail': JobHandler('test.fail', _fail, 2),
+}
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.dict('common.queue._handlers', TEST_HANDLERS))
+
+    def test_enqueue_claim_and_run(self):
+        job = enqueue('test.echo', {'value': 3})
+        with CaptureQueriesContext(connection) as queries:
+            claimed = claim('host:1:0')
+        self.assertTrue(any('FOR UPDATE SKIP LOCKED' in query['sql'] for query in queries))
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, Job.RUNNING, 1))
+        self.assertIsNone(claim('host:1:1'))
+
+        self.assertEqual(run_job(claimed), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.result, job.progress, job.progress_message), ({'value': 3}, 1, 'halfway'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unique_key_and_delay(self):
+        first = enqueue('test.echo', {'value': 1}, unique_key='k', delay=60)
+        self.assertEqual(enqueue('test.echo', {'value': 2}, unique_key='k').pk, first.pk)
+        self.assertIsNone(claim('host:1:0'))
+        Job.objects.filter(pk=first.pk).update(status=Job.SUCCEEDED)
+        self.assertNotEqual(enqueue('test.echo', {'value': 2}, unique_key='k').pk, first.pk)
+        with self.assertRaises(ValueError):
+            enqueue('test.missing')
+
+    def test_retries_with_backoff_then_fails(self):
+        job = enqueue('test.fail', {'error': 'transient'})
+        self.assertEqual(run_job(claim('host:1:0')), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.QUEUED, 'ValueError: try again'))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim('host:1:0'))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(run_job(claim('host:1:0')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_non_retryable_errors_fail_at_once(self):
+        enqueue('test.fail', {'error': 'permanent'})
+        self.assertEqual(run_job(claim('host:1:0')), Job.FAILED)
+
+    def test_stale_jobs_are_requeued(self):
+        job = enqueue('test.echo', {'value': 1})
+        claim('host:1:0')
+        self.assertEqual(requeue_stale(), 0)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.QUEUED, ''))
+        self.assertEqual(metrics()['retrying'], 1)
+
+
+class JobWorkerTests(TransactionTestCase):
+    def test_threads_run_each_job_once(self):
+        with mock.patch.dict('common.queue._handlers', TEST_HANDLERS):
+            for value in range(20):
+                enqueue('test.echo', {'value': value})
+            Worker(concurrency=4, burst=True, log=lambda message: None).run()
+        jobs = Job.objects.all()
+        self.assertEqual(set(jobs.values_list('status', flat=True)), {Job.SUCCEEDED})
+        self.assertEqual(sorted(job.result['value'] for job in jobs), list(range(20)))
+        self.assertEqual(set(jobs.values_list('attempts', flat=True)), {1})
+
+
+class ProvisionUserTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.dict('common.kinde._m2m_token', clear=True))
+        self.enterContext(stubbed_auth())
+        User.objects.filter(username='benchmark').update(is_staff=True)
+
+    def kinde(self, *responses):
+        return mock.patch('common.kinde.requests.post', side_effect=[
+            mock.Mock(status_code=code, json=mock.Mock(return_value=body), text='') for code, body in responses])
+
+    def test_provision_in_the_background(self):
+        response = self.client.post('/api/common/users/provision/', {'email': 'New@ghhs.local', 'first_name': 'New',
+                                                                     'last_name': 'Tech'}, **AUTH)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], response.data['url'])
+        job = Job.objects.get(pk=response.data['id'])
+        self.assertEqual(job.created_by.username, 'benchmark')
+
+        with self.settings(KINDE_CLIENT_ID_M2M='id', KINDE_CLIENT_SECRET_M2M='secret'):
+            with self.kinde((503, {}), (200, {'access_token': 't'}), (201, {'id': 'kp_1'})):
+                self.assertEqual(run_job(claim('host:1:0')), Job.QUEUED)
+                Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+                self.assertEqual(run_job(claim('host:1:0')), Job.SUCCEEDED)
+        self.assertTrue(User.objects.filter(username='new@ghhs.local', is_staff=False).exists())
+
+        response = self.client.get(f'/api/common/jobs/{job.pk}/', **AUTH)
+        self.assertEqual((response.data['status'], response.data['result']['kinde']), (Job.SUCCEEDED, 'created'))
+        metrics = self.client.get('/api/common/jobs/metrics/', **AUTH).data
+        self.assertEqual(metrics['succeeded_last_hour'], 1)
+
+    def test_staff_only_and_own_jobs(self):
+        job = Job.objects.create(kind='common.provision_user', created_by=User.objects.create(username='other'))
+        self.assertEqual(self.client.get(f'/api/common/jobs/{job.pk}/', **AUTH).status_code, 200)
+        User.objects.filter(username='benchmark').update(is_staff=False)
+        self.assertEqual(self.client.get(f'/api/common/jobs/{job.pk}/', **AUTH).status_code, 404)
+        self.assertEqual(self.client.get('/api/common/jobs/metrics/', **AUTH).status_code, 403)
+        response = self.client.post('/api/common/users/provision/', {'email': 'x@ghhs.local'}, **AUTH)
+        self.assertEqual(response.status_code, 403)
+
+    def test_superuser_flag(self):
+        def provision(email, superuser):
+            return self.client.post('/api/common/users/provision/', {'email': email, 'first_name': 'New',
+                                                                     'last_name': 'Tech', 'superuser': superuser},
+                                    content_type='application/json', **AUTH)
+
+        self.assertEqual(provision('a@ghhs.local', 'maybe').status_code, 400)
+        response = provision('b@ghhs.local', 'false')
+        self.assertEqual(response.status_code, 202)
+        self.assertIs(Job.objects.get(pk=response.data['id']).payload['superuser'], False)
+        # Staff who aren't superusers can't create one
+        self.assertEqual(provision('c@ghhs.local', True).status_code, 403)
+        self.assertEqual(provision('c@ghhs.local', 'true').status_code, 403)
+        User.objects.filter(username='benchmark').update(is_superuser=True)
+        response = provision('c@ghhs.local', 'true')
+        self.assertEqual(response.status_code, 202)
+        self.assertIs(Job.objects.get(pk=response.data['id']).payload['superuser'], True)
+
+
+class UserImportTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.dict('common.kinde._m2m_token', clear=True))
+        self.kinde = stub_identity_provider(port=0, throttle_every=7)
+        self.addCleanup(self.kinde.server_close)
+        self.addCleanup(self.kinde.shutdown)
+        threading.Thread(target=self.kinde.serve_forever, daemon=True).start()
+        self.enterContext(self.settings(KINDE_ISSUER_URL=f'http://127.0.0.1:{self.kinde.server_port}',
+                                        KINDE_CLIENT_ID_M2M='id', KINDE_CLIENT_SECRET_M2M='secret'))
+
+    def csv(self, count):
+        lines = ['Email,First_Name,Last_Name,Superuser'] + [
+            f'Tech{number}@Contractor.test,Tech,{number},{"yes" if number == 0 else ""}' for number in range(count)]
+        return io.StringIO('\n'.join(lines + ['tech1@contractor.test,Tech,1,', 'not-an-email,A,B,',
+                                             'extra@contractor.test,Extra,Field,,Oops']))
+
+    def test_import(self):
+        rows, problems = read_users(self.csv(30))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(len(problems), 3)
+        self.assertTrue(problems[-1].startswith('line 34: 1 more field(s)'))
+        self.kinde.kinde_users['tech3@contractor.test'] = {}
+        User.objects.create(username='tech4@contractor.test')
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = import_users(rows, workers=4, rate=0, log=lambda message: None)
+        self.assertEqual(summary, {'kinde_created': 29, 'kinde_existing': 1, 'django_created': 29,
+                                   'django_existing': 1, 'failed': {}})
+        # Throttled requests were retried, all on one token
+        self.assertGreater(self.kinde.user_requests, 30)
+        self.assertEqual(len(self.kinde.m2m_tokens), 1)
+        self.assertEqual(sum('INSERT INTO "auth_user"' in query['sql'] for query in queries), 1)
+
+        imported = User.objects.filter(username__endswith='@contractor.test')
+        self.assertEqual(imported.count(), 30)
+        self.assertEqual(list(imported.filter(is_superuser=True).values_list('username', flat=True)),
+                         ['tech0@contractor.test'])
+        self.assertFalse(imported.get(username='tech1@contractor.test').has_usable_password())
+
+    def test_failures_are_reported_and_skipped(self):
+        rows, _ = read_users(self.csv(3))
+        self.kinde.throttle_every = 1
+        summary = import_users(rows, workers=2, rate=0, retries=1, log=lambda message: None)
+        self.assertEqual(len(summary['failed']), 3)
+        self.assertFalse(User.objects.filter(username__endswith='@contractor.test').exists())
+
+    def test_missing_columns(self):
+        with self.assertRaises(UserImportError):
+            read_users(io.StringIO('email,name\na@b.test,A B\n'))
+
+    def test_token_is_cached_until_rejected(self):
+        token = get_m2m_token()
+        self.assertEqual(get_m2m_token(), token)
+        self.assertEqual(len(self.kinde.m2m_tokens), 1)
+        replacement = get_m2m_token(stale=token)
+        self.assertNotEqual(replacement, token)
+        self.assertEqual(get_m2m_token(stale=token), replacement)
+
+    def test_rate_limiter_spaces_calls(self):
+        limiter = RateLimiter(50)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+class DatabaseBackendTests(TestCase):
+    def wrapper(self, **settings_dict):
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'CONNECT_RETRY_BACKOFF': 0, **settings_dict},
+                                  alias=connection.alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def failing_connect(self, message, failures):
+        connect = postgresql.Database.connect
+        calls = []
+
+        def flaky(*args, **kwargs):
+            calls.append(message)
+            if len(calls) <= failures:
+                raise postgresql.Database.OperationalError(message)
+            return connect(*args, **kwargs)
+        self.enterContext(mock.patch.object(postgresql.Database, 'connect', flaky))
+        return calls
+
+    def test_cold_start_is_retried(self):
+        calls = self.failing_connect('connection to server failed: timeout expired', 2)
+        before = connection_stats.snapshot()
+        wrapper = self.wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        after = connection_stats.snapshot()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(after['connect_retries'] - before['connect_retries'], 2)
+        self.assertEqual(after['opened'] - before['opened'], 1)
+
+    def test_retries_are_bounded(self):
+        calls = self.failing_connect('connection to server failed: Connection refused', 10)
+        with self.assertRaises(OperationalError):
+            self.wrapper(CONNECT_RETRIES=2).ensure_connection()
+        self.assertEqual(len(calls), 3)
+
+    def test_bad_credentials_are_not_retried(self):
+        calls = self.failing_connect('FATAL: password authentication failed for user "x"', 10)
+        before = connection_stats.snapshot()['connect_failures']
+        with self.assertRaises(OperationalError):
+            self.wrapper().ensure_connection()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(connection_stats.snapshot()['connect_failures'], before + 1)
+
+    def test_health_check_failures_are_counted(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        self.assertTrue(wrapper.is_usable())
+        before = connection_stats.snapshot()['health_check_failures']
+        wrapper.connection.close()
+        self.assertFalse(wrapper.is_usable())
+        self.assertEqual(connection_stats.snapshot()['health_check_failures'], before + 1)
+
+    def test_keep_warm_and_metrics(self):
+        output = io.StringIO()
+        call_command('keep_db_warm', '--once', stdout=output)
+        self.assertIn('Ping', output.getvalue())
+
+        self.enterContext(stubbed_auth())
+        self.assertEqual(self.client.get('/api/common/db/metrics/', **AUTH).status_code, 403)
+        User.objects.filter(username='benchmark').update(is_staff=True)
+        response = self.client.get('/api/common/db/metrics/', **AUTH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['engine'], connection.settings_dict['ENGINE'])
+        self.assertIn('connect_retries', response.data['process'])
+
+
+class UserDirectoryTests(TestCase):
+    PATH = '/api/common/users/'
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(stubbed_auth())
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.PATH, **AUTH, **headers)
+
+    def usernames(self, response):
+        return {user['username'] for user in response.json()}
+
+    def test_saves_invalidate_the_directory_and_etag(self):
+        first = self.get()
+        self.assertEqual(self.get(first['ETag']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username='newtech', first_name='New')
+        second = self.get(first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertIn('newtech', self.usernames(second))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(username='newtech').get().delete()
+        self.assertNotIn('newtech', self.usernames(self.get()))
+
+    def test_version_is_shared_through_the_database(self):
+        first = self.get()
+        # Another worker's write: no signal here, only the shared version moves
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO auth_user (username, first_name, last_name, email, password, is_staff, "
+                           "is_superuser, is_active, date_joined) VALUES ('elsewhere', 'Else', 'Where', '', '!', "
+                           "false, false, true, now())")
+        self.assertEqual(self.get(first['ETag']).status_code, 304)
+        bump_generation(USER_DIRECTORY)
+        second = self.get(first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertIn('elsewhere', self.usernames(second))
+
+        # Clearing (or losing) the cache does not reset versions
+        version = bump_version(USER_DIRECTORY)
+        cache.clear()
+        self.assertEqual(get_version(USER_DIRECTORY), version)
+
+    def test_rolled_back_bump_is_not_reused(self):
+        self.get()
+        try:
+            with transaction.atomic():
+                User.objects.create(username='rolledback')
+                rolled_back = bump_version(USER_DIRECTORY)
+                self.assertIn('rolledback', self.usernames(self.get()))
+                raise ValueError
+        except ValueError:
+            pass
+        # The next bump gets the same number, but must not find the rolled-back directory
+        self.assertNotEqual(bump_version(USER_DIRECTORY), rolled_back)
+        self.assertNotIn('rolledback', self.usernames(self.get()))
+
+
+class ReferenceDataTests(TestCase):
+    PATH = '/api/common/reference-data/'
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(stubbed_auth())
+
+    def test_etag_and_invalidation(self):
+        first = self.client.get(self.PATH, **AUTH)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('max-age=', first['Cache-Control'])
+        body = json.loads(first.content)
+        self.assertEqual({status['value'] for status in body['statuses']},
+                         {value for value, _ in BeepingAlarm.STATUS_CHOICES})
+        self.assertEqual(self.client.get(self.PATH, HTTP_IF_NONE_MATCH=first['ETag'], **AUTH).status_code, 304)
+        self.assertEqual(self.client.get(self.PATH, HTTP_IF_NONE_MATCH=f'"other", {first["ETag"]}', **AUTH).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            IssueType.objects.create(name='Zz new issue type')
+        second = self.client.get(self.PATH, HTTP_IF_NONE_MATCH=first['ETag'], **AUTH)
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(json.loads(second.content)['issue_types'][-1]['name'], 'Zz new issue type')
+
+    def test_etag_hashes_the_body(self):
+        response = self.client.get(self.PATH, **AUTH)
+        self.assertEqual(response['ETag'], f'"{hashlib.sha1(response.content).hexdigest()}"')
+
+
+class LoadTestTests(TestCase):
+    def write_log(self, lines):
+        handle = self.enterContext(tempfile.NamedTemporaryFile('w', suffix='.jsonl'))
+        handle.write('\n'.join(lines) + '\n')
+        handle.flush()
+        return handle.name
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(10, 0, -1))
+        self.assertEqual(percentile(values, 50), 5)
+        self.assertEqual(percentile(values, 90), 9)
+        self.assertEqual(percentile(values, 95), 10)
+        self.assertEqual(percentile(values, 100), 10)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile([7.5], 99), 7.5)
+
+    def test_read_log(self):
+        path = self.write_log([
+            json.dumps({'ts': 105.5, 'method': 'get', 'path': '/api/common/users/', 'user': 'u2'}),
+            json.dumps({'ts': 100, 'method': 'POST', 'path': '/api/maintenance/beeping_alarms/'}),
+            '',
+            json.dumps({'ts': 101.25, 'path': '/api/maintenance/beeping_alarms/', 'query': 'page=2'}),
+            json.dumps({'ts': 103, 'method': 'DELETE', 'path': '/api/maintenance/beeping_alarms/1/'}),
+            json.dumps({'ts': 102, 'method': 'HEAD', 'path': '/api/common/reference-data/'}),
+        ])
+        entries, skipped = read_log(path)
+        self.assertEqual(skipped, 2)
+        # Oldest first, timed from the first replayed request
+        self.assertEqual([entry['at'] for entry in entries], [0, 0.75, 4.25])
+        self.assertEqual([entry['method'] for entry in entries], ['GET', 'HEAD', 'GET'])
+        self.assertEqual(entries[0]['query'], 'page=2')
+        self.assertIsNone(entries[0]['user'])
+        self.assertEqual(entries[2]['user'], 'u2')
+
+        entries, _ = read_log(path, limit=2)
+        self.assertEqual([entry['path'] for entry in entries],
+                         ['/api/maintenance/beeping_alarms/', '/api/common/reference-data/'])
+        self.assertEqual(read_log(self.write_log([])), ([], 0))
+
+    def test_summarize(self):
+        results = [{'name': 'reference_data', 'status': 200, 'ms': ms, 'lag_ms': 0, 'bytes': 100}
+                   for ms in range(1, 11)]
+        results += [{'name': 'beeping_alarms', 'status': 503, 'ms': 50, 'lag_ms': 20, 'bytes': 10},
+                    {'name': 'beeping_alarms', 'status': 'ConnectTimeout', 'ms': 30, 'lag_ms': 0, 'bytes': 0}]
+        summary = summarize(results, elapsed=4)
+        self.assertEqual(summary['requests'], 12)
+        self.assertEqual(summary['errors'], 2)
+        self.assertEqual(summary['error_rate'], round(2 / 12, 4))
+        self.assertEqual(summary['throughput_rps'], 3)
+        self.assertEqual(summary['bytes'], 1010)
+        self.assertEqual(summary['max_ms'], 50)
+        self.assertEqual(summary['lag_p95_ms'], 20)
+        self.assertEqual(summary['statuses'], {'200': 10, '503': 1, 'ConnectTimeout': 1})
+        self.assertEqual(list(summary['endpoints']), ['beeping_alarms', 'reference_data'])
+        self.assertEqual(summary['endpoints']['reference_data']['p50_ms'], 5)
+        self.assertEqual(summary['endpoints']['reference_data']['p90_ms'], 9)
+        self.assertEqual(summary['endpoints']['reference_data']['errors'], 0)
+        self.assertEqual(summary['endpoints']['beeping_alarms']['error_rate'], 1)
+        self.assertEqual(summarize([], elapsed=0), {'requests': 0, 'elapsed_s': 0, 'endpoints': {}})
+
+    def test_url_name(self):
+        self.assertEqual(url_name('/api/common/reference-data/'), 'reference_data')
+        self.assertEqual(url_name('/not/a/route/'), 'unresolved')
+
+
+class EventBusTests(TestCase):
+    def test_local_backend_is_the_default(self):
+        self.assertIsInstance(get_event_bus().backend, LocalBackend)
+
+    def test_notify_backend_refuses_to_listen_through_a_pooler(self):
+        pooler = 'ep-example-123456-pooler.ap-southeast-2.aws.neon.tech'
+        with mock.patch.dict(connection.settings_dict, {'HOST': pooler}):
+            with self.assertRaises(ImproperlyConfigured):
+                PostgresNotifyBackend()
+            with override_settings(EVENT_BUS_LISTEN_HOST='ep-example-123456.ap-southeast-2.aws.neon.tech'):
+                params = PostgresNotifyBackend().listen_params()
+        self.assertEqual(params['host'], 'ep-example-123456.ap-southeast-2.aws.neon.tech')
+        self.assertEqual(params['dbname'], connection.settings_dict['NAME'])
+
+
+class GeoTests(TestCase):
+    def test_prefixes_cover_edges_and_corners(self):
+        height, width = cell_size(6)
+        # Boxes with edges on cell boundaries, at the poles and along the antimeridian
+        boxes = [(-27.5, 153.0, -27.4, 153.1), (height * 3, width * 5, height * 7, width * 9),
+                 (-90.0, -180.0, -89.9, 180.0), (89.95, -10.0, 90.0, 10.0), (-18.0, 179.9, -17.0, 180.0),
+                 (-18.0, -180.0, -17.0, -179.9)]
+        for south, west, north, east in boxes:
+            with self.subTest(box=(south, west, north, east)):
+                prefixes = covering_prefixes(south, west, north, east)
+                self.assertLessEqual(len(prefixes), MAX_COVER_CELLS)
+                for fraction_lat in (0, 0.25, 0.5, 1):
+                    for fraction_lng in (0, 0.5, 0.75, 1):
+                        geohash = encode_geohash(south + (north - south) * fraction_lat,
+                                                 west + (east - west) * fraction_lng)
+                        self.assertTrue(geohash.startswith(tuple(prefixes)), geohash)
+
+    def test_radius_bounds_contain_the_circle(self):
+        for latitude, longitude, radius in [(-27.47, 153.03, 100), (60.0, 10.0, 100), (85.0, 0.0, 50),
+                                            (-17.7, 179.99, 5), (-17.7, -179.99, 5)]:
+            with self.subTest(latitude=latitude, longitude=longitude, radius=radius):
+                south, west, north, east = radius_bounds(latitude, longitude, radius)
+                for bearing in range(0, 360, 5):
+                    lat, lng = destination(latitude, longitude, bearing, radius)
+                    self.assertTrue(south <= lat <= north)
+                    self.assertTrue(any(box_west <= lng <= box_east
+                                        for _, box_west, _, box_east in split_antimeridian(south, west, north, east)))
+
+    def test_radius_bounds_at_the_antimeridian_and_poles(self):
+        south, west, north, east = radius_bounds(-17.7, 179.99, 5)
+        self.assertGreater(west, east)
+        self.assertEqual(split_antimeridian(south, west, north, east),
+                         [(south, west, north, 180.0), (south, -180.0, north, east)])
+        self.assertEqual(radius_bounds(89.99, 45.0, 5)[1:], (-180.0, 90.0, 180.0))
+        self.assertEqual(radius_bounds(-89.99, 45.0, 5)[::2], (-90.0, -89.99 + math.degrees(5 / EARTH_RADIUS_KM)))
+        self.assertEqual(radius_bounds(-89.99, 45.0, 5)[1::2], (-180.0, 180.0))
@@ -0,0 +1,135 @@
+"""
+Online conversion of the `uid` CharField(100) columns to native uuid.
+
+A plain AlterField makes PostgreSQL rewrite the whole table under an ACCESS
+EXCLUSIVE lock. On PostgreSQL this instead:
+
+1. adds a nullable uuid column, kept in step with `uid` by a trigger so rows
+   written during the conversion are covered;
+2. backfills it in primary key batches, one short transaction each;
+3. validates a NOT VALID `IS NOT NULL` check (doesn't block writes) and builds
+   the unique index CONCURRENTLY;
+4. swaps the columns in one short transaction: SET NOT NULL is proved by the
+   check without a scan, dropping the old column is a catalog change;
+5. vacuums the table, since the backfill left a dead tuple per row.
+
+Every step is idempotent, so a migration that fails half way (e.g. on the
+swap's lock timeout) can simply be run again. Other databases just alter the
+column. Migrations using this must set `atomic = False`.
+"""
+import uuid
+
+from django.db import migrations, models, transaction
+
+UID_BATCH_SIZE = 10000
+
+# Give up on the swap rather than queue behind a long transaction while
+# blocking every other query on the table
+SWAP_LOCK_TIMEOUT = '5s'
+
+UUID_PATTERN = r'^\{?[0-9a-fA-F]{8}-?([0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12}\}?$'
+
+
+def _uuid_field(model):
+    field = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    field.set_attributes_from_name('uid')
+    field.model = model
+    return field
+
+
+def _convert(schema_editor, model, batch_size):
+    connection = schema_editor.connection
+    qn = schema_editor.quote_name
+    table = model._meta.db_table
+    temp_column = 'uid_uuid'
+    function = qn(f'{table}_uid_uuid_sync')
+    check = qn(f'{table}_uid_uuid_not_null')
+    temp_index = qn(f'{table}_uid_uuid_uniq')
+    constraint = qn(schema_editor._create_index_name(table, ['uid'], suffix='_uniq'))
+    table = qn(table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT data_type FROM information_schema.columns WHERE table_name = %s AND column_name = 'uid'",
+            [model._meta.db_table],
+        )
+        if cursor.fetchone()[0] == 'uuid':
+            return
+
+        cursor.execute(f'SELECT count(*) FROM {table} WHERE uid !~ %s', [UUID_PATTERN])
+        invalid = cursor.fetchone()[0]
+        if invalid:
+            raise ValueError(f'{model._meta.db_table}: {invalid} uid values are not UUIDs; fix them and rerun')
+
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {temp_column} uuid NULL')
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+            BEGIN
+                NEW.{temp_column} := NEW.uid::uuid;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute(f'DROP TRIGGER IF EXISTS {function} ON {table}')
+        cursor.execute(f'CREATE TRIGGER {function} BEFORE INSERT OR UPDATE OF uid ON {table} '
+                       f'FOR EACH ROW EXECUTE FUNCTION {function}()')
+
+        # Rows after `high` were written since the trigger went in
+        cursor.execute(f'SELECT min(id), max(id) FROM {table}')
+        low, high = cursor.fetchone()
+        if low is not None:
+            for start in range(low - 1, high, batch_size):
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute(
+                        f'UPDATE {table} SET {temp_column} = uid::uuid '
+                        f'WHERE id > %s AND id <= %s AND {temp_column} IS NULL',
+                        [start, start + batch_size],
+                    )
+
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}')
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({temp_column} IS NOT NULL) NOT VALID')
+        cursor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {check}')
+
+        # A failed concurrent build leaves an invalid index behind
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {temp_index}')
+        cursor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {temp_index} ON {table} ({temp_column})')
+
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+            cursor.execute(f'ALTER TABLE {table} ALTER COLUMN {temp_column} SET NOT NULL')
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {check}')
+            cursor.execute(f'DROP TRIGGER {function} ON {table}')
+            cursor.execute(f'DROP FUNCTION {function}()')
+            cursor.execute(f'ALTER TABLE {table} DROP COLUMN uid')
+            cursor.execute(f'ALTER TABLE {table} RENAME COLUMN {temp_column} TO uid')
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {constraint} UNIQUE USING INDEX {temp_index}')
+
+        # The backfill left a dead tuple per row; make the space reusable now
+        cursor.execute(f'VACUUM (ANALYZE) {table}')
+
+
+def convert_uid_to_uuid(app_label, model_name, batch_size=UID_BATCH_SIZE):
+    """Migration operation turning `model_name.uid` into a unique UUIDField."""
+
+    def forwards(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        if schema_editor.connection.vendor == 'postgresql':
+            _convert(schema_editor, model, batch_size)
+        else:
+            schema_editor.alter_field(model, model._meta.get_field('uid'), _uuid_field(model))
+
+    def backwards(apps, schema_editor):
+        # Rolling back is rare enough to accept a table rewrite
+        model = apps.get_model(app_label, model_name)
+        schema_editor.alter_field(model, _uuid_field(model), model._meta.get_field('uid'))
+
+    return migrations.SeparateDatabaseAndState(
+        database_operations=[migrations.RunPython(forwards, backwards)],
+        state_operations=[
+            migrations.AlterField(
+                model_name=model_name,
+                name='uid',
+                field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+            ),
+        ],
+    )
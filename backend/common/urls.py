@@ -3,4 +3,9 @@ from . import views
 
 urlpatterns = [
     path('users/', views.get_users, name='get_users'),
+    path('reference-data/', views.reference_data, name='reference_data'),
+    path('users/provision/', views.provision_user, name='provision_user'),
+    path('jobs/metrics/', views.job_metrics, name='job_metrics'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('db/metrics/', views.db_metrics, name='db_metrics'),
 ]
@@ -0,0 +1,183 @@
+"""
+Bulk onboarding: users from a CSV into Kinde and then Django (import_users command).
+
+The CSV needs email, first_name and last_name columns; an optional superuser
+column (true/yes/1) makes that user staff and superuser. Kinde accounts are
+created concurrently from a bounded thread pool. The pool shares the cached
+M2M token, one keep-alive session and a rate limiter. Network errors, 429s
+and 5xx responses are retried with jittered backoff, and a 429 pauses every
+thread for its Retry-After. Django users are then created in one
+bulk_create, but only for the rows Kinde accepted. Emails already
+registered in Kinde count as accepted, so a partly failed import can simply
+be run again.
+
+Point KINDE_ISSUER_URL at `manage.py stub_identity_provider` to try an
+import without touching Kinde.
+"""
+import csv
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import requests
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from requests.adapters import HTTPAdapter
+
+from .kinde import KindeError, create_django_users, create_kinde_user, get_m2m_token
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ('email', 'first_name', 'last_name')
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+DEFAULT_WORKERS = 8
+# Kinde Management API requests per second, across all workers
+DEFAULT_RATE = 5
+DEFAULT_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+
+
+class UserImportError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ImportRow:
+    line: int
+    email: str
+    first_name: str
+    last_name: str
+    superuser: bool
+
+
+def read_users(handle, superuser=False):
+    """
+    Parse a CSV file object into ImportRows. Returns (rows, problems), where
+    problems lists invalid, over-long and repeated lines; a missing column raises.
+    """
+    reader = csv.DictReader(handle)
+    columns = {name.strip().lower() for name in reader.fieldnames or ()}
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise UserImportError(f"CSV is missing column(s): {', '.join(missing)}")
+
+    rows, problems, seen = [], [], set()
+    for record in reader:
+        line = reader.line_num
+        # DictReader collects fields beyond the header under None
+        extra = record.pop(None, None)
+        if extra:
+            problems.append(f'line {line}: {len(extra)} more field(s) than the header')
+            continue
+        record = {key.strip().lower(): (value or '').strip() for key, value in record.items()}
+        email = record['email'].lower()
+        try:
+            validate_email(email)
+        except ValidationError:
+            problems.append(f'line {line}: invalid email {email!r}')
+            continue
+        if not record['first_name'] or not record['last_name']:
+            problems.append(f'line {line}: first_name and last_name are required')
+            continue
+        if email in seen:
+            problems.append(f'line {line}: {email} is listed more than once')
+            continue
+        seen.add(email)
+        rows.append(ImportRow(line, email, record['first_name'], record['last_name'],
+                              superuser or record.get('superuser', '').lower() in TRUE_VALUES))
+    return rows, problems
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads; pause() holds them all back."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+def backoff(attempt):
+    """Seconds before retry `attempt` (from 0): 0.5s, 1s, 2s... with full jitter."""
+    return random.uniform(0, min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX))
+
+
+def _create_in_kinde(row, session, limiter, retries):
+    token = get_m2m_token()
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return create_kinde_user(row.email, row.first_name, row.last_name, token, session=session)
+        except KindeError as error:
+            if attempt == retries:
+                raise
+            if error.status_code == 401:
+                token = get_m2m_token(stale=token)
+                continue
+            if not error.retryable:
+                raise
+            delay = error.retry_after if error.retry_after is not None else backoff(attempt)
+            if error.status_code == 429:
+                limiter.pause(delay)
+            logger.info(f'Retrying {row.email} in {delay:.1f}s: {error}')
+            time.sleep(delay)
+
+
+def import_users(rows, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, retries=DEFAULT_RETRIES, log=logger.info):
+    """
+    Create `rows` in Kinde concurrently, then in Django in one bulk insert.
+    Returns counts plus {email: error} for the rows Kinde did not accept.
+    """
+    summary = {'kinde_created': 0, 'kinde_existing': 0, 'django_created': 0, 'django_existing': 0, 'failed': {}}
+    if not rows:
+        return summary
+    # Bad credentials fail here, once, rather than in every thread
+    get_m2m_token()
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    limiter = RateLimiter(rate)
+    accepted = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_create_in_kinde, row, session, limiter, retries): row for row in rows}
+            for done, future in enumerate(as_completed(futures), 1):
+                row = futures[future]
+                try:
+                    response = future.result()
+                except KindeError as error:
+                    summary['failed'][row.email] = str(error)
+                    log(f'Line {row.line}: {error}')
+                    continue
+                existing = response.get('status') == 'exists'
+                summary['kinde_existing' if existing else 'kinde_created'] += 1
+                accepted.append(row)
+                if done % 50 == 0:
+                    log(f'Kinde: {done}/{len(rows)} done')
+    finally:
+        session.close()
+
+    accepted.sort(key=lambda row: row.line)
+    created = create_django_users([(row.email, row.first_name, row.last_name, row.superuser) for row in accepted])
+    summary['django_created'] = len(created)
+    summary['django_existing'] = len(accepted) - len(created)
+    return summary
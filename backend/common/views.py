@@ -1,9 +1,22 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection
+from django.http import HttpResponse
+from django.urls import reverse
 from django.shortcuts import render
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from django.contrib.auth.models import User
-from common.serializer import UserSerializer  
+from rest_framework import status
 from backend.authentication import validate_kinde_token
+from backend.db.base import stats as connection_stats
+from common.cache import etag_matches, make_etag
+from common.directory import filter_users, get_user_directory
+from common.filters import BooleanFilter
+from common.models import Job
+from common.pagination import CustomPageNumberPagination
+from common.queue import enqueue, metrics
+from common.reference import get_reference_data
 
 # Create your views here.
 
@@ -13,7 +26,158 @@ def get_users(request):
     """
     Get active users that can be allocated to tasks/items.
     Can be used across different parts of the application.
+
+    Served from the cached user directory with an ETag. Optional `q` filters by
+    name/username/email prefix; passing `page` or `page_size` returns a paginated
+    response instead of a plain list.
+    """
+    version, users = get_user_directory()
+    search = request.query_params.get('q', '').strip()
+    paginate = 'page' in request.query_params or 'page_size' in request.query_params
+
+    etag = make_etag('users', version, search, request.query_params.get('page'),
+                     request.query_params.get('page_size'))
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    users = filter_users(users, search)
+    if paginate:
+        paginator = CustomPageNumberPagination()
+        page = paginator.paginate_queryset(users, request)
+        response = paginator.get_paginated_response(page)
+    else:
+        response = Response(users)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+@api_view(['GET'])
+@validate_kinde_token
+def reference_data(request):
+    """
+    Issue types, alarm statuses and the assets catalog in one response.
+
+    The body is built once per change to any of those models and reused by every
+    request; browsers may keep it for REFERENCE_DATA_MAX_AGE seconds and then
+    revalidate with If-None-Match.
+    """
+    bundle = get_reference_data()
+    max_age = getattr(settings, 'REFERENCE_DATA_MAX_AGE', 3600)
+    headers = {'ETag': bundle['etag'], 'Cache-Control': f'private, max-age={max_age}'}
+
+    if etag_matches(request, bundle['etag']):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response = HttpResponse(bundle['body'], content_type='application/json')
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def job_data(request, job):
+    """What a client polling a job needs; the result only once it has succeeded."""
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'progress_message': job.progress_message,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_after': job.run_after,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'result': job.result if job.status == Job.SUCCEEDED else None,
+        'error': job.error,
+        'url': request.build_absolute_uri(reverse('job_status', args=[job.pk])),
+    }
+
+
+def job_accepted(request, job):
+    """202 pointing at the job's status endpoint."""
+    data = job_data(request, job)
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+
+@api_view(['GET'])
+@validate_kinde_token
+def job_status(request, job_id):
+    """Status and progress of a background job, for the user who started it (or staff)."""
+    job = Job.objects.filter(pk=job_id).first()
+    if job is None or not (request.user.is_staff or job.created_by_id == request.user.pk):
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_data(request, job))
+
+
+@api_view(['GET'])
+@validate_kinde_token
+def job_metrics(request):
+    """Queue depth, lag, throughput and durations of background jobs (staff only)."""
+    if not request.user.is_staff:
+        return Response({'error': 'Staff only'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(metrics())
+
+
+@api_view(['POST'])
+@validate_kinde_token
+def provision_user(request):
+    """
+    Create a Kinde account and Django user for `email` in the background (staff
+    only; `superuser` true needs a superuser).
+
+    Returns 202 and the job; the same email is not queued twice while pending.
+    """
+    if not request.user.is_staff:
+        return Response({'error': 'Staff only'}, status=status.HTTP_403_FORBIDDEN)
+    email = str(request.data.get('email', '')).strip().lower()
+    first_name = str(request.data.get('first_name', '')).strip()
+    last_name = str(request.data.get('last_name', '')).strip()
+    try:
+        validate_email(email)
+    except ValidationError:
+        return Response({'error': 'A valid email is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not first_name or not last_name:
+        return Response({'error': 'first_name and last_name are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    superuser = request.data.get('superuser', False)
+    if not isinstance(superuser, bool):
+        superuser = BooleanFilter.VALUES.get(str(superuser).strip().lower())
+        if superuser is None:
+            return Response({'error': 'superuser must be true or false'}, status=status.HTTP_400_BAD_REQUEST)
+    # Staff can add technicians, but only a superuser can create another one
+    if superuser and not request.user.is_superuser:
+        return Response({'error': 'Only superusers can create superusers'}, status=status.HTTP_403_FORBIDDEN)
+
+    payload = {'email': email, 'first_name': first_name, 'last_name': last_name, 'superuser': superuser}
+    job = enqueue('common.provision_user', payload, unique_key=email, user=request.user)
+    return job_accepted(request, job)
+
+
+@api_view(['GET'])
+@validate_kinde_token
+def db_metrics(request):
+    """
+    Database connection metrics (staff only): this process's connects,
+    retries and health check failures, the psycopg pool's counters when
+    DB_POOL is on, and the server's connections by state.
     """
-    users = User.objects.filter(is_active=True).order_by('first_name')
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    if not request.user.is_staff:
+        return Response({'error': 'Staff only'}, status=status.HTTP_403_FORBIDDEN)
+    settings_dict = connection.settings_dict
+    pool = getattr(connection, 'pool', None)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(state, \'unknown\'), count(*) FROM pg_stat_activity '
+                       'WHERE datname = current_database() GROUP BY 1')
+        server = dict(cursor.fetchall())
+    return Response({
+        'engine': settings_dict['ENGINE'],
+        'conn_max_age': settings_dict['CONN_MAX_AGE'],
+        'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+        'process': connection_stats.snapshot(),
+        'pool': pool.get_stats() if pool is not None else None,
+        'server_connections': server,
+    })
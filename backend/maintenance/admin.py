@@ -1,6 +1,89 @@
+import uuid
+
 from django.contrib import admin
-from .models import IssueType
+from backend.authentication import acting_as
+from common.admin import LargeTableAdmin
+from .models import (ArchivedBeepingAlarm, ArchivedBeepingAlarmUpdate, BeepingAlarm, BeepingAlarmTombstone,
+                     BeepingAlarmUpdate, IssueType)
 
 @admin.register(IssueType)
 class IssueTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'description')
+    search_fields = ('name',)
+
+@admin.register(BeepingAlarm)
+class BeepingAlarmAdmin(LargeTableAdmin):
+    list_display = ('id', 'status', 'property', 'issue_type', 'is_customer_contacted', 'is_completed',
+                    'is_cancelled', 'created_at')
+    list_filter = ('status', 'is_customer_contacted', 'is_completed', 'is_cancelled')
+    list_select_related = ('property', 'issue_type')
+    autocomplete_fields = ('property', 'agency', 'private_owner', 'tenant', 'allocation', 'issue_type')
+    readonly_fields = ('uid', 'created_at', 'updated_at')
+    # Through the indexed property address columns, then properties' alarms by foreign key
+    search_fields = ('^property__street_number', '^property__street_name', '^property__suburb')
+    ordering = ('-id',)
+
+    def changeform_view(self, request, *args, **kwargs):
+        # Alarm history credits the admin user with the edit
+        with acting_as(request.user):
+            return super().changeform_view(request, *args, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        """A uid (as copied from the app) finds its alarm; anything else searches addresses."""
+        try:
+            return queryset.filter(uid=uuid.UUID(search_term.strip())), False
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
+
+@admin.register(BeepingAlarmUpdate)
+class BeepingAlarmUpdateAdmin(LargeTableAdmin):
+    list_display = ('beeping_alarm', 'status', 'date', 'update_by')
+    list_filter = ('status',)
+    list_select_related = ('beeping_alarm', 'update_by')
+    autocomplete_fields = ('beeping_alarm', 'update_by')
+    ordering = ('-id',)
+
+@admin.register(BeepingAlarmTombstone)
+class BeepingAlarmTombstoneAdmin(LargeTableAdmin):
+    """Read only: tombstones are written by signals and pruned by prune_alarm_tombstones."""
+    list_display = ('alarm_id', 'uid', 'deleted_at')
+    ordering = ('-deleted_at', '-id')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class ReadOnlyArchiveAdmin(LargeTableAdmin):
+    """Archived rows are written by archive_alarms only."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedBeepingAlarm)
+class ArchivedBeepingAlarmAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('id', 'status', 'property', 'issue_type', 'created_at', 'archived_at')
+    list_filter = ('status',)
+    list_select_related = ('property', 'issue_type')
+    search_fields = ('uid',)
+    ordering = ('-id',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Archived alarms are looked up by exact uid only."""
+        if not search_term.strip():
+            return queryset, False
+        try:
+            return queryset.filter(uid=uuid.UUID(search_term.strip())), False
+        except ValueError:
+            return queryset.none(), False
+
+@admin.register(ArchivedBeepingAlarmUpdate)
+class ArchivedBeepingAlarmUpdateAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('beeping_alarm', 'status', 'date', 'update_by')
+    list_filter = ('status',)
+    list_select_related = ('beeping_alarm', 'update_by')
+    ordering = ('-id',)
@@ -0,0 +1,253 @@
+"""
+Time-in-status analytics for beeping alarms.
+
+An alarm starts life at its created_at in the status of its creation row (the
+BeepingAlarmUpdate with changes {'status': [None, status]}, see
+maintenance.audit), or in 'new' when it has none, and each BeepingAlarmUpdate
+row records the status the alarm moved into. The spans between those events are
+computed in the database with LAG/LEAD window functions so we never walk the
+history table in Python. Archived alarms and their history (maintenance.archive)
+are read alongside the working tables.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from properties.models import Agency
+from .models import ArchivedBeepingAlarm, ArchivedBeepingAlarmUpdate, BeepingAlarm, BeepingAlarmUpdate
+
+logger = logging.getLogger(__name__)
+
+# Statuses management asked about by default - the ones where an alarm is waiting on us
+SLA_STATUSES = ['new', 'requires_call_back', 'to_be_scheduled']
+
+CACHE_KEY_PREFIX = 'maintenance:time_in_status'
+
+
+def _both(working, archived, columns):
+    """Rows of a working table and its archive counterpart, as one FROM item."""
+    return (f'(SELECT {columns} FROM {working._meta.db_table} '
+            f'UNION ALL SELECT {columns} FROM {archived._meta.db_table})')
+
+
+def _all_alarms():
+    return _both(BeepingAlarm, ArchivedBeepingAlarm, 'id, created_at, agency_id')
+
+
+def _all_updates():
+    return _both(BeepingAlarmUpdate, ArchivedBeepingAlarmUpdate, 'beeping_alarm_id, status, date, changes')
+
+
+def _all_allocations():
+    working = BeepingAlarm._meta.get_field('allocation')
+    archived = ArchivedBeepingAlarm._meta.get_field('allocation')
+    return (f'(SELECT {working.m2m_column_name()} AS alarm_id, {working.m2m_reverse_name()} AS user_id '
+            f'FROM {working.m2m_db_table()} UNION ALL '
+            f'SELECT {archived.m2m_column_name()}, {archived.m2m_reverse_name()} FROM {archived.m2m_db_table()})')
+
+
+def _spans_sql(alarm_id=None):
+    """
+    Build the CTE that turns the history table into status spans.
+
+    `starts`      - the status each alarm was created in, from its creation row
+    `events`      - that status (or 'new') at created_at plus every recorded update
+    `transitions` - events whose status differs from the previous one (LAG), so
+                    repeated updates in the same status do not split a span
+    `spans`       - each transition with the time the next one started (LEAD);
+                    spans still open are measured up to %(now)s
+    """
+    alarm_table = _all_alarms()
+    update_table = _all_updates()
+    alarm_filter_a = 'WHERE a.id = %(alarm_id)s' if alarm_id is not None else ''
+    alarm_filter_u = 'WHERE u.beeping_alarm_id = %(alarm_id)s' if alarm_id is not None else ''
+
+    return f"""
+        WITH updates AS (
+            SELECT u.beeping_alarm_id, u.status, u.date, u.changes
+            FROM {update_table} u
+            {alarm_filter_u}
+        ),
+        starts AS (
+            SELECT DISTINCT ON (beeping_alarm_id) beeping_alarm_id AS alarm_id, status
+            FROM updates
+            WHERE changes -> 'status' -> 0 = 'null'::jsonb
+            ORDER BY beeping_alarm_id, date
+        ),
+        events AS (
+            SELECT a.id AS alarm_id, COALESCE(s.status, 'new') AS status, a.created_at AS entered_at, 0 AS seq
+            FROM {alarm_table} a
+            LEFT JOIN starts s ON s.alarm_id = a.id
+            {alarm_filter_a}
+            UNION ALL
+            SELECT beeping_alarm_id, status, date, 1
+            FROM updates
+        ),
+        marked AS (
+            SELECT alarm_id, status, entered_at, seq,
+                   LAG(status) OVER (PARTITION BY alarm_id ORDER BY entered_at, seq) AS prev_status
+            FROM events
+        ),
+        transitions AS (
+            SELECT alarm_id, status, entered_at, seq
+            FROM marked
+            WHERE prev_status IS DISTINCT FROM status
+        ),
+        spans AS (
+            SELECT alarm_id, status, entered_at,
+                   LEAD(entered_at) OVER (PARTITION BY alarm_id ORDER BY entered_at, seq) AS left_at
+            FROM transitions
+        ),
+        durations AS (
+            SELECT alarm_id, status, entered_at, left_at,
+                   left_at IS NULL AS is_open,
+                   EXTRACT(EPOCH FROM (COALESCE(left_at, %(now)s) - entered_at)) AS seconds
+            FROM spans
+            WHERE status = ANY(%(statuses)s)
+              AND (%(entered_from)s::timestamptz IS NULL OR entered_at >= %(entered_from)s)
+              AND (%(entered_to)s::timestamptz IS NULL OR entered_at <= %(entered_to)s)
+              AND (%(include_open)s OR left_at IS NOT NULL)
+        )
+    """
+
+
+def _aggregate_sql():
+    alarm_table = _all_alarms()
+    allocation_table = _all_allocations()
+    agency_table = Agency._meta.db_table
+    user_table = User._meta.db_table
+    percentiles = """
+        COUNT(*) AS samples,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY d.seconds) AS p50,
+        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY d.seconds) AS p90,
+        AVG(d.seconds) AS mean
+    """
+    return _spans_sql() + f"""
+        SELECT 'status' AS dimension, d.status, NULL::bigint AS key, NULL AS label, {percentiles}
+        FROM durations d
+        GROUP BY d.status
+        UNION ALL
+        SELECT 'agency', d.status, a.agency_id, MAX(ag.name), {percentiles}
+        FROM durations d
+        JOIN {alarm_table} a ON a.id = d.alarm_id
+        LEFT JOIN {agency_table} ag ON ag.id = a.agency_id
+        GROUP BY d.status, a.agency_id
+        UNION ALL
+        SELECT 'technician', d.status, al.user_id,
+               MAX(TRIM(COALESCE(u.first_name, '') || ' ' || COALESCE(u.last_name, ''))), {percentiles}
+        FROM durations d
+        LEFT JOIN {allocation_table} al ON al.alarm_id = d.alarm_id
+        LEFT JOIN {user_table} u ON u.id = al.user_id
+        GROUP BY d.status, al.user_id
+        ORDER BY 1, 2, 3
+    """
+
+
+def _params(statuses=None, entered_from=None, entered_to=None, include_open=False, now=None, alarm_id=None):
+    return {
+        'statuses': list(statuses or SLA_STATUSES),
+        'entered_from': entered_from,
+        'entered_to': entered_to,
+        'include_open': bool(include_open),
+        'now': now or timezone.now(),
+        'alarm_id': alarm_id,
+    }
+
+
+def compute_time_in_status(statuses=None, entered_from=None, entered_to=None, include_open=False, now=None):
+    """
+    Aggregate time-in-status (seconds) by status, by agency and by technician.
+
+    Returns a dict with one list per dimension. Alarms with several technicians
+    count towards each of them; unallocated alarms are reported with key None.
+    """
+    params = _params(statuses, entered_from, entered_to, include_open, now)
+    with connection.cursor() as cursor:
+        cursor.execute(_aggregate_sql(), params)
+        rows = cursor.fetchall()
+
+    results = {'by_status': [], 'by_agency': [], 'by_technician': []}
+    for dimension, status, key, label, samples, p50, p90, mean in rows:
+        entry = {
+            'status': status,
+            'samples': samples,
+            'p50_seconds': float(p50) if p50 is not None else None,
+            'p90_seconds': float(p90) if p90 is not None else None,
+            'mean_seconds': float(mean) if mean is not None else None,
+        }
+        if dimension == 'agency':
+            entry.update({'agency_id': key, 'agency': label if key is not None else 'Private'})
+        elif dimension == 'technician':
+            entry.update({'technician_id': key, 'technician': label if key is not None else 'Unallocated'})
+        results[f'by_{dimension}'].append(entry)
+    return results
+
+
+def alarm_time_in_status(alarm_id, statuses=None, now=None):
+    """
+    Return the status spans for a single alarm, oldest first.
+
+    Open spans (the alarm's current status) are included and measured up to now.
+    """
+    statuses = statuses or [choice[0] for choice in BeepingAlarm.STATUS_CHOICES]
+    params = _params(statuses, include_open=True, now=now, alarm_id=alarm_id)
+    sql = _spans_sql(alarm_id=alarm_id) + """
+        SELECT status, entered_at, left_at, is_open, seconds
+        FROM durations
+        ORDER BY entered_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'status': status,
+            'entered_at': entered_at,
+            'left_at': left_at,
+            'is_open': is_open,
+            'seconds': float(seconds),
+        }
+        for status, entered_at, left_at, is_open, seconds in rows
+    ]
+
+
+def _cache_key(day, statuses, entered_from, entered_to, include_open):
+    raw = json.dumps(
+        [sorted(statuses or SLA_STATUSES), str(entered_from), str(entered_to), bool(include_open)]
+    )
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'{CACHE_KEY_PREFIX}:{day.isoformat()}:{digest}'
+
+
+def _seconds_until_tomorrow(now):
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+    return max(int((tomorrow - now).total_seconds()), 60)
+
+
+def get_time_in_status(statuses=None, entered_from=None, entered_to=None, include_open=False, refresh=False):
+    """
+    Cached wrapper around compute_time_in_status.
+
+    Results are cached for the rest of the current (server) day, so the report is
+    computed at most once per day for each combination of parameters.
+    """
+    now = timezone.localtime()
+    key = _cache_key(now.date(), statuses, entered_from, entered_to, include_open)
+
+    if not refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    results = compute_time_in_status(statuses, entered_from, entered_to, include_open, now=now)
+    results['generated_at'] = now.isoformat()
+    cache.set(key, results, _seconds_until_tomorrow(now))
+    logger.info(f"Computed time-in-status report {key}")
+    return results
@@ -0,0 +1,136 @@
+"""
+Hot/cold split for beeping alarms.
+
+Completed and cancelled alarms that haven't changed for ARCHIVE_AFTER_DAYS
+are moved, with their allocation and tenant links and their update history,
+from BeepingAlarm into ArchivedBeepingAlarm (archive_alarms command). Each
+batch is one transaction of INSERT ... SELECT and DELETE statements, so the
+working table and its indexes only hold open and recently closed alarms.
+
+Reads stay transparent: the beeping_alarms list merges the archive in when
+filtering for a closed status (AlarmHistory), alarm details fall back to it,
+and the time-in-status analytics read both tables.
+
+Moving an alarm counts as deleting it for the changes feed (a tombstone is
+written), and like bulk updates it sends no live events. The archive is read
+only; its sort keys follow property renames but not technician renames.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from .filters import ArchivedAlarmFilters, BeepingAlarmFilters, count_alarms
+from .models import (ArchivedBeepingAlarm, ArchivedBeepingAlarmUpdate, BeepingAlarm, BeepingAlarmTombstone,
+                     BeepingAlarmUpdate, alarm_list_changed)
+from .ordering import ordering_fields
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = 90
+BATCH_SIZE = 1000
+
+LINK_FIELDS = ('allocation', 'tenant')
+
+
+def archivable(cutoff):
+    return BeepingAlarm.objects.filter(Q(is_completed=True) | Q(is_cancelled=True), updated_at__lt=cutoff)
+
+
+def _copy_rows(cursor, source, target, key, ids, archived_at=None):
+    """INSERT the `source` rows whose `key` column is in `ids` into `target`, matching columns by name."""
+    columns = [field.column for field in target._meta.concrete_fields if field.column != 'archived_at']
+    names = ', '.join(connection.ops.quote_name(column) for column in columns)
+    extra_name, extra_value, params = '', '', []
+    if archived_at is not None:
+        extra_name, extra_value, params = ', "archived_at"', ', %s', [archived_at]
+    cursor.execute(f'INSERT INTO {target._meta.db_table} ({names}{extra_name}) '
+                   f'SELECT {names}{extra_value} FROM {source._meta.db_table} WHERE {key} = ANY(%s)',
+                   params + [ids])
+
+
+def _copy_links(cursor, name, ids):
+    source = BeepingAlarm._meta.get_field(name)
+    target = ArchivedBeepingAlarm._meta.get_field(name)
+    cursor.execute(f'INSERT INTO {target.m2m_db_table()} ({target.m2m_column_name()}, {target.m2m_reverse_name()}) '
+                   f'SELECT {source.m2m_column_name()}, {source.m2m_reverse_name()} FROM {source.m2m_db_table()} '
+                   f'WHERE {source.m2m_column_name()} = ANY(%s)', [ids])
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """Move up to `batch_size` archivable alarms in one transaction; returns how many moved."""
+    with transaction.atomic():
+        # Rows being edited right now are left for the next run
+        rows = list(archivable(cutoff).select_for_update(skip_locked=True).order_by('id')
+                    .values_list('id', 'uid')[:batch_size])
+        if not rows:
+            return 0
+        ids = [alarm_id for alarm_id, _ in rows]
+        with connection.cursor() as cursor:
+            _copy_rows(cursor, BeepingAlarm, ArchivedBeepingAlarm, 'id', ids, archived_at=timezone.now())
+            for name in LINK_FIELDS:
+                _copy_links(cursor, name, ids)
+            _copy_rows(cursor, BeepingAlarmUpdate, ArchivedBeepingAlarmUpdate, 'beeping_alarm_id', ids)
+
+            cursor.execute(f'DELETE FROM {BeepingAlarmUpdate._meta.db_table} WHERE beeping_alarm_id = ANY(%s)',
+                           [ids])
+            for name in LINK_FIELDS:
+                field = BeepingAlarm._meta.get_field(name)
+                cursor.execute(f'DELETE FROM {field.m2m_db_table()} WHERE {field.m2m_column_name()} = ANY(%s)',
+                               [ids])
+            cursor.execute(f'DELETE FROM {BeepingAlarm._meta.db_table} WHERE id = ANY(%s)', [ids])
+
+        BeepingAlarmTombstone.objects.bulk_create(
+            [BeepingAlarmTombstone(alarm_id=alarm_id, uid=uid) for alarm_id, uid in rows])
+        alarm_list_changed()
+    return len(rows)
+
+
+def archive_closed_alarms(days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, now=None, log=logger.info):
+    """Archive every alarm closed (and unchanged) for `days`, batch by batch; returns the total."""
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return total
+        total += moved
+        log(f'Archived {total} alarms')
+
+
+class AlarmHistory:
+    """
+    Working and archived alarms matching one filter signature, in a whitelisted
+    ordering, as one sliceable sequence for the paginator.
+
+    A page is one UNION ALL of the two id lists (each side walks its status
+    index) and then the alarms themselves from each table.
+    """
+
+    def __init__(self, signature, ordering):
+        self.signature = signature
+        self.fields = ordering_fields(ordering)
+        self.sources = [
+            (BeepingAlarmFilters.apply(BeepingAlarm.objects.all(), signature), False),
+            (ArchivedAlarmFilters.apply(ArchivedBeepingAlarm.objects.all(), signature), True),
+        ]
+
+    def count(self, version=None):
+        return sum(count_alarms(queryset, self.signature, version) for queryset, _ in self.sources)
+
+    def __getitem__(self, index):
+        columns = ['id'] + [field.lstrip('-') for field in self.fields if field.lstrip('-') != 'id']
+        hot, cold = (queryset.annotate(archived=Value(archived)).values_list(*columns, 'archived')
+                     for queryset, archived in self.sources)
+        rows = list(hot.union(cold, all=True).order_by(*self.fields)[index])
+
+        loaded = {}
+        for model, archived in [(BeepingAlarm, False), (ArchivedBeepingAlarm, True)]:
+            ids = [row[0] for row in rows if row[-1] is archived]
+            if ids:
+                alarms = (model.objects.select_related('property', 'agency', 'private_owner')
+                          .prefetch_related('allocation', 'tenant').in_bulk(ids))
+                loaded.update({(archived, alarm_id): alarm for alarm_id, alarm in alarms.items()})
+        return [loaded[(row[-1], row[0])] for row in rows if (row[-1], row[0]) in loaded]
@@ -0,0 +1,185 @@
+"""
+Automatic history of alarm changes, written to BeepingAlarmUpdate.
+
+Each BeepingAlarm remembers its AUDITED_FIELDS as loaded (post_init, so no
+extra query); saving it diffs against that state. Bulk QuerySet.update()
+calls read the affected rows' old values under a row lock in the same
+transaction, and forward allocation/tenant link edits are recorded too.
+Every change becomes one row: the alarm's status afterwards and `changes`
+as {field: [old, new]}, or {link: {'added': [...], 'removed': [...]}}.
+An alarm created in any status but 'new' gets a first row too, with
+{'status': [None, status]}, so its history says where it started.
+
+Rows are not inserted as they happen. They are buffered per transaction,
+and by alarm, so one request that saves an alarm and relinks its
+technicians writes a single history row. The whole buffer goes out in one
+bulk_create when the transaction commits. Rows queued inside a savepoint
+that is rolled back are dropped along with the changes they describe. The
+user comes from backend.authentication.acting_user(), which is set for
+token-checked API requests and admin edits; anything else (commands,
+signals) is recorded without one.
+"""
+import threading
+
+from django.db import connections, transaction
+
+from backend.authentication import acting_user
+from .models import BeepingAlarm, BeepingAlarmUpdate
+
+# Bookkeeping columns (timestamps, ids, sort keys) are not history
+AUDITED_FIELDS = [
+    field.attname for field in BeepingAlarm._meta.concrete_fields
+    if field.name not in ('id', 'uid', 'created_at', 'updated_at', 'allocation_sort', 'property_sort')
+]
+
+# What analytics assume an alarm starts in when its history has no creation row
+INITIAL_STATUS = BeepingAlarm._meta.get_field('status').default
+
+FLUSH_BATCH_SIZE = 1000
+
+_local = threading.local()
+
+
+def loaded_state(alarm):
+    """The audited columns of an alarm as loaded; deferred ones are left out rather than fetched."""
+    return {name: alarm.__dict__[name] for name in AUDITED_FIELDS if name in alarm.__dict__}
+
+
+def diff(before, after):
+    return {name: [before[name], value] for name, value in after.items() if name in before and before[name] != value}
+
+
+class _Buffer:
+    """History rows of one transaction (or savepoint), merged by alarm."""
+
+    def __init__(self, using, key):
+        self.using = using
+        self.key = key
+        self.entries = {}
+
+    def add(self, alarm_id, status, changes, user):
+        entry = self.entries.setdefault(alarm_id, {'status': status, 'changes': {}, 'user': user})
+        entry['status'] = status
+        entry['user'] = user or entry['user']
+        for name, change in changes.items():
+            merged = entry['changes'].pop(name, None)
+            if isinstance(change, dict):
+                # A link added and removed again in one transaction cancels out
+                added, removed = (set(merged['added']), set(merged['removed'])) if merged else (set(), set())
+                new_added, new_removed = set(change.get('added', ())), set(change.get('removed', ()))
+                added, removed = ((added - new_removed) | (new_added - removed),
+                                  (removed - new_added) | (new_removed - added))
+                merged = {'added': sorted(added), 'removed': sorted(removed)} if added or removed else None
+            else:
+                merged = [merged[0] if merged else change[0], change[1]]
+                if merged[0] == merged[1]:
+                    merged = None
+            if merged is not None:
+                entry['changes'][name] = merged
+
+    def flush(self):
+        _buffers().pop(self.key, None)
+        rows = [BeepingAlarmUpdate(beeping_alarm_id=alarm_id, status=entry['status'], changes=entry['changes'],
+                                   update_by=entry['user'])
+                for alarm_id, entry in self.entries.items() if entry['changes']]
+        BeepingAlarmUpdate.objects.using(self.using).bulk_create(rows, batch_size=FLUSH_BATCH_SIZE)
+
+
+def _buffers():
+    if not hasattr(_local, 'buffers'):
+        _local.buffers = {}
+    return _local.buffers
+
+
+def _pending(buffer, connection):
+    return any(callback == buffer.flush for _, callback, _ in connection.run_on_commit)
+
+
+def _buffer(using):
+    """
+    The buffer for the current transaction and savepoint, registering its
+    flush with on_commit the first time. A buffer whose flush is no longer
+    pending belonged to a transaction or savepoint that rolled back.
+    """
+    connection = connections[using]
+    buffers = _buffers()
+    # atomic(savepoint=False) blocks show up as None
+    key = (using, tuple(sid for sid in connection.savepoint_ids if sid is not None))
+    buffer = buffers.get(key)
+    if buffer is None or not _pending(buffer, connection):
+        for stale in [other for other in buffers.values() if other.using == using and not _pending(other, connection)]:
+            del buffers[stale.key]
+        buffer = buffers[key] = _Buffer(using, key)
+        transaction.on_commit(buffer.flush, using=using)
+    return buffer
+
+
+def record(alarm_id, status, changes, using='default'):
+    """Queue a history row for `alarm_id` until the transaction commits (outside one, write it now)."""
+    if not changes:
+        return
+    if connections[using].in_atomic_block:
+        _buffer(using).add(alarm_id, status, changes, acting_user())
+    else:
+        buffer = _Buffer(using, None)
+        buffer.add(alarm_id, status, changes, acting_user())
+        buffer.flush()
+
+
+def record_create(alarm, using='default'):
+    """Remember a new alarm's state as loaded, and queue its starting status unless that is the default."""
+    alarm._audit_loaded = loaded_state(alarm)
+    if alarm.status != INITIAL_STATUS:
+        record(alarm.pk, alarm.status, {'status': [None, alarm.status]}, using)
+
+
+def record_save(alarm, update_fields=None, using='default'):
+    """Queue the difference between a saved alarm and its state as loaded; then treat the saved state as loaded."""
+    current = loaded_state(alarm)
+    if update_fields is not None:
+        names = {BeepingAlarm._meta.get_field(name).attname for name in update_fields}
+        current = {name: value for name, value in current.items() if name in names}
+    record(alarm.pk, alarm.status, diff(alarm._audit_loaded, current), using)
+    alarm._audit_loaded.update(current)
+
+
+def record_links(alarm, name, added=(), removed=(), using='default'):
+    changes = {kind: sorted(ids) for kind, ids in (('added', added), ('removed', removed)) if ids}
+    if changes:
+        record(alarm.pk, alarm.status, {name: changes}, using)
+
+
+def audited_update(queryset, values, update):
+    """
+    Run `update(**values)` (QuerySet.update on `queryset`) and queue a history
+    row for every alarm whose audited columns it changed. Returns the row count.
+    """
+    fields = {BeepingAlarm._meta.get_field(key).attname: value for key, value in values.items()}
+    names = [name for name in fields if name in AUDITED_FIELDS]
+    if not names:
+        return update(**values)
+
+    columns = ['pk', 'status'] + [name for name in names if name != 'status']
+    with transaction.atomic(using=queryset.db):
+        # The rows' values as of the update: locked until it commits
+        locked = BeepingAlarm.objects.using(queryset.db).filter(pk__in=queryset.values('pk'))
+        before = {row[0]: dict(zip(columns[1:], row[1:]))
+                  for row in locked.select_for_update(of=('self',)).values_list(*columns)}
+        count = update(**values)
+        if any(hasattr(value, 'resolve_expression') for value in values.values()):
+            after = {}
+            ids = list(before)
+            for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+                rows = (BeepingAlarm.objects.using(queryset.db).filter(pk__in=ids[start:start + FLUSH_BATCH_SIZE])
+                        .values_list(*columns))
+                after.update({row[0]: dict(zip(columns[1:], row[1:])) for row in rows})
+        else:
+            new = {name: getattr(value, 'pk', value) for name, value in fields.items() if name in columns}
+            after = {alarm_id: {**old, **new} for alarm_id, old in before.items()}
+        buffer = _buffer(queryset.db)
+        user = acting_user()
+        for alarm_id, old in before.items():
+            changes = diff(old, {name: after[alarm_id][name] for name in names})
+            if changes:
+                buffer.add(alarm_id, after[alarm_id]['status'], changes, user)
+    return count
@@ -0,0 +1,219 @@
+"""
+API benchmark suite.
+
+Replays a fixed matrix of realistic requests (every beeping_alarms filter and
+ordering, search terms, deep pages and each typeahead endpoint) through the
+Django test client and records p50/p95 latency, query count and payload size
+per request. Results are plain JSON so a run can be saved as a baseline and
+later runs compared against it.
+
+Kinde is never called: the token check is patched to return the benchmark
+user's profile, so the timings cover our own middleware, views and queries.
+"""
+import json
+import math
+import statistics
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from common.loadtest import percentile
+from properties.models import Tenant
+from .fake_data import SUBURBS, STREET_NAMES
+from .models import BeepingAlarm
+
+BENCHMARK_EMAIL = 'benchmark@ghhs.local'
+BENCHMARK_TOKEN = 'benchmark-token'
+
+ALARM_ORDERINGS = [
+    'created_at', '-created_at', 'status', '-status', 'allocation', '-allocation',
+    'agency_private', '-agency_private', 'customer_contacted', '-customer_contacted',
+    'property', '-property',
+]
+
+# Latency changes smaller than this are treated as noise whatever the threshold
+LATENCY_NOISE_MS = 5.0
+
+
+class _KindeProfile:
+    status_code = 200
+
+    def json(self):
+        return {'id': 'benchmark', 'email': BENCHMARK_EMAIL, 'given_name': 'Bench', 'family_name': 'Mark'}
+
+
+@contextmanager
+def stubbed_auth():
+    """Answer every token check with the benchmark user's profile."""
+    User.objects.get_or_create(username='benchmark', defaults={'email': BENCHMARK_EMAIL})
+    with mock.patch('backend.authentication.requests.get', return_value=_KindeProfile()):
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            yield
+
+
+def _sample_ids():
+    """Ids of a busy property, technician and tenant, so id filters return rows."""
+    alarms = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False)
+    property_id = alarms.order_by('property_id').values_list('property_id', flat=True).first()
+    technician_id = (alarms.filter(allocation__isnull=False)
+                     .order_by('allocation__id').values_list('allocation__id', flat=True).first())
+    tenant_id = (alarms.filter(tenant__isnull=False)
+                 .order_by('tenant__id').values_list('tenant__id', flat=True).first())
+    return property_id, technician_id, tenant_id
+
+
+def request_matrix(page_size=100):
+    """
+    (name, path, params) for every request the suite replays.
+
+    Names are stable across runs and datasets so results can be compared by
+    name; ids and page numbers are looked up from the data being benchmarked.
+    """
+    alarms = '/api/maintenance/beeping_alarms/'
+    property_id, technician_id, tenant_id = _sample_ids()
+    suburb, postcode, longitude, latitude = SUBURBS[0]
+    technician = User.objects.filter(id=technician_id).values_list('first_name', flat=True).first() or 'Alex'
+    tenant = Tenant.objects.filter(id=tenant_id).values_list('first_name', flat=True).first() or 'Alex'
+    street = STREET_NAMES[0]
+
+    active = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).count()
+    last_page = max(1, math.ceil(active / page_size))
+
+    matrix = [('alarms.default', alarms, {})]
+
+    for choice, _ in BeepingAlarm.STATUS_CHOICES:
+        matrix.append((f'alarms.status.{choice}', alarms, {'status': choice}))
+    matrix += [
+        ('alarms.contacted.true', alarms, {'is_customer_contacted': 'true'}),
+        ('alarms.contacted.false', alarms, {'is_customer_contacted': 'false'}),
+        ('alarms.agency_private.agency', alarms, {'agency_private': 'agency'}),
+        ('alarms.agency_private.private', alarms, {'agency_private': 'private'}),
+        ('alarms.property', alarms, {'property': property_id}),
+        ('alarms.allocation', alarms, {'allocation': technician_id}),
+        ('alarms.tenant', alarms, {'tenant': tenant_id}),
+        ('alarms.created_at_range', alarms, {'created_at_from': '2025-03-01T00:00:00Z',
+                                             'created_at_to': '2025-06-30T23:59:59Z'}),
+        ('alarms.near', alarms, {'near': f'{latitude},{longitude}', 'radius_km': 5}),
+        ('alarms.combined', alarms, {'status': 'to_be_scheduled', 'agency_private': 'agency',
+                                     'is_customer_contacted': 'false', 'ordering': 'property'}),
+    ]
+
+    for ordering in ALARM_ORDERINGS:
+        matrix.append((f'alarms.ordering.{ordering}', alarms, {'ordering': ordering}))
+
+    for name, term in [('suburb', suburb), ('street', street), ('postcode', postcode),
+                       ('technician', technician), ('multi', f'{street.split()[0]} {suburb}'),
+                       ('miss', 'zzzzqqq')]:
+        matrix.append((f'alarms.search.{name}', alarms, {'search': term}))
+
+    matrix += [
+        ('alarms.page.first', alarms, {'page_size': page_size, 'page': 1}),
+        ('alarms.page.middle', alarms, {'page_size': page_size, 'page': max(1, last_page // 2)}),
+        ('alarms.page.last', alarms, {'page_size': page_size, 'page': last_page}),
+        ('alarms.page.last_by_property', alarms, {'page_size': page_size, 'page': last_page, 'ordering': 'property'}),
+    ]
+
+    for prefix in ['', tenant[:1], tenant[:3], tenant]:
+        matrix.append((f'typeahead.tenant.{len(prefix)}', '/api/maintenance/tenant-suggestions/', {'q': prefix}))
+    for prefix in ['', street[:2], street, f'{street} {suburb}', postcode]:
+        matrix.append((f'typeahead.property.{len(prefix)}', '/api/maintenance/property-suggestions/',
+                       {'q': prefix}))
+    for term in [suburb[:3], technician]:
+        matrix.append((f'typeahead.suggest.{term.lower()}', '/api/maintenance/suggest/', {'q': term}))
+    matrix += [
+        ('typeahead.users', '/api/common/users/', {'q': technician[:2]}),
+        ('reference_data', '/api/common/reference-data/', {}),
+    ]
+
+    newest = BeepingAlarm.objects.order_by('-created_at').values_list('uid', flat=True).first()
+    if newest:
+        matrix.append(('alarm_detail', f'{alarms}{newest}/', {}))
+    return [(name, path, {key: value for key, value in params.items() if value is not None})
+            for name, path, params in matrix]
+
+
+def measure(client, path, params, repeat, warmup):
+    """Time one request `repeat` times after `warmup` unmeasured calls."""
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {BENCHMARK_TOKEN}'}
+    for _ in range(warmup):
+        client.get(path, params, **headers)
+
+    timings = []
+    queries = []
+    size = 0
+    status_code = None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path, params, **headers)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+        size = len(response.content)
+        status_code = response.status_code
+    return {
+        'status': status_code,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'queries': int(statistics.median(queries)),
+        'bytes': size,
+    }
+
+
+def run(repeat=5, warmup=1, only=None, log=None):
+    """Run the request matrix against the current database; returns {name: result}."""
+    results = {}
+    with stubbed_auth():
+        client = Client()
+        for name, path, params in request_matrix():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = measure(client, path, params, repeat, warmup)
+            results[name]['path'] = path
+            results[name]['params'] = {key: str(value) for key, value in params.items()}
+            if log:
+                result = results[name]
+                log(f"{name:<40} {result['status']} p50 {result['p50_ms']:>8.2f}ms  "
+                    f"p95 {result['p95_ms']:>8.2f}ms  {result['queries']:>3} queries  {result['bytes']:>8} bytes")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of `results` against `baseline` (both {name: result}).
+
+    Latency regresses when p50 or p95 grows by more than `threshold` (a
+    fraction) and by more than LATENCY_NOISE_MS; payload size likewise by more
+    than `threshold`. Any increase in query count is a regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            if (result[key] > before[key] * (1 + threshold)
+                    and result[key] - before[key] > LATENCY_NOISE_MS):
+                regressions.append(f'{name}: {key} {before[key]} -> {result[key]}')
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+        if result['bytes'] > before['bytes'] * (1 + threshold):
+            regressions.append(f"{name}: bytes {before['bytes']} -> {result['bytes']}")
+        if result['status'] != before['status']:
+            regressions.append(f"{name}: status {before['status']} -> {result['status']}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_results(path, data):
+    with open(path, 'w') as handle:
+        json.dump(data, handle, indent=2, sort_keys=True)
+        handle.write('\n')
@@ -0,0 +1,149 @@
+"""
+Changes feed for keeping a client-side copy of the alarms up to date.
+
+A client starts without a cursor and pages through every alarm, then keeps
+asking with the cursor it was last given. Each page holds the alarms changed
+since the cursor in (updated_at, id) order and the tombstones of alarms
+deleted since, in (deleted_at, id) order; the cursor records both positions.
+
+Rows are only returned once they are SETTLE_SECONDS old. updated_at is stamped
+before the writing transaction commits, so a slow transaction could otherwise
+commit a row behind a cursor that has already moved past it.
+"""
+import base64
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BeepingAlarm, BeepingAlarmTombstone
+
+SETTLE_SECONDS = 5
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+# Tombstones older than this are pruned (prune_alarm_tombstones); cursors
+# older than it can't be served and the client has to start again
+TOMBSTONE_RETENTION_DAYS = 30
+
+# Flat columns only; related records are referenced by id
+COMPACT_FIELDS = [
+    'id', 'uid', 'status', 'issue_type_id', 'notes', 'agency_id', 'private_owner_id', 'property_id',
+    'is_active', 'is_agency', 'is_private_owner', 'is_customer_contacted', 'is_completed', 'is_cancelled',
+    'created_at', 'updated_at',
+]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Position after every row stamped at a given instant
+_LAST_ID = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def _micros(moment):
+    return (moment - _EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(changed, deleted):
+    raw = '.'.join(str(part) for part in (_micros(changed[0]), changed[1], _micros(deleted[0]), deleted[1]))
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(changed, deleted) positions, each (datetime, id), from an opaque cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        changed_at, changed_id, deleted_at, deleted_id = (int(part) for part in raw.split('.'))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor')
+    return ((_EPOCH + timedelta(microseconds=changed_at), changed_id),
+            (_EPOCH + timedelta(microseconds=deleted_at), deleted_id))
+
+
+def _after(field, position):
+    moment, last_id = position
+    # The redundant >= is what lets the (field, id) index start at the position
+    return Q(**{f'{field}__gte': moment}) & (Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': last_id}))
+
+
+def _page(queryset, field, position, cutoff, limit):
+    """Rows after `position` up to `cutoff`, and the position to resume from."""
+    rows = list(queryset.filter(_after(field, position), **{f'{field}__lte': cutoff})
+                .order_by(field, 'id')[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1][field], rows[-1]['id']), True
+    # Caught up: everything stamped up to the cutoff has been seen
+    return rows, (cutoff, _LAST_ID), False
+
+
+def _links(through, column, alarm_ids):
+    links = {}
+    rows = through.objects.filter(beepingalarm_id__in=alarm_ids).values_list('beepingalarm_id', column)
+    for alarm_id, linked_id in rows:
+        links.setdefault(alarm_id, []).append(linked_id)
+    return links
+
+
+def attach_links(alarms):
+    """Add allocation and tenant id lists to compact alarm rows, in two queries."""
+    alarm_ids = [alarm['id'] for alarm in alarms]
+    allocations = _links(BeepingAlarm.allocation.through, 'user_id', alarm_ids)
+    tenants = _links(BeepingAlarm.tenant.through, 'tenant_id', alarm_ids)
+    for alarm in alarms:
+        alarm['allocation'] = allocations.get(alarm['id'], [])
+        alarm['tenant'] = tenants.get(alarm['id'], [])
+    return alarms
+
+
+def current_cursor(now=None):
+    """A cursor for 'from now on', e.g. for a live stream client to catch up from later."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+    return encode_cursor((cutoff, _LAST_ID), (cutoff, _LAST_ID))
+
+
+def changes_page(cursor=None, limit=DEFAULT_LIMIT, now=None):
+    """
+    One page of the feed: {'changed', 'deleted', 'cursor', 'has_more'}.
+
+    Raises InvalidCursor for a malformed cursor and CursorExpired when the
+    cursor is older than the tombstone retention.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=SETTLE_SECONDS)
+    if cursor:
+        changed_from, deleted_from = decode_cursor(cursor)
+        if deleted_from[0] < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            raise CursorExpired('Cursor is too old; start again without one')
+    else:
+        # A new copy is built from the alarms themselves; deletions from here on
+        changed_from, deleted_from = (_EPOCH, 0), (cutoff, _LAST_ID)
+
+    alarms, changed_to, more_alarms = _page(
+        BeepingAlarm.objects.values(*COMPACT_FIELDS), 'updated_at', changed_from, cutoff, limit)
+    tombstones, deleted_to, more_tombstones = _page(
+        BeepingAlarmTombstone.objects.values('id', 'alarm_id', 'uid', 'deleted_at'),
+        'deleted_at', deleted_from, cutoff, limit)
+
+    return {
+        'changed': attach_links(alarms),
+        'deleted': [{'id': tombstone['alarm_id'], 'uid': tombstone['uid'], 'deleted_at': tombstone['deleted_at']}
+                    for tombstone in tombstones],
+        'cursor': encode_cursor(changed_to, deleted_to),
+        'has_more': more_alarms or more_tombstones,
+    }
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones past the retention; returns how many went."""
+    now = now or timezone.now()
+    horizon = now - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = BeepingAlarmTombstone.objects.filter(deleted_at__lt=horizon).delete()
+    return deleted
@@ -0,0 +1,285 @@
+"""
+Cold storage for archived alarms older than anyone queries.
+
+export_alarm_history streams ArchivedBeepingAlarm rows created before a
+cutoff into gzip NDJSON files on local disk, one file per calendar month
+(UTC) per run:
+
+    <root>/alarms/2024/2024-03/<run>.ndjson.gz   one alarm per line
+    <root>/manifests/<run>.json                   rows, updates and sha256 of every file
+
+Each line is the alarm's columns plus a snapshot of its property, tenants and
+allocated technicians and its full update history, so a file is readable on
+its own. Every file is re-read and checked against the database counts before
+the manifest is written, and rows are only deleted (in batches) once the
+manifest is on disk. restore_alarm_history loads a created_at range back into
+the archive tables from the manifests, after checking each file's checksum.
+
+Both directions stream in batches, so memory use does not grow with the
+number of alarms. Alarms still in BeepingAlarm are never exported; run
+archive_alarms first.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from properties.models import Tenant
+from .models import ArchivedBeepingAlarm, ArchivedBeepingAlarmUpdate, alarm_list_changed
+
+logger = logging.getLogger(__name__)
+
+COLD_AFTER_DAYS = 365 * 2
+BATCH_SIZE = 500
+MANIFEST_FORMAT = 1
+
+# Technician columns kept in the snapshot; never passwords
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email')
+
+
+class ColdStorageError(Exception):
+    pass
+
+
+def _encode(value):
+    # Full precision, unlike DjangoJSONEncoder, so restored rows match exactly
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def _columns(obj, exclude=()):
+    return {field.attname: getattr(obj, field.attname)
+            for field in obj._meta.concrete_fields if field.attname not in exclude}
+
+
+def _decode(model, record, exclude=()):
+    return {field.attname: field.to_python(record[field.attname])
+            for field in model._meta.concrete_fields if field.attname not in exclude}
+
+
+def alarm_record(alarm):
+    """One NDJSON line: the archived alarm, snapshots of what it referenced, and its history."""
+    record = _columns(alarm)
+    record['property'] = _columns(alarm.property)
+    record['tenant'] = [_columns(tenant) for tenant in alarm.tenant.all()]
+    record['allocation'] = [{name: getattr(user, name) for name in USER_FIELDS} for user in alarm.allocation.all()]
+    record['updates'] = [_columns(update, exclude=('beeping_alarm_id',)) for update in alarm.updates]
+    return json.dumps(record, default=_encode, sort_keys=True, separators=(',', ':'))
+
+
+def _month_start(day):
+    return datetime(day.year, day.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def _file_summary(path):
+    """(lines, sha256 of the compressed bytes) of a partition file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as raw:
+        for block in iter(lambda: raw.read(1 << 20), b''):
+            digest.update(block)
+    with gzip.open(path, 'rt', encoding='utf-8') as lines:
+        count = sum(1 for _ in lines)
+    return count, digest.hexdigest()
+
+
+def _keyset_batches(ordered, batch_size):
+    """
+    `ordered` (by created_at, id) in slices of `batch_size`, each starting after
+    the last row of the one before. Server-side cursors are off behind the
+    pooler, so iterator() would fetch the whole partition at once.
+    """
+    batch = list(ordered[:batch_size])
+    while batch:
+        yield batch
+        last = batch[-1]
+        batch = list(ordered.filter(Q(created_at__gt=last.created_at) |
+                                    Q(created_at=last.created_at, id__gt=last.id))[:batch_size])
+
+
+def _export_partition(root, run, month, alarms, batch_size):
+    relative = Path('alarms', f'{month:%Y}', f'{month:%Y-%m}', f'{run}.ndjson.gz')
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    expected_rows = alarms.count()
+    expected_updates = ArchivedBeepingAlarmUpdate.objects.filter(beeping_alarm__in=alarms).count()
+
+    rows = updates = 0
+    partial = path.with_name(path.name + '.partial')
+    history = Prefetch('archivedbeepingalarmupdate_set', to_attr='updates',
+                       queryset=ArchivedBeepingAlarmUpdate.objects.order_by('date', 'id'))
+    ordered = (alarms.select_related('property').prefetch_related('tenant', 'allocation', history)
+               .order_by('created_at', 'id'))
+    with gzip.open(partial, 'wt', encoding='utf-8') as out:
+        for batch in _keyset_batches(ordered, batch_size):
+            for alarm in batch:
+                out.write(alarm_record(alarm) + '\n')
+                rows += 1
+                updates += len(alarm.updates)
+
+    lines, sha256 = _file_summary(partial)
+    if (rows, lines, updates) != (expected_rows, expected_rows, expected_updates):
+        partial.unlink()
+        raise ColdStorageError(f'{month:%Y-%m}: expected {expected_rows} alarms and {expected_updates} updates, '
+                               f'wrote {rows} alarms ({lines} lines) and {updates} updates')
+    os.replace(partial, path)
+    return {'month': f'{month:%Y-%m}', 'path': str(relative), 'rows': rows, 'updates': updates,
+            'bytes': path.stat().st_size, 'sha256': sha256}
+
+
+def _delete_rows(alarms, batch_size):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(alarms.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            # Updates and link rows go with their alarms
+            ArchivedBeepingAlarm.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def export_alarm_history(root, before, batch_size=BATCH_SIZE, delete=True, log=logger.info):
+    """
+    Write archived alarms created before `before` to `root`, then (with
+    `delete`) remove them from the database. Returns the manifest.
+    """
+    root = Path(root)
+    started = timezone.now()
+    run = f'{started:%Y%m%dT%H%M%S%fZ}'
+    # Rows archived while the export runs wait for the next one
+    candidates = ArchivedBeepingAlarm.objects.filter(created_at__lt=before, archived_at__lte=started)
+    months = list(candidates.annotate(month=TruncMonth('created_at', tzinfo=dt_timezone.utc))
+                  .values_list('month', flat=True).distinct().order_by('month'))
+
+    partitions = []
+    for month in months:
+        month = _month_start(month)
+        alarms = candidates.filter(created_at__gte=month, created_at__lt=min(_next_month(month), before))
+        summary = _export_partition(root, run, month, alarms, batch_size)
+        partitions.append((alarms, summary))
+        log(f"Wrote {summary['rows']} alarms to {summary['path']}")
+
+    manifest = {'format': MANIFEST_FORMAT, 'run': run, 'exported_at': started.isoformat(),
+                'before': before.isoformat(), 'partitions': [summary for _, summary in partitions]}
+    if partitions:
+        (root / 'manifests').mkdir(parents=True, exist_ok=True)
+        path = root / 'manifests' / f'{run}.json'
+        partial = path.with_name(path.name + '.partial')
+        partial.write_text(json.dumps(manifest, indent=2))
+        os.replace(partial, path)
+
+    if delete:
+        for alarms, summary in partitions:
+            deleted = _delete_rows(alarms, batch_size)
+            if deleted != summary['rows']:
+                logger.warning('Deleted %s alarms from %s, exported %s', deleted, summary['month'], summary['rows'])
+            log(f"Deleted {deleted} alarms from {summary['month']}")
+        if partitions:
+            alarm_list_changed()
+    return manifest
+
+
+def _read_manifests(root):
+    for path in sorted((root / 'manifests').glob('*.json')):
+        manifest = json.loads(path.read_text())
+        if manifest.get('format') != MANIFEST_FORMAT:
+            raise ColdStorageError(f'{path}: unsupported manifest format {manifest.get("format")}')
+        yield manifest
+
+
+def _check_references(records, path):
+    """Raise if a batch refers to rows that no longer exist; the snapshots show what they were."""
+    wanted = {model: set() for model in (User, Tenant)}
+    for field in ArchivedBeepingAlarm._meta.concrete_fields:
+        if field.is_relation:
+            wanted.setdefault(field.related_model, set()).update(
+                record[field.attname] for record in records if record[field.attname] is not None)
+    for record in records:
+        wanted[Tenant].update(tenant['id'] for tenant in record['tenant'])
+        wanted[User].update(user['id'] for user in record['allocation'])
+        wanted[User].update(update['update_by_id'] for update in record['updates'] if update['update_by_id'])
+    for model, ids in wanted.items():
+        missing = ids - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if missing:
+            raise ColdStorageError(f'{path}: {model._meta.verbose_name_plural} {sorted(missing)[:20]} no longer '
+                                   'exist; recreate them from the snapshots in the file and restore again')
+
+
+def _restore_batch(records, path):
+    with transaction.atomic():
+        present = set(ArchivedBeepingAlarm.objects.filter(pk__in=[record['id'] for record in records])
+                      .values_list('pk', flat=True))
+        records = [record for record in records if record['id'] not in present]
+        if not records:
+            return 0
+        _check_references(records, path)
+        ArchivedBeepingAlarm.objects.bulk_create(
+            [ArchivedBeepingAlarm(**_decode(ArchivedBeepingAlarm, record)) for record in records])
+        ArchivedBeepingAlarm.tenant.through.objects.bulk_create([
+            ArchivedBeepingAlarm.tenant.through(archivedbeepingalarm_id=record['id'], tenant_id=tenant['id'])
+            for record in records for tenant in record['tenant']])
+        ArchivedBeepingAlarm.allocation.through.objects.bulk_create([
+            ArchivedBeepingAlarm.allocation.through(archivedbeepingalarm_id=record['id'], user_id=user['id'])
+            for record in records for user in record['allocation']])
+        ArchivedBeepingAlarmUpdate.objects.bulk_create([
+            ArchivedBeepingAlarmUpdate(beeping_alarm_id=record['id'],
+                                       **_decode(ArchivedBeepingAlarmUpdate, update, exclude=('beeping_alarm_id',)))
+            for record in records for update in record['updates']])
+    return len(records)
+
+
+def restore_alarm_history(root, start, end, batch_size=BATCH_SIZE, log=logger.info):
+    """
+    Load alarms created in [start, end) from the exports under `root` back into
+    the archive tables. Alarms already present are skipped, so a failed or
+    repeated restore can simply be run again. Returns how many were restored.
+    """
+    root = Path(root)
+    created_at = ArchivedBeepingAlarm._meta.get_field('created_at')
+    restored = 0
+    for manifest in _read_manifests(root):
+        for partition in manifest['partitions']:
+            month = datetime.strptime(partition['month'], '%Y-%m').replace(tzinfo=dt_timezone.utc)
+            if _next_month(month) <= start or month >= end:
+                continue
+            path = root / partition['path']
+            if not path.exists():
+                raise ColdStorageError(f'{path} is listed in manifest {manifest["run"]} but missing')
+            if _file_summary(path) != (partition['rows'], partition['sha256']):
+                raise ColdStorageError(f'{path} does not match its manifest checksum or row count')
+
+            batch, count = [], 0
+            with gzip.open(path, 'rt', encoding='utf-8') as lines:
+                for line in lines:
+                    record = json.loads(line)
+                    if start <= created_at.to_python(record['created_at']) < end:
+                        batch.append(record)
+                    if len(batch) >= batch_size:
+                        count += _restore_batch(batch, path)
+                        batch = []
+            if batch:
+                count += _restore_batch(batch, path)
+            restored += count
+            log(f'Restored {count} alarms from {partition["path"]}')
+    if restored:
+        alarm_list_changed()
+    return restored
@@ -0,0 +1,90 @@
+"""
+Single beeping alarms by uid, cached per object.
+
+The serialized alarm (with its property, tenants and allocated users) is cached
+under the alarm's uid and updated_at, plus ALARM_DETAIL_RECORDS_VERSION for the
+records embedded in it. Saving the alarm, a bulk update() and link changes
+(which touch() it) all move updated_at, so an edit only expires that alarm's
+entry; saving a property, tenant or user bumps the records version (see
+maintenance.signals), which expires every entry, as any of them may embed it.
+Both live in the database, so every worker stops reading old entries whatever
+cache backend is configured. Opening an alarm in the UI costs those two
+lookups and one cache read.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from common.cache import bump_version, get_version
+from .models import ArchivedBeepingAlarm, BeepingAlarm
+from .serializers import BeepingAlarmSerializer
+
+ALARM_DETAIL_KEY_PREFIX = 'beeping_alarm'
+ALARM_DETAIL_TIMEOUT = 60 * 60
+# common.cache version of the properties, tenants and users embedded in alarms
+ALARM_DETAIL_RECORDS_VERSION = 'beeping_alarm_records'
+
+M2M_FIELDS = ('allocation', 'tenant')
+
+
+def alarm_detail_key(uid, updated_at, records_version):
+    return f'{ALARM_DETAIL_KEY_PREFIX}:{uid}:{updated_at.timestamp():.6f}:{records_version}'
+
+
+def alarm_records_changed():
+    transaction.on_commit(lambda: bump_version(ALARM_DETAIL_RECORDS_VERSION))
+
+
+def load_alarm(uid, model=BeepingAlarm):
+    return (model.objects.select_related('property', 'agency', 'private_owner')
+            .prefetch_related('allocation', 'tenant').filter(uid=uid).first())
+
+
+def get_alarm_detail(uid):
+    """Serialized alarm for `uid`, archived or not, or None if there is no such alarm."""
+    updated_at = BeepingAlarm.objects.filter(uid=uid).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        # Archived alarms are rarely opened; they aren't cached
+        archived = load_alarm(uid, ArchivedBeepingAlarm)
+        return BeepingAlarmSerializer(archived).data if archived is not None else None
+
+    # Read before the alarm, so a concurrent change can only leave newer data under these keys
+    key = alarm_detail_key(uid, updated_at, get_version(ALARM_DETAIL_RECORDS_VERSION))
+    data = cache.get(key)
+    if data is None:
+        alarm = load_alarm(uid)
+        if alarm is None:
+            return get_alarm_detail(uid)
+        data = BeepingAlarmSerializer(alarm).data
+        cache.set(key, data, ALARM_DETAIL_TIMEOUT)
+    return data
+
+
+def update_alarm(alarm, data):
+    """
+    Apply validated serializer data to `alarm`, writing only what changed.
+
+    Columns go out in one UPDATE limited to the changed fields, so an edit to
+    the status doesn't rewrite the notes; many-to-many links are only touched
+    when given. Returns the names of the changed fields. Raises Django's
+    ValidationError when the result fails BeepingAlarm.clean().
+    """
+    links = {name: data.pop(name) for name in M2M_FIELDS if name in data}
+    changed = []
+    for name, value in data.items():
+        field = BeepingAlarm._meta.get_field(name)
+        current = getattr(alarm, field.attname)
+        new = value.pk if field.is_relation and value is not None else value
+        if current != new:
+            setattr(alarm, name, value)
+            changed.append(name)
+
+    with transaction.atomic():
+        if changed:
+            alarm.save(update_fields=changed)
+        for name, values in links.items():
+            manager = getattr(alarm, name)
+            if set(manager.values_list('pk', flat=True)) != {value.pk for value in values}:
+                manager.set(values)
+                changed.append(name)
+    return changed
+
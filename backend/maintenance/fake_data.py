@@ -0,0 +1,483 @@
+"""
+Deterministic fake QLD data for development and load testing.
+
+Rows are generated in fixed-size chunks, each from its own seeded RNG, and
+written with COPY using explicit ids. That keeps the data identical for a given
+seed no matter how many worker processes produce it, lets timestamps be written
+directly, and avoids one round trip per row.
+"""
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from multiprocessing import get_context
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+
+from common.bulk import copy_rows, max_id, reset_sequences
+from common.cache import bump_version
+from common.directory import USER_DIRECTORY
+from common.reference import REFERENCE_DATA
+from common.geo import encode_geohash
+from properties.models import Agency, PrivateOwner, Property, PropertyManager, Tenant
+from .models import (ALARM_LIST_VERSION, ArchivedBeepingAlarm, ArchivedBeepingAlarmUpdate, BeepingAlarm,
+                     BeepingAlarmTombstone, BeepingAlarmUpdate, IssueType, allocation_sort_key, property_sort_key)
+from .ordering import refresh_allocation_sort
+from .suggestions import property_index, tenant_index
+
+AGENCIES = [
+    ('Brisbane Property Management', 'info@brisbanepm.com', '07 3123 4567', 'Suite 101', '123', 'Queen Street', 'Brisbane', '4000', 153.0251, -27.4698),
+    ('Gold Coast Real Estate', 'contact@goldcoastreal.com', '07 5567 8901', 'Level 3', '456', 'Surfers Paradise Boulevard', 'Surfers Paradise', '4217', 153.4300, -28.0026),
+    ('Sunshine Coast Property Group', 'hello@sunshinecoastproperty.com', '07 5432 1098', 'Unit 5', '789', 'Mooloolaba Esplanade', 'Mooloolaba', '4557', 153.1200, -26.6800),
+    ('Townsville Property Services', 'info@townsvilleproperty.com', '07 4721 3456', 'Suite 2', '321', 'Flinders Street', 'Townsville', '4810', 146.8160, -19.2590),
+    ('Cairns Property Management', 'contact@cairnsproperty.com', '07 4031 2345', 'Level 1', '654', 'Shield Street', 'Cairns', '4870', 145.7700, -16.9200),
+]
+
+OWNER_NOTES = [
+    'Prefers morning appointments', 'Contact via email preferred', 'Available after 6 PM',
+    'Weekend appointments only', 'Emergency contact only', 'Prefers SMS notifications',
+    'Contact through property manager', 'Available weekdays only',
+]
+
+SUBURBS = [
+    ('Brisbane', '4000', 153.0251, -27.4698), ('Fortitude Valley', '4006', 153.0350, -27.4560),
+    ('New Farm', '4005', 153.0450, -27.4700), ('West End', '4101', 153.0150, -27.4800),
+    ('Paddington', '4064', 153.0050, -27.4600), ('Bulimba', '4171', 153.0550, -27.4500),
+    ('Hamilton', '4007', 153.0750, -27.4400), ('Ascot', '4007', 153.0650, -27.4300),
+    ('Surfers Paradise', '4217', 153.4300, -28.0026), ('Broadbeach', '4218', 153.4200, -28.0300),
+    ('Mermaid Beach', '4218', 153.4100, -28.0400), ('Burleigh Heads', '4220', 153.4000, -28.1000),
+    ('Coolangatta', '4225', 153.3900, -28.1700), ('Southport', '4215', 153.4400, -27.9700),
+    ('Nerang', '4211', 153.3500, -27.9900), ('Mooloolaba', '4557', 153.1200, -26.6800),
+    ('Maroochydore', '4558', 153.1000, -26.6600), ('Caloundra', '4551', 153.1300, -26.8000),
+    ('Noosa Heads', '4567', 153.0900, -26.4000), ('Buderim', '4556', 153.0500, -26.6800),
+    ('Townsville', '4810', 146.8160, -19.2590), ('North Ward', '4810', 146.8200, -19.2500),
+    ('South Townsville', '4810', 146.8100, -19.2700), ('Magnetic Island', '4819', 146.8500, -19.1700),
+    ('Cairns', '4870', 145.7700, -16.9200), ('Cairns North', '4870', 145.7800, -16.9100),
+    ('Edge Hill', '4870', 145.7600, -16.9300), ('Parramatta Park', '4870', 145.7500, -16.9400),
+]
+
+STREET_NAMES = [
+    'Main Street', 'Ocean Drive', 'Beach Road', 'Park Avenue', 'Sunset Boulevard', 'Palm Street',
+    'Coral Way', 'Tropical Drive', 'Paradise Street', 'Coastal Road', 'Harbour View', 'Mountain Road',
+]
+
+FIRST_NAMES = [
+    'Alex', 'Jordan', 'Casey', 'Riley', 'Taylor', 'Morgan', 'Avery', 'Quinn', 'Blake', 'Hayden',
+    'Robert', 'Jennifer', 'Michael', 'Amanda', 'David', 'Sarah', 'James', 'Emma', 'Olivia', 'Noah',
+]
+
+LAST_NAMES = [
+    'Thompson', 'Lee', 'Miller', 'Davis', 'Garcia', 'Rodriguez', 'Wilson', 'Martinez', 'Anderson',
+    'Taylor', 'Johnson', 'Smith', 'Brown', 'Thomas', 'White', 'Harris', 'Clark', 'Lewis', 'Walker', 'Young',
+]
+
+ISSUE_TYPES = [
+    ('Low Battery', 'Alarm battery needs replacement'),
+    ('False Alarm', 'System triggering false alarms'),
+    ('Sensor Fault', 'Motion sensor not working properly'),
+    ('Panel Malfunction', 'Control panel showing errors'),
+    ('Communication Error', 'System not communicating with monitoring station'),
+    ('Power Supply Issue', 'Main power supply problems'),
+    ('Siren Fault', 'Siren not sounding when triggered'),
+    ('Keypad Fault', 'Keypad buttons not responding'),
+    ('Zone Fault', 'Specific zone not arming/disarming'),
+    ('Network Connectivity', 'Internet connectivity issues affecting monitoring'),
+]
+
+ALARM_NOTES = [
+    'Customer reported beeping sound coming from alarm panel',
+    'Alarm system showing low battery warning',
+    'False alarm triggered during testing',
+    'Sensor appears to be malfunctioning',
+    'Panel displaying error codes',
+    'System not responding to keypad commands',
+    'Communication failure with monitoring station',
+    'Power supply issues detected',
+    'Siren not functioning properly',
+    'Zone 1 showing fault status',
+    'Network connectivity problems',
+    'Battery backup system needs attention',
+    'Motion detector not arming correctly',
+    'Door contact sensor faulty',
+    'Glass break sensor needs calibration',
+]
+
+# Statuses an alarm passes through (after 'new') to reach its current status
+STATUS_PATHS = {
+    'new': [],
+    'requires_call_back': ['requires_call_back'],
+    'awaiting_response': ['requires_call_back', 'awaiting_response'],
+    'to_be_scheduled': ['requires_call_back', 'to_be_scheduled'],
+    'to_be_quoted': ['to_be_quoted'],
+    'completed': ['to_be_scheduled', 'completed'],
+    'cancelled': ['requires_call_back', 'cancelled'],
+}
+MAX_UPDATES_PER_ALARM = max(len(path) for path in STATUS_PATHS.values())
+
+STATUSES = [choice[0] for choice in BeepingAlarm.STATUS_CHOICES]
+
+
+def _uid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _phone(rng, mobile=True):
+    if mobile:
+        return f"04{rng.randint(10, 99)} {rng.randint(100, 999)} {rng.randint(100, 999)}"
+    return f"07 {rng.randint(3000, 5999)} {rng.randint(1000, 9999)}"
+
+
+class FakeDataError(Exception):
+    pass
+
+
+class FakeDataPlan:
+    """Row counts, id ranges and shared lookups for one generation run."""
+
+    def __init__(self, scale, seed, batch_size, start, end):
+        self.scale = scale
+        self.seed = seed
+        self.batch_size = batch_size
+        self.start = start
+        self.end = end
+
+        self.alarms = scale
+        self.agencies = max(len(AGENCIES), scale // 2000)
+        self.owners = max(len(OWNER_NOTES), scale // 200)
+        self.properties = max(len(SUBURBS) * 3, scale // 3)
+        self.tenants = max(10, scale // 2)
+        self.technicians = max(5, scale // 10000)
+
+        # Filled in by generate() before any chunk runs
+        self.alarm_base = 0
+        self.update_base = 0
+        self.property_base = 0
+        self.issue_type_ids = []
+        self.technician_ids = []
+        self.tenant_ids = range(0)
+        self.property_agency = []
+        self.property_owner = []
+        self.property_sort = []
+        self.technician_names = {}
+
+    def chunks(self, total):
+        return math.ceil(total / self.batch_size)
+
+    def rng(self, kind, chunk):
+        return random.Random(f'{self.seed}:{kind}:{chunk}')
+
+
+def _generated_tables():
+    models = [ArchivedBeepingAlarmUpdate, ArchivedBeepingAlarm, BeepingAlarmUpdate, BeepingAlarmTombstone, BeepingAlarm,
+              IssueType, Property, Tenant, PropertyManager, PrivateOwner, Agency]
+    tables = [model._meta.db_table for model in models]
+    for model in (ArchivedBeepingAlarm, BeepingAlarm):
+        tables += [model.tenant.through._meta.db_table, model.allocation.through._meta.db_table]
+    return models, tables
+
+
+def _dependent_models(models, tables):
+    """Models outside the generator's tables with a foreign key into them (e.g. assets.InstalledAlarm)."""
+    dependents = {}
+    for model in models:
+        for relation in model._meta.related_objects:
+            related = relation.through if relation.many_to_many else relation.related_model
+            if related._meta.db_table not in tables:
+                dependents[related._meta.db_table] = related
+    return list(dependents.values())
+
+
+def clear_existing_data():
+    """
+    Empty every table the generator writes to. Tables from other apps that
+    reference them are only emptied along with them when they hold no rows;
+    otherwise this raises FakeDataError and nothing is removed.
+    """
+    models, tables = _generated_tables()
+    dependents = _dependent_models(models, tables)
+    in_use = [model._meta.label for model in dependents if model._base_manager.exists()]
+    if in_use:
+        raise FakeDataError(f"Not clearing: {', '.join(in_use)} still references the generated tables. "
+                            f"Empty it first or generate with --keep.")
+    # Without CASCADE: Postgres refuses rather than empties a referencing table missing from the list
+    tables += [model._meta.db_table for model in dependents]
+    with connection.cursor() as cursor:
+        # Deferred foreign key checks from rows written earlier in the same transaction would block the TRUNCATE
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY")
+
+
+def _create_technicians(plan):
+    """
+    The generator's own technicians, fake_tech_001 onwards, named by the seed.
+    Existing ones are reused (and renamed to match); other users are never allocated.
+    """
+    rng = plan.rng('technicians', 0)
+    wanted = [(f'fake_tech_{number:03d}', rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+              for number in range(1, plan.technicians + 1)]
+    existing = {user.username: user for user in User.objects.filter(username__in=[row[0] for row in wanted])}
+    new, renamed = [], []
+    for username, first_name, last_name in wanted:
+        user = existing.get(username)
+        if user is None:
+            user = User(username=username, first_name=first_name, last_name=last_name, email=f'{username}@ghhs.com')
+            user.set_unusable_password()
+            new.append(user)
+        elif (user.first_name, user.last_name) != (first_name, last_name):
+            user.first_name, user.last_name = first_name, last_name
+            renamed.append(user)
+    User.objects.bulk_create(new)
+    User.objects.bulk_update(renamed, ['first_name', 'last_name'])
+    if renamed:
+        # Alarms kept from an earlier run (--keep) sort by the old names otherwise
+        refresh_allocation_sort(BeepingAlarm.objects.filter(allocation__in=renamed).values_list('pk', flat=True))
+    return list(User.objects.filter(username__in=[row[0] for row in wanted]).order_by('username')
+                .values_list('id', flat=True))
+
+
+def _create_agencies(plan):
+    rng = plan.rng('agencies', 0)
+    base = max_id(Agency)
+    rows = []
+    for index in range(plan.agencies):
+        if index < len(AGENCIES):
+            name, email, phone, unit, number, street, suburb, postcode, lng, lat = AGENCIES[index]
+        else:
+            suburb, postcode, lng, lat = rng.choice(SUBURBS)
+            name = f'{suburb} Property Group {index}'
+            email = f'office{index}@{suburb.lower().replace(" ", "")}pg.com.au'
+            phone = _phone(rng, mobile=False)
+            unit, number, street = f'Suite {rng.randint(1, 20)}', str(rng.randint(1, 999)), rng.choice(STREET_NAMES)
+        rows.append((
+            base + index + 1, _uid(rng), name, email, phone, unit, number, street, suburb, 'QLD', postcode,
+            'Australia', lng, lat, encode_geohash(lat, lng),
+        ))
+    copy_rows(Agency._meta.db_table, [
+        'id', 'uid', 'name', 'email', 'phone', 'unit_number', 'street_number', 'street_name', 'suburb',
+        'state', 'postcode', 'country', 'longitude', 'latitude', 'geohash',
+    ], rows)
+    return [row[0] for row in rows]
+
+
+def _create_owners(plan):
+    rng = plan.rng('owners', 0)
+    base = max_id(PrivateOwner)
+    rows = []
+    for index in range(plan.owners):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append((
+            base + index + 1, _uid(rng), first_name, last_name,
+            f'{first_name}.{last_name}.{index}@email.com'.lower(), _phone(rng), rng.choice(OWNER_NOTES),
+        ))
+    copy_rows(PrivateOwner._meta.db_table, ['id', 'uid', 'first_name', 'last_name', 'email', 'phone', 'notes'], rows)
+    return [row[0] for row in rows]
+
+
+def _create_issue_types(plan):
+    rng = plan.rng('issue_types', 0)
+    base = max_id(IssueType)
+    rows = [(base + index + 1, _uid(rng), name, description) for index, (name, description) in enumerate(ISSUE_TYPES)]
+    copy_rows(IssueType._meta.db_table, ['id', 'uid', 'name', 'description'], rows)
+    return [row[0] for row in rows]
+
+
+def _create_properties(plan, agency_ids, owner_ids):
+    """Properties are either agency-managed or privately owned, never both."""
+    base = max_id(Property)
+    columns = [
+        'id', 'uid', 'agency_id', 'private_owner_id', 'unit_number', 'street_number', 'street_name',
+        'suburb', 'state', 'postcode', 'country', 'latitude', 'longitude', 'geohash',
+    ]
+    for chunk in range(plan.chunks(plan.properties)):
+        rng = plan.rng('properties', chunk)
+        rows = []
+        first = chunk * plan.batch_size
+        for index in range(first, min(first + plan.batch_size, plan.properties)):
+            suburb, postcode, lng, lat = SUBURBS[index % len(SUBURBS)]
+            agency_id = rng.choice(agency_ids) if rng.random() < 0.5 else None
+            owner_id = None if agency_id else rng.choice(owner_ids)
+            lat = round(lat + rng.uniform(-0.01, 0.01), 6)
+            lng = round(lng + rng.uniform(-0.01, 0.01), 6)
+            unit_number = str(rng.randint(1, 50)) if rng.random() < 0.5 else None
+            street_number, street_name = str(rng.randint(1, 999)), rng.choice(STREET_NAMES)
+            rows.append((
+                base + index + 1, _uid(rng), agency_id, owner_id, unit_number, street_number, street_name,
+                suburb, 'QLD', postcode, 'Australia', lat, lng, encode_geohash(lat, lng),
+            ))
+            plan.property_agency.append(agency_id)
+            plan.property_owner.append(owner_id)
+            plan.property_sort.append(property_sort_key(street_name, street_number, unit_number))
+        with transaction.atomic():
+            copy_rows(Property._meta.db_table, columns, rows)
+    return base
+
+
+def _create_tenants(plan):
+    base = max_id(Tenant)
+    for chunk in range(plan.chunks(plan.tenants)):
+        rng = plan.rng('tenants', chunk)
+        rows = []
+        first = chunk * plan.batch_size
+        for index in range(first, min(first + plan.batch_size, plan.tenants)):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows.append((
+                base + index + 1, _uid(rng), first_name, last_name,
+                f'{first_name}.{last_name}.{index}@email.com'.lower(), _phone(rng), None,
+            ))
+        with transaction.atomic():
+            copy_rows(Tenant._meta.db_table, ['id', 'uid', 'first_name', 'last_name', 'email', 'phone', 'notes'], rows)
+    return range(base + 1, base + plan.tenants + 1)
+
+
+def _timestamps(rng, status, start, span_minutes):
+    created_at = start + timedelta(minutes=rng.randrange(span_minutes))
+    if status in ('completed', 'cancelled'):
+        updated_at = created_at + timedelta(days=rng.randint(1, 7), hours=rng.randint(0, 23), minutes=rng.randint(0, 59))
+    elif status in ('new', 'requires_call_back'):
+        updated_at = created_at if rng.random() < 0.5 else created_at + timedelta(hours=rng.randint(1, 48), minutes=rng.randint(0, 59))
+    else:
+        updated_at = created_at + timedelta(days=rng.randint(0, 5), hours=rng.randint(0, 23), minutes=rng.randint(0, 59))
+    return created_at, updated_at
+
+
+ALARM_COLUMNS = [
+    'id', 'uid', 'status', 'issue_type_id', 'notes', 'agency_id', 'private_owner_id', 'is_active',
+    'is_agency', 'is_private_owner', 'property_id', 'is_customer_contacted', 'created_at', 'updated_at',
+    'is_completed', 'is_cancelled', 'property_sort', 'allocation_sort',
+]
+UPDATE_COLUMNS = ['id', 'uid', 'beeping_alarm_id', 'status', 'date', 'notes', 'update_by_id']
+
+
+def _alarm_rows(plan, chunk):
+    rng = plan.rng('alarms', chunk)
+    span_minutes = max(int((plan.end - plan.start).total_seconds() // 60), 1)
+    first = chunk * plan.batch_size
+    alarms, tenants, allocations, updates = [], [], [], []
+
+    for index in range(first, min(first + plan.batch_size, plan.alarms)):
+        alarm_id = plan.alarm_base + index + 1
+        property_index = rng.randrange(plan.properties)
+        agency_id = plan.property_agency[property_index]
+        owner_id = plan.property_owner[property_index]
+        status = rng.choice(STATUSES)
+        created_at, updated_at = _timestamps(rng, status, plan.start, span_minutes)
+        alarm = [
+            alarm_id, _uid(rng), status, rng.choice(plan.issue_type_ids), rng.choice(ALARM_NOTES),
+            agency_id, owner_id, rng.random() < 0.75, agency_id is not None, owner_id is not None,
+            plan.property_base + property_index + 1, rng.random() < 0.5, created_at, updated_at,
+            status == 'completed', status == 'cancelled', plan.property_sort[property_index],
+        ]
+
+        # 10% no tenant, 60% one, 30% two
+        tenant_roll = rng.random()
+        tenant_count = 0 if tenant_roll < 0.1 else 1 if tenant_roll < 0.7 else 2
+        for tenant_id in rng.sample(plan.tenant_ids, min(tenant_count, len(plan.tenant_ids))):
+            tenants.append((alarm_id, tenant_id))
+
+        # 20% unallocated, 50% one technician, 30% two or three
+        allocation_roll = rng.random()
+        if allocation_roll < 0.2:
+            allocation_count = 0
+        elif allocation_roll < 0.7:
+            allocation_count = 1
+        else:
+            allocation_count = rng.randint(2, 3)
+        allocated = rng.sample(plan.technician_ids, min(allocation_count, len(plan.technician_ids)))
+        for user_id in allocated:
+            allocations.append((alarm_id, user_id))
+        alarms.append((*alarm, allocation_sort_key([plan.technician_names[user_id] for user_id in allocated])))
+
+        # Status history leading from 'new' to the current status, spread up to updated_at
+        path = STATUS_PATHS[status]
+        step = (updated_at - created_at) / (len(path) or 1)
+        for position, history_status in enumerate(path, start=1):
+            updates.append((
+                plan.update_base + index * MAX_UPDATES_PER_ALARM + position, _uid(rng), alarm_id, history_status,
+                created_at + step * position, f'Status changed to {history_status}',
+                allocated[0] if allocated else rng.choice(plan.technician_ids),
+            ))
+    return alarms, tenants, allocations, updates
+
+
+def _write_alarm_chunk(plan, chunk):
+    alarms, tenants, allocations, updates = _alarm_rows(plan, chunk)
+    with transaction.atomic():
+        copy_rows(BeepingAlarm._meta.db_table, ALARM_COLUMNS, alarms)
+        copy_rows(BeepingAlarm.tenant.through._meta.db_table, ['beepingalarm_id', 'tenant_id'], tenants)
+        copy_rows(BeepingAlarm.allocation.through._meta.db_table, ['beepingalarm_id', 'user_id'], allocations)
+        copy_rows(BeepingAlarmUpdate._meta.db_table, UPDATE_COLUMNS, updates)
+    return len(alarms)
+
+
+def _worker_chunks(args):
+    plan, chunks = args
+    try:
+        return sum(_write_alarm_chunk(plan, chunk) for chunk in chunks)
+    finally:
+        connections.close_all()
+
+
+def generate(scale=200, seed=0, batch_size=5000, workers=1, clear=True, start=None, end=None, log=print):
+    """
+    Generate `scale` alarms plus proportional agencies, owners, properties,
+    tenants, issue types and technicians. Returns a dict of row counts.
+    """
+    end = end or datetime.now(dt_timezone.utc).replace(microsecond=0)
+    start = start or datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    plan = FakeDataPlan(scale, seed, batch_size, start, end)
+    started = time.perf_counter()
+
+    if clear:
+        log('Clearing existing data...')
+        clear_existing_data()
+
+    plan.technician_ids = _create_technicians(plan)
+    plan.technician_names = {user_id: (first_name, last_name) for user_id, first_name, last_name in
+                             User.objects.filter(id__in=plan.technician_ids).values_list('id', 'first_name', 'last_name')}
+    agency_ids = _create_agencies(plan)
+    owner_ids = _create_owners(plan)
+    plan.issue_type_ids = _create_issue_types(plan)
+    log(f'Created {len(agency_ids)} agencies, {len(owner_ids)} owners, {len(plan.issue_type_ids)} issue types')
+
+    plan.property_base = _create_properties(plan, agency_ids, owner_ids)
+    log(f'Created {plan.properties} properties')
+    plan.tenant_ids = _create_tenants(plan)
+    log(f'Created {plan.tenants} tenants')
+
+    plan.alarm_base = max_id(BeepingAlarm)
+    plan.update_base = max_id(BeepingAlarmUpdate)
+    chunks = list(range(plan.chunks(plan.alarms)))
+    if workers > 1 and len(chunks) > 1:
+        # Every worker opens its own connection; don't hand ours to the children
+        connections.close_all()
+        assignments = [(plan, chunks[worker::workers]) for worker in range(workers)]
+        with get_context('fork').Pool(workers) as pool:
+            created = sum(pool.map(_worker_chunks, assignments))
+    else:
+        created = 0
+        for chunk in chunks:
+            created += _write_alarm_chunk(plan, chunk)
+            log(f'Created {created} beeping alarms...')
+
+    reset_sequences(Agency, PrivateOwner, IssueType, Property, Tenant, BeepingAlarm, BeepingAlarmUpdate)
+
+    # COPY skips model signals, so invalidate the caches they would have
+    tenant_index.changed()
+    property_index.changed()
+    bump_version(USER_DIRECTORY)
+    bump_version(REFERENCE_DATA)
+    bump_version(ALARM_LIST_VERSION)
+    log(f'Created {created} beeping alarms in {time.perf_counter() - started:.1f}s')
+
+    return {
+        'agencies': len(agency_ids),
+        'private_owners': len(owner_ids),
+        'properties': plan.properties,
+        'tenants': plan.tenants,
+        'issue_types': len(plan.issue_type_ids),
+        'technicians': len(plan.technician_ids),
+        'beeping_alarms': created,
+    }
@@ -0,0 +1,81 @@
+"""
+Filters of the beeping_alarms list, declared once with common.filters.
+
+The same parsed signature filters the list (and the archive, see
+maintenance.archive), keys its cached counts and ETags, and describes live
+event views (maintenance.live).
+"""
+from django.db.models import Q
+
+from common.cache import get_derived
+from common.filters import (BooleanFilter, ChoiceFilter, DateTimeRangeFilter, Filter, FilterError, FilterSpec,
+                            IdFilter, OptionFilter, SearchFilter)
+from common.geo import parse_point
+from properties.models import Property
+from properties.spatial import within_radius
+from .models import ALARM_LIST_VERSION, ArchivedBeepingAlarm, BeepingAlarm
+
+# Largest radius accepted by the `near` filter
+MAX_RADIUS_KM = 100
+DEFAULT_RADIUS_KM = 5
+
+# Counts are dropped on any change through the ORM; this bounds raw SQL edits
+COUNT_TIMEOUT = 60 * 10
+
+CLOSED_STATUSES = ('completed', 'cancelled')
+
+
+class NearFilter(Filter):
+    """`near=lat,lng` with `radius_km` (default 5): alarms at properties within the radius."""
+
+    def parse(self, params):
+        near = self.raw(params)
+        if not near:
+            return None
+        try:
+            latitude, longitude = parse_point(near)
+            radius_km = float(self.raw(params, 'radius_km') or DEFAULT_RADIUS_KM)
+        except ValueError:
+            raise FilterError('near must be lat,lng and radius_km a number')
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise FilterError(f'radius_km must be between 0 and {MAX_RADIUS_KM}')
+        return latitude, longitude, radius_km
+
+    def q(self, value):
+        return Q(property_id__in=within_radius(Property.objects.all(), *value).values('id'))
+
+
+class BeepingAlarmFilters(FilterSpec):
+    model = BeepingAlarm
+
+    search = SearchFilter(
+        fields=['notes', 'property__street_number', 'property__street_name', 'property__suburb',
+                'property__state', 'property__postcode'],
+        related={'allocation': ['first_name', 'last_name', 'username']},
+    )
+    status = ChoiceFilter()
+    is_customer_contacted = BooleanFilter()
+    agency_private = OptionFilter({'agency': Q(is_agency=True), 'private': Q(is_private_owner=True)})
+    property = IdFilter()
+    allocation = IdFilter()
+    tenant = IdFilter()
+    created_at = DateTimeRangeFilter()
+    near = NearFilter()
+
+    @classmethod
+    def scope(cls, signature):
+        # Completed and cancelled alarms stay out of the table unless filtered for
+        if signature.get('status') in CLOSED_STATUSES:
+            return Q()
+        return Q(is_completed=False, is_cancelled=False)
+
+
+class ArchivedAlarmFilters(BeepingAlarmFilters):
+    """The same filters on the archive, which only holds completed and cancelled alarms."""
+    model = ArchivedBeepingAlarm
+
+
+def count_alarms(queryset, signature, version=None):
+    """Rows of a filtered alarm list, cached per signature until an alarm changes."""
+    key = f'count:{queryset.model._meta.model_name}:{signature.key}'
+    return get_derived(ALARM_LIST_VERSION, key, queryset.count, COUNT_TIMEOUT, version)
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from common.queue import job_handler
+from .analytics import get_time_in_status
+from .cold_storage import BATCH_SIZE, export_alarm_history
+
+
+@job_handler('maintenance.time_in_status')
+def time_in_status_job(context, statuses=None, entered_from=None, entered_to=None, include_open=False):
+    """Recompute a time-in-status report into the cache the endpoint reads."""
+    results = get_time_in_status(statuses, parse_datetime(entered_from) if entered_from else None,
+                                 parse_datetime(entered_to) if entered_to else None, include_open, refresh=True)
+    return {'generated_at': results['generated_at']}
+
+
+@job_handler('maintenance.export_alarm_history', max_attempts=3)
+def export_alarm_history_job(context, before, directory=None, batch_size=BATCH_SIZE, delete=True):
+    """export_alarm_history for cron or the admin; progress shows the file it is on."""
+    manifest = export_alarm_history(directory or settings.ALARM_COLD_STORAGE_DIR, datetime.fromisoformat(before),
+                                    batch_size, delete, log=lambda message: context.progress(message=message))
+    return {'run': manifest['run'], 'files': len(manifest['partitions']),
+            'alarms': sum(partition['rows'] for partition in manifest['partitions'])}
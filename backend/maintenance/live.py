@@ -0,0 +1,148 @@
+"""
+Live alarm events for open BeepingAlarms tables, pushed as Server-Sent Events.
+
+Model signals (maintenance.signals) publish an event on the 'alarms' channel
+of the event bus (common.events) after each commit that creates, changes or
+deletes an alarm. Every open stream holds a subscription and forwards the
+events that concern its view: the alarm matches the view's filters now, or
+matched them before the change (so the client can drop the row).
+
+Views are described with the beeping_alarms filter parameters, parsed by
+maintenance.filters. status, is_customer_contacted, agency_private, property,
+allocation, tenant and the created_at range are applied; search and near are
+not, so a view using them receives a superset and refilters client side.
+
+Bulk queryset updates don't send events; they show up in the changes feed
+(maintenance.changes), whose cursor is sent when a stream opens.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from common.events import get_event_bus
+from .changes import COMPACT_FIELDS, attach_links, current_cursor
+from .filters import BeepingAlarmFilters
+from .models import BeepingAlarm
+
+ALARM_CHANNEL = 'alarms'
+
+# Seconds between comments that keep idle connections (and proxies) from timing out
+HEARTBEAT_SECONDS = 15
+
+# Columns kept from before a save, so a change out of a view still reaches it
+VIEW_FIELDS = ['status', 'is_customer_contacted', 'is_agency', 'is_private_owner', 'property_id',
+               'is_completed', 'is_cancelled']
+
+# Notes are left out to keep events small; the drawer fetches the detail
+EVENT_FIELDS = [field for field in COMPACT_FIELDS if field != 'notes']
+
+
+def snapshot(alarm):
+    """The view-relevant columns of an alarm as loaded (deferred ones are skipped)."""
+    return {field: alarm.__dict__[field] for field in VIEW_FIELDS if field in alarm.__dict__}
+
+
+def publish_alarm(alarm_id, previous=None, created=False, links=None):
+    """
+    After the current transaction commits, publish the alarm's new state.
+
+    `previous` is its snapshot() before the change and `links` ids unlinked
+    or linked by an M2M change, e.g. {'allocation': {3}}, which count as part
+    of the previous state for matching.
+    """
+    transaction.on_commit(lambda: _publish_alarm(alarm_id, previous or {}, created, links or {}))
+
+
+def _publish_alarm(alarm_id, previous, created, links):
+    rows = attach_links(list(BeepingAlarm.objects.filter(pk=alarm_id).values(*EVENT_FIELDS)))
+    if not rows:
+        return
+    alarm = rows[0]
+    if created:
+        kind = 'alarm.created'
+    elif 'status' in previous and previous['status'] != alarm['status']:
+        kind = 'alarm.status_changed'
+    else:
+        kind = 'alarm.updated'
+    previous = {**previous, **{name: sorted(set(alarm[name]) | set(ids)) for name, ids in links.items()}}
+    get_event_bus().publish(ALARM_CHANNEL, {'type': kind, 'alarm': alarm, 'previous': previous})
+
+
+def publish_deleted_alarm(alarm):
+    event = {'type': 'alarm.deleted', 'alarm': {'id': alarm.pk, 'uid': alarm.uid}, 'previous': snapshot(alarm)}
+    transaction.on_commit(lambda: get_event_bus().publish(ALARM_CHANNEL, event))
+
+
+class AlarmView:
+    """The filters of one client's table, checked against alarm event rows."""
+
+    def __init__(self, params):
+        filters = BeepingAlarmFilters.parse(params)
+        self.status = filters.get('status')
+        self.contacted = filters.get('is_customer_contacted')
+        self.agency_private = filters.get('agency_private')
+        self.ids = {column: filters.get(name) for name, column in
+                    [('property', 'property_id'), ('allocation', 'allocation'), ('tenant', 'tenant')]
+                    if filters.get(name) is not None}
+        self.created_from, self.created_to = filters.get('created_at', (None, None))
+
+    def matches_row(self, row):
+        """Whether `row` can be in the view; columns the row lacks aren't held against it."""
+        def differs(column, wanted):
+            if column not in row:
+                return False
+            value = row[column]
+            return wanted not in value if isinstance(value, list) else value != wanted
+
+        # As the list endpoint: closed alarms only show when filtering for them
+        if self.status not in ('completed', 'cancelled') and (row.get('is_completed') or row.get('is_cancelled')):
+            return False
+        if self.status and differs('status', self.status):
+            return False
+        if self.contacted is not None and differs('is_customer_contacted', self.contacted):
+            return False
+        if self.agency_private == 'agency' and differs('is_agency', True):
+            return False
+        if self.agency_private == 'private' and differs('is_private_owner', True):
+            return False
+        if any(differs(column, wanted) for column, wanted in self.ids.items()):
+            return False
+        created_at = row.get('created_at')
+        if isinstance(created_at, str):
+            created_at = parse_datetime(created_at)
+        if created_at and self.created_from and created_at < self.created_from:
+            return False
+        if created_at and self.created_to and created_at > self.created_to:
+            return False
+        return True
+
+    def matches(self, event):
+        alarm = event['alarm']
+        if event['type'] != 'alarm.deleted' and self.matches_row(alarm):
+            return True
+        previous = event.get('previous')
+        return bool(previous) and self.matches_row({**alarm, **previous})
+
+
+def format_event(kind, data):
+    return f'event: {kind}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+async def alarm_stream(view, subscription):
+    """SSE frames for `view` until the client goes away or falls too far behind."""
+    try:
+        # Reconnecting clients catch up from this cursor with the changes feed
+        yield format_event('ready', {'cursor': current_cursor()})
+        while True:
+            event = await subscription.get(HEARTBEAT_SECONDS)
+            if subscription.overflowed:
+                yield format_event('resync', {'reason': 'Too far behind; catch up from the changes feed'})
+                return
+            if event is None:
+                yield ': keepalive\n\n'
+            elif view.matches(event):
+                yield format_event(event['type'], event)
+    finally:
+        subscription.close()
@@ -0,0 +1,160 @@
+"""
+Synthetic request logs modelling people working the BeepingAlarms page.
+
+Used when there is no captured traffic to replay (see common.loadtest). Each
+simulated user opens the page (alarm list plus the user list for the
+allocation filter), then alternates think time with the things people do on
+that page: paging, changing filters and ordering, searching, and typing into
+the tenant and property typeaheads, which fire one request per keystroke once
+the user pauses longer than the debounce.
+"""
+import json
+import random
+from urllib.parse import urlencode
+
+from .fake_data import FIRST_NAMES, STREET_NAMES, SUBURBS
+from .models import BeepingAlarm
+
+ALARMS_PATH = '/api/beeping_alarms/'
+USERS_PATH = '/api/common/users/'
+TENANT_SUGGESTIONS_PATH = '/api/maintenance/tenant-suggestions/'
+PROPERTY_SUGGESTIONS_PATH = '/api/maintenance/property-suggestions/'
+
+ORDERINGS = ['-created_at', 'created_at', 'status', 'property', '-property', 'allocation', 'customer_contacted']
+PAGE_SIZES = [10, 10, 10, 25, 50]
+
+# (action, weight) after each think time
+ACTIONS = [
+    ('next_page', 35),
+    ('filter', 25),
+    ('typeahead', 15),
+    ('search', 10),
+    ('ordering', 8),
+    ('reload', 7),
+]
+
+MEAN_THINK_SECONDS = 4.0
+KEYSTROKE_SECONDS = (0.08, 0.3)
+DEBOUNCE_SECONDS = 0.3
+
+
+class _Session:
+    """One user's view of the page: current filters, page and clock."""
+
+    def __init__(self, user, rng, now):
+        self.user = user
+        self.rng = rng
+        self.now = now
+        self.filters = {}
+        self.ordering = None
+        self.page = 1
+        self.page_size = 10
+        self.entries = []
+
+    def request(self, path, params=None, gap=0.0):
+        self.now += gap
+        self.entries.append({
+            'ts': round(self.now, 3),
+            'method': 'GET',
+            'path': path,
+            'query': urlencode(params or {}),
+            'user': self.user,
+        })
+
+    def load_alarms(self, gap=0.0):
+        params = dict(self.filters)
+        if self.ordering:
+            params['ordering'] = self.ordering
+        if self.page > 1:
+            params['page'] = self.page
+        if self.page_size != 10:
+            params['page_size'] = self.page_size
+        self.request(ALARMS_PATH, params, gap)
+
+    def open_page(self):
+        self.filters, self.ordering, self.page = {}, None, 1
+        self.page_size = self.rng.choice(PAGE_SIZES)
+        self.load_alarms()
+        self.request(USERS_PATH, gap=0.005)
+
+    def type_ahead(self, path, text):
+        """Keystrokes with human gaps; a request goes out whenever typing pauses."""
+        typed = ''
+        for position, char in enumerate(text):
+            typed += char
+            gap = self.rng.uniform(*KEYSTROKE_SECONDS)
+            last = position == len(text) - 1
+            if last or gap > DEBOUNCE_SECONDS:
+                self.request(path, {'q': typed}, DEBOUNCE_SECONDS)
+            self.now += gap
+
+    def step(self):
+        self.now += self.rng.expovariate(1 / MEAN_THINK_SECONDS)
+        action = self.rng.choices([a for a, _ in ACTIONS], weights=[w for _, w in ACTIONS])[0]
+        rng = self.rng
+
+        if action == 'next_page':
+            self.page += 1
+            self.load_alarms()
+        elif action == 'filter':
+            self.page = 1
+            name = rng.choice(['status', 'is_customer_contacted', 'agency_private', 'created_at', 'clear'])
+            if name == 'clear':
+                self.filters = {}
+            elif name == 'status':
+                self.filters['status'] = rng.choice(BeepingAlarm.STATUS_CHOICES)[0]
+            elif name == 'is_customer_contacted':
+                self.filters['is_customer_contacted'] = rng.choice(['true', 'false'])
+            elif name == 'agency_private':
+                self.filters['agency_private'] = rng.choice(['agency', 'private'])
+            else:
+                month = rng.randint(1, 11)
+                self.filters['created_at_from'] = f'2025-{month:02d}-01T00:00:00Z'
+                self.filters['created_at_to'] = f'2025-{month + 1:02d}-01T00:00:00Z'
+            self.load_alarms()
+        elif action == 'typeahead':
+            if rng.random() < 0.5:
+                self.type_ahead(TENANT_SUGGESTIONS_PATH, rng.choice(FIRST_NAMES)[:rng.randint(2, 6)])
+            else:
+                suburb = rng.choice(SUBURBS)[0]
+                street = rng.choice(STREET_NAMES)
+                self.type_ahead(PROPERTY_SUGGESTIONS_PATH, rng.choice([street, suburb, f'{rng.randint(1, 200)} {street}']))
+            # Picking a suggestion filters the table
+            if rng.random() < 0.6:
+                self.page = 1
+                self.load_alarms(gap=rng.uniform(0.5, 2.0))
+        elif action == 'search':
+            self.page = 1
+            term = rng.choice([rng.choice(SUBURBS)[0], rng.choice(STREET_NAMES).split()[0], rng.choice(FIRST_NAMES)])
+            self.filters['search'] = term
+            self.load_alarms()
+        elif action == 'ordering':
+            self.page = 1
+            self.ordering = rng.choice(ORDERINGS)
+            self.load_alarms()
+        else:
+            self.open_page()
+
+
+def synthetic_log(users=20, duration=300, seed=0):
+    """
+    Request log entries for `users` people using the page for `duration`
+    seconds, sorted by time. Arrivals are spread over the first tenth of the
+    run so the load ramps up rather than starting in lockstep.
+    """
+    rng = random.Random(seed)
+    entries = []
+    for number in range(1, users + 1):
+        session = _Session(f'user{number:03d}', random.Random(f'{seed}:{number}'), rng.uniform(0, duration / 10))
+        session.open_page()
+        while session.now < duration:
+            session.step()
+        entries += [entry for entry in session.entries if entry['ts'] <= duration]
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
+
+
+def write_log(path, entries):
+    with open(path, 'w') as handle:
+        for entry in entries:
+            handle.write(json.dumps(entry) + '\n')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from maintenance.archive import ARCHIVE_AFTER_DAYS, BATCH_SIZE, archive_closed_alarms
+
+
+class Command(BaseCommand):
+    help = ('Move completed and cancelled alarms unchanged for --days, with their links and update history, '
+            'into the archive tables in batches. Safe to run while the app is in use; run daily.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help=f'Archive alarms closed and unchanged for this many days (default {ARCHIVE_AFTER_DAYS})')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Alarms moved per transaction (default {BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be 0 or more and --batch-size at least 1')
+        total = archive_closed_alarms(options['days'], options['batch_size'], log=self.stdout.write)
+        self.stdout.write(f'Archived {total} alarms')
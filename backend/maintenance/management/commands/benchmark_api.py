@@ -0,0 +1,98 @@
+import platform
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from maintenance.benchmark import compare, load_baseline, run, save_results
+from maintenance.fake_data import generate
+from maintenance.models import BeepingAlarm
+
+BENCHMARK_SEED = 0
+BENCHMARK_START = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+BENCHMARK_END = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the API against seeded datasets and record p50/p95 latency, query count and '
+            'payload size per request, optionally checking them against a saved baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma separated alarm counts to seed and benchmark (default 10k, 100k and 1M)')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Benchmark the data already in the database instead of seeding')
+        parser.add_argument('--noinput', action='store_true',
+                            help='Do not ask before seeding, which deletes all existing data')
+        parser.add_argument('--workers', type=int, default=4, help='Processes used to seed each dataset')
+        parser.add_argument('--repeat', type=int, default=5, help='Measured calls per request')
+        parser.add_argument('--warmup', type=int, default=1, help='Unmeasured calls per request first')
+        parser.add_argument('--only', help='Comma separated request name prefixes to run, e.g. alarms.search,typeahead')
+        parser.add_argument('--output', help='Write results as JSON to this path (e.g. to save a new baseline)')
+        parser.add_argument('--baseline', help='Compare results with this JSON file and fail on regressions')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed relative growth in latency and payload size before failing (default 0.2)')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['warmup'] < 0:
+            raise CommandError('--repeat must be positive and --warmup not negative')
+        only = [prefix.strip() for prefix in options['only'].split(',')] if options['only'] else None
+
+        if options['no_seed']:
+            # Label the existing data by its size so it lines up with seeded baselines
+            datasets = [None]
+        else:
+            try:
+                datasets = [int(size) for size in options['sizes'].split(',') if size.strip()]
+            except ValueError:
+                raise CommandError('--sizes must be comma separated integers')
+            if not options['noinput']:
+                answer = input(f"Seeding deletes ALL data in database '{connection.settings_dict['NAME']}'. "
+                               "Type 'yes' to continue: ")
+                if answer != 'yes':
+                    raise CommandError('Benchmark cancelled.')
+
+        report = {
+            'meta': {
+                'ran_at': datetime.now(dt_timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+                'warmup': options['warmup'],
+            },
+            'datasets': {},
+        }
+        for dataset in datasets:
+            if dataset is None:
+                dataset = BeepingAlarm.objects.count()
+            else:
+                self.stdout.write(f'Seeding {dataset} alarms...')
+                generate(scale=dataset, seed=BENCHMARK_SEED, workers=options['workers'],
+                         start=BENCHMARK_START, end=BENCHMARK_END, log=lambda message: None)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Dataset: {dataset} alarms'))
+            report['datasets'][str(dataset)] = run(options['repeat'], options['warmup'], only, log=self.stdout.write)
+
+        if options['output']:
+            save_results(options['output'], report)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            baseline = load_baseline(options['baseline'])['datasets']
+            regressions = []
+            compared = 0
+            for dataset, results in report['datasets'].items():
+                if dataset not in baseline:
+                    self.stdout.write(self.style.WARNING(f'No baseline for dataset {dataset}'))
+                    continue
+                compared += 1
+                regressions += [f'[{dataset}] {line}'
+                                for line in compare(results, baseline[dataset], options['threshold'])]
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(line)
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+            if compared:
+                self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,44 @@
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from maintenance.cold_storage import BATCH_SIZE, COLD_AFTER_DAYS, ColdStorageError, export_alarm_history
+
+
+class Command(BaseCommand):
+    help = ('Write archived alarms created before a cutoff, with property, tenant and technician snapshots and '
+            'update history, to monthly gzip NDJSON files plus a checksummed manifest, then delete them. '
+            'Bring them back with restore_alarm_history.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Export alarms created before this date (YYYY-MM-DD, UTC)')
+        parser.add_argument('--days', type=int, default=COLD_AFTER_DAYS,
+                            help=f'Without --before, export alarms created more than this many days ago '
+                                 f'(default {COLD_AFTER_DAYS})')
+        parser.add_argument('--dir', default=settings.ALARM_COLD_STORAGE_DIR,
+                            help='Directory to write to (default ALARM_COLD_STORAGE_DIR)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Alarms read and deleted per query (default {BATCH_SIZE})')
+        parser.add_argument('--keep', action='store_true', help='Write and verify the files but keep the rows')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            day = parse_date(options['before'])
+            if day is None:
+                raise CommandError('--before must be a date (YYYY-MM-DD)')
+            before = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+        else:
+            before = timezone.now() - timedelta(days=options['days'])
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        try:
+            manifest = export_alarm_history(options['dir'], before, options['batch_size'],
+                                            delete=not options['keep'], log=self.stdout.write)
+        except ColdStorageError as error:
+            raise CommandError(str(error))
+        rows = sum(partition['rows'] for partition in manifest['partitions'])
+        self.stdout.write(f"Exported {rows} alarms in {len(manifest['partitions'])} files (run {manifest['run']})")
@@ -0,0 +1,54 @@
+from datetime import datetime, time
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from maintenance.fake_data import FakeDataError, generate
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic fake QLD agencies, properties, tenants and beeping alarms.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=200,
+                            help='Number of beeping alarms; other tables are sized in proportion (default 200)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per COPY batch')
+        parser.add_argument('--workers', type=int, default=1, help='Processes generating alarm batches in parallel')
+        parser.add_argument('--keep', action='store_true', help='Append instead of clearing existing data first')
+        parser.add_argument('--start', default='2025-01-01', help='Earliest created_at date (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Latest created_at date (YYYY-MM-DD, default now). '
+                                          'Set it to make runs on different days identical')
+
+    def handle(self, *args, **options):
+        if options['scale'] < 1 or options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--scale, --batch-size and --workers must be positive')
+
+        start = self._parse_day(options['start'], '--start')
+        end = self._parse_day(options['end'], '--end') if options['end'] else None
+        if end and end <= start:
+            raise CommandError('--end must be after --start')
+
+        try:
+            counts = generate(
+                scale=options['scale'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                clear=not options['keep'],
+                start=start,
+                end=end,
+                log=self.stdout.write,
+            )
+        except FakeDataError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS('Fake data generation complete:'))
+        for name, count in counts.items():
+            self.stdout.write(f'   - {name}: {count}')
+
+    def _parse_day(self, value, option):
+        day = parse_date(value)
+        if not day:
+            raise CommandError(f'{option} must be a date (YYYY-MM-DD)')
+        return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
@@ -0,0 +1,60 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from common.geo import parse_point
+from maintenance.planning import plan_runs
+
+
+class Command(BaseCommand):
+    help = "Group open 'to_be_scheduled' alarms into balanced, ordered technician runs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=1, help='Number of runs (ignored with --technicians)')
+        parser.add_argument('--technicians', help='Comma separated user ids, one run each')
+        parser.add_argument('--start', help='lat,lng every run should start near')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the clustering')
+        parser.add_argument('--json', action='store_true', help='Print the full plan as JSON')
+
+    def handle(self, *args, **options):
+        technicians = None
+        runs = options['runs']
+        if options['technicians']:
+            ids = [int(t) for t in options['technicians'].split(',') if t.strip()]
+            users = {user.id: user for user in User.objects.filter(id__in=ids)}
+            missing = [user_id for user_id in ids if user_id not in users]
+            if missing:
+                raise CommandError(f'Unknown technicians: {missing}')
+            technicians = [
+                {'id': users[user_id].id, 'username': users[user_id].username,
+                 'first_name': users[user_id].first_name, 'last_name': users[user_id].last_name}
+                for user_id in ids
+            ]
+            runs = len(technicians)
+        if runs < 1:
+            raise CommandError('--runs must be at least 1')
+
+        try:
+            start = parse_point(options['start']) if options['start'] else None
+        except ValueError:
+            raise CommandError('--start must be lat,lng')
+
+        started = time.perf_counter()
+        plan = plan_runs(runs, technicians=technicians, start=start, seed=options['seed'])
+        elapsed = time.perf_counter() - started
+
+        if options['json']:
+            self.stdout.write(json.dumps(plan, indent=2))
+            return
+
+        for run in plan['runs']:
+            technician = run['technician']
+            name = f"{technician['first_name']} {technician['last_name']}".strip() if technician else f"Run {run['run']}"
+            self.stdout.write(f"{name}: {len(run['stops'])} stops, {run['distance_km']} km")
+            for stop in run['stops']:
+                self.stdout.write(f"  {stop['position']:>3}. alarm {stop['alarm_id']} - {stop['label']}")
+        if plan['unplaced']:
+            self.stdout.write(f"{len(plan['unplaced'])} alarms have no property coordinates and were not placed")
+        self.stdout.write(f'Planned in {elapsed * 1000:.0f}ms')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from maintenance.changes import TOMBSTONE_RETENTION_DAYS, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (f'Delete alarm tombstones older than {TOMBSTONE_RETENTION_DAYS} days. Changes feed cursors '
+            'older than that already get a 410, so nothing still needs them. Run daily.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Deleted {prune_tombstones()} tombstones')
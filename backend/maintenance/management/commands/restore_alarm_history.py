@@ -0,0 +1,36 @@
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from maintenance.cold_storage import BATCH_SIZE, ColdStorageError, restore_alarm_history
+
+
+class Command(BaseCommand):
+    help = ('Load alarms created between --from and --to (inclusive dates, UTC) from export_alarm_history files '
+            'back into the archive tables. Alarms already present are skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='First creation date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', required=True, help='Last creation date (YYYY-MM-DD)')
+        parser.add_argument('--dir', default=settings.ALARM_COLD_STORAGE_DIR,
+                            help='Directory the exports are in (default ALARM_COLD_STORAGE_DIR)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Alarms inserted per transaction (default {BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        start, end = parse_date(options['start']), parse_date(options['end'])
+        if start is None or end is None or start > end:
+            raise CommandError('--from and --to must be dates (YYYY-MM-DD), --from first')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        try:
+            restored = restore_alarm_history(
+                options['dir'], datetime.combine(start, time.min, tzinfo=dt_timezone.utc),
+                datetime.combine(end + timedelta(days=1), time.min, tzinfo=dt_timezone.utc),
+                options['batch_size'], log=self.stdout.write)
+        except ColdStorageError as error:
+            raise CommandError(str(error))
+        self.stdout.write(f'Restored {restored} alarms')
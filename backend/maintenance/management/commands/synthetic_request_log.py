@@ -0,0 +1,27 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from maintenance.loadtest import synthetic_log, write_log
+
+
+class Command(BaseCommand):
+    help = ('Write a synthetic request log of people using the BeepingAlarms page '
+            '(paging, filters, search, typeahead bursts) for replay_requests.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the JSON lines log to write')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent simulated users')
+        parser.add_argument('--duration', type=int, default=300, help='Seconds of traffic to generate')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same log')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['duration'] < 1:
+            raise CommandError('--users and --duration must be positive')
+        entries = synthetic_log(options['users'], options['duration'], options['seed'])
+        write_log(options['output'], entries)
+
+        self.stdout.write(f"Wrote {len(entries)} requests ({len(entries) / options['duration']:.1f} req/s) "
+                          f"to {options['output']}")
+        for path, count in Counter(entry['path'] for entry in entries).most_common():
+            self.stdout.write(f'   - {path}: {count}')
@@ -0,0 +1,105 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from maintenance.analytics import SLA_STATUSES, alarm_time_in_status, compute_time_in_status, get_time_in_status
+from maintenance.models import BeepingAlarm, BeepingAlarmUpdate, IssueType
+from properties.models import PrivateOwner, Property
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Report how long alarms spend in each status (p50/p90 by status, agency and technician).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--statuses', default=','.join(SLA_STATUSES),
+                            help='Comma separated statuses to report on')
+        parser.add_argument('--from', dest='entered_from', help='Only spans entered at or after this datetime')
+        parser.add_argument('--to', dest='entered_to', help='Only spans entered at or before this datetime')
+        parser.add_argument('--include-open', action='store_true', help='Include spans that are still open')
+        parser.add_argument('--alarm', type=int, help='Print the status spans of a single alarm')
+        parser.add_argument('--refresh', action='store_true', help="Recompute and replace today's cached report")
+        parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                            help='Time the report against ROWS synthetic history rows (rolled back afterwards)')
+
+    def handle(self, *args, **options):
+        statuses = [s.strip() for s in options['statuses'].split(',') if s.strip()]
+        valid_statuses = {choice[0] for choice in BeepingAlarm.STATUS_CHOICES}
+        if not set(statuses) <= valid_statuses:
+            raise CommandError(f"Unknown status in --statuses: {options['statuses']}")
+
+        if options['benchmark']:
+            self.benchmark(options['benchmark'], statuses)
+            return
+
+        if options['alarm']:
+            spans = alarm_time_in_status(options['alarm'])
+            self.stdout.write(json.dumps(spans, indent=2, default=str))
+            return
+
+        entered_from = parse_datetime(options['entered_from']) if options['entered_from'] else None
+        entered_to = parse_datetime(options['entered_to']) if options['entered_to'] else None
+        results = get_time_in_status(statuses, entered_from, entered_to, options['include_open'],
+                                     refresh=options['refresh'])
+        self.stdout.write(json.dumps(results, indent=2, default=str))
+
+    def benchmark(self, rows, statuses):
+        """
+        Seed `rows` history rows (four updates per alarm) with generate_series,
+        time the aggregate report, then roll everything back.
+        """
+        updates_per_alarm = 4
+        alarm_count = max(rows // updates_per_alarm, 1)
+        alarm_table = BeepingAlarm._meta.db_table
+        update_table = BeepingAlarmUpdate._meta.db_table
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='time_in_status_benchmark')
+                issue_type = IssueType.objects.create(name='Benchmark')
+                owner = PrivateOwner.objects.create(first_name='Benchmark', phone='0')
+                prop = Property.objects.create(
+                    private_owner=owner, street_number='1', street_name='Benchmark Street',
+                    suburb='Brisbane', state='QLD', postcode='4000', country='Australia',
+                )
+
+                started = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"""
+                        INSERT INTO {alarm_table}
+                            (uid, status, issue_type_id, notes, is_active, is_agency, is_private_owner,
+                             property_id, is_customer_contacted, created_at, is_completed, is_cancelled)
+                        SELECT gen_random_uuid(), 'to_be_quoted', %s, 'benchmark', true, false, true,
+                               %s, false, now() - (g %% 365) * interval '1 day', false, false
+                        FROM generate_series(1, %s) g
+                    """, [issue_type.id, prop.id, alarm_count])
+                    cursor.execute(f"""
+                        INSERT INTO {update_table} (uid, beeping_alarm_id, status, date, notes, update_by_id)
+                        SELECT gen_random_uuid(), a.id,
+                               (ARRAY['requires_call_back', 'to_be_scheduled', 'awaiting_response', 'to_be_quoted'])[s],
+                               a.created_at + s * (random() * interval '3 days'), 'benchmark', %s
+                        FROM {alarm_table} a, generate_series(1, %s) s
+                        WHERE a.property_id = %s
+                    """, [user.id, updates_per_alarm, prop.id])
+                    cursor.execute(f'ANALYZE {alarm_table}')
+                    cursor.execute(f'ANALYZE {update_table}')
+                seeded = time.perf_counter() - started
+
+                started = time.perf_counter()
+                results = compute_time_in_status(statuses)
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(f'Seeded {alarm_count} alarms / {alarm_count * updates_per_alarm} '
+                                  f'history rows in {seeded:.1f}s')
+                self.stdout.write(f'Report computed in {elapsed * 1000:.0f}ms '
+                                  f'({sum(r["samples"] for r in results["by_status"])} spans)')
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('Benchmark data rolled back.')
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0007_alter_beepingalarm_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='beepingalarmupdate',
+            index=models.Index(fields=['beeping_alarm', 'date'], name='beepingalarmupdate_alarm_date'),
+        ),
+    ]
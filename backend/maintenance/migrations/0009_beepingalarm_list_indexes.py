@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0008_beepingalarmupdate_alarm_date_index'),
+        ('properties', '0015_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='beepingalarm',
+            index=models.Index(condition=models.Q(('is_cancelled', False), ('is_completed', False)), fields=['-created_at'], name='beepingalarm_open_created'),
+        ),
+        migrations.AddIndex(
+            model_name='beepingalarm',
+            index=models.Index(fields=['status', '-created_at'], name='beepingalarm_status_created'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from common.uid_migration import convert_uid_to_uuid
+
+
+class Migration(migrations.Migration):
+    # The conversion commits batch by batch and builds indexes concurrently
+    atomic = False
+
+    dependencies = [
+        ('maintenance', '0009_beepingalarm_list_indexes'),
+    ]
+
+    operations = [
+        convert_uid_to_uuid('maintenance', 'issuetype'),
+        convert_uid_to_uuid('maintenance', 'beepingalarm'),
+        convert_uid_to_uuid('maintenance', 'beepingalarmupdate'),
+    ]
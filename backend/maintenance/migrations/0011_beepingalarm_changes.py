@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:07
+
+import django.db.models.functions.datetime
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Alarms never stamped count as changed when they were created
+    BeepingAlarm = apps.get_model('maintenance', 'BeepingAlarm')
+    BeepingAlarm.objects.filter(updated_at__isnull=True).update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0010_uid_uuid'),
+        ('properties', '0016_uid_uuid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BeepingAlarmTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alarm_id', models.BigIntegerField()),
+                ('uid', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='beepingalarm',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddIndex(
+            model_name='beepingalarm',
+            index=models.Index(fields=['updated_at', 'id'], name='beepingalarm_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='beepingalarmtombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='beepingalarmtombstone_deleted'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:16
+
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+# Copies of maintenance.models.property_sort_key and allocation_sort_key as they
+# were when this migration was written, so later changes there don't alter it
+def _natural(text):
+    return re.sub(r'\d+', lambda match: match.group().zfill(8), (text or '').casefold())
+
+
+def property_sort_key(street_name, street_number, unit_number):
+    return f'{_natural(street_name)} {_natural(street_number)} {_natural(unit_number)}'.strip()[:255]
+
+
+def allocation_sort_key(names):
+    keys = [f'{first_name or ""} {last_name or ""}'.strip().casefold() for first_name, last_name in names]
+    return min(keys)[:255] if keys else ''
+
+
+def backfill_sort_keys(apps, schema_editor):
+    BeepingAlarm = apps.get_model('maintenance', 'BeepingAlarm')
+    Allocation = BeepingAlarm.allocation.through
+    last_id = 0
+    while True:
+        rows = list(BeepingAlarm.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+            'pk', 'property__street_name', 'property__street_number', 'property__unit_number')[:BATCH_SIZE])
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        names = defaultdict(list)
+        links = Allocation.objects.filter(beepingalarm_id__in=[row[0] for row in rows]).values_list(
+            'beepingalarm_id', 'user__first_name', 'user__last_name')
+        for alarm_id, first_name, last_name in links:
+            names[alarm_id].append((first_name, last_name))
+        alarms = [BeepingAlarm(pk=alarm_id, property_sort=property_sort_key(*address),
+                               allocation_sort=allocation_sort_key(names[alarm_id]))
+                  for alarm_id, *address in rows]
+        BeepingAlarm.objects.bulk_update(alarms, ['property_sort', 'allocation_sort'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch and the indexes are built concurrently
+    atomic = False
+
+    dependencies = [
+        ('maintenance', '0011_beepingalarm_changes'),
+        ('properties', '0016_uid_uuid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='beepingalarm',
+            name='beepingalarm_open_created',
+        ),
+        RemoveIndexConcurrently(
+            model_name='beepingalarm',
+            name='beepingalarm_status_created',
+        ),
+        migrations.AddField(
+            model_name='beepingalarm',
+            name='allocation_sort',
+            field=models.CharField(blank=True, db_default='', default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='beepingalarm',
+            name='property_sort',
+            field=models.CharField(blank=True, db_default='', default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_sort_keys, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='beepingalarm',
+            index=models.Index(condition=models.Q(('is_cancelled', False), ('is_completed', False)), fields=['-created_at', '-id'], name='beepingalarm_open_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='beepingalarm',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='beepingalarm_status_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='beepingalarm',
+            index=models.Index(condition=models.Q(('is_cancelled', False), ('is_completed', False)), fields=['allocation_sort', 'id'], name='beepingalarm_open_allocation'),
+        ),
+        AddIndexConcurrently(
+            model_name='beepingalarm',
+            index=models.Index(condition=models.Q(('is_cancelled', False), ('is_completed', False)), fields=['property_sort', 'id'], name='beepingalarm_open_property'),
+        ),
+        AddIndexConcurrently(
+            model_name='beepingalarm',
+            index=models.Index(condition=models.Q(('is_cancelled', False), ('is_completed', False)), fields=['is_agency', '-created_at', '-id'], name='beepingalarm_open_agency'),
+        ),
+        AddIndexConcurrently(
+            model_name='beepingalarm',
+            index=models.Index(condition=models.Q(('is_cancelled', False), ('is_completed', False)), fields=['is_customer_contacted', '-created_at', '-id'], name='beepingalarm_open_contacted'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0012_alarm_sort_keys'),
+        ('properties', '0017_prefix_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBeepingAlarm',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(editable=False, unique=True)),
+                ('status', models.CharField(choices=[('new', 'New'), ('requires_call_back', 'Requires Call Back'), ('awaiting_response', 'Awaiting Response'), ('to_be_scheduled', 'To Be Scheduled'), ('to_be_quoted', 'To Be Quoted'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=100)),
+                ('notes', models.TextField(max_length=1000)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_agency', models.BooleanField(default=True)),
+                ('is_private_owner', models.BooleanField(default=True)),
+                ('is_customer_contacted', models.BooleanField(default=False, verbose_name='Customer Contacted')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_completed', models.BooleanField(default=False)),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('allocation_sort', models.CharField(blank=True, default='', editable=False, max_length=255)),
+                ('property_sort', models.CharField(blank=True, default='', editable=False, max_length=255)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('agency', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='properties.agency')),
+                ('allocation', models.ManyToManyField(blank=True, related_name='archived_alarm_issues', to=settings.AUTH_USER_MODEL)),
+                ('issue_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='maintenance.issuetype')),
+                ('private_owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='properties.privateowner')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='properties.property')),
+                ('tenant', models.ManyToManyField(blank=True, related_name='archived_alarm_issues', to='properties.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedBeepingAlarmUpdate',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('uid', models.UUIDField(editable=False, unique=True)),
+                ('status', models.CharField(choices=[('new', 'New'), ('requires_call_back', 'Requires Call Back'), ('awaiting_response', 'Awaiting Response'), ('to_be_scheduled', 'To Be Scheduled'), ('to_be_quoted', 'To Be Quoted'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=100)),
+                ('date', models.DateTimeField()),
+                ('notes', models.TextField(max_length=1000)),
+                ('beeping_alarm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='maintenance.archivedbeepingalarm')),
+                ('update_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedbeepingalarm',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='archivedalarm_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbeepingalarmupdate',
+            index=models.Index(fields=['beeping_alarm', 'date'], name='archivedalarmupdate_alarm_date'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0013_alarm_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbeepingalarmupdate',
+            name='changes',
+            field=models.JSONField(blank=True, db_default={}, default=dict),
+        ),
+        migrations.AddField(
+            model_name='beepingalarmupdate',
+            name='changes',
+            field=models.JSONField(blank=True, db_default={}, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='archivedbeepingalarmupdate',
+            name='notes',
+            field=models.TextField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AlterField(
+            model_name='archivedbeepingalarmupdate',
+            name='update_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='beepingalarmupdate',
+            name='notes',
+            field=models.TextField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AlterField(
+            model_name='beepingalarmupdate',
+            name='update_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
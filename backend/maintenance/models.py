@@ -1,17 +1,56 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Now
+from django.utils import timezone
 from properties.models import Agency, PrivateOwner, Property, Tenant
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from common.cache import bump_version
+import re
 import uuid
 
+def _natural(text):
+    # Zero-pad runs of digits so '12' sorts before '100'
+    return re.sub(r'\d+', lambda match: match.group().zfill(8), (text or '').casefold())
+
+def property_sort_key(street_name, street_number, unit_number):
+    """BeepingAlarm.property_sort: street, then number, then unit, numbers compared as numbers."""
+    return f'{_natural(street_name)} {_natural(street_number)} {_natural(unit_number)}'.strip()[:255]
+
+def allocation_sort_key(names):
+    """BeepingAlarm.allocation_sort from the allocated users' (first_name, last_name) pairs."""
+    keys = [f'{first_name or ""} {last_name or ""}'.strip().casefold() for first_name, last_name in names]
+    return min(keys)[:255] if keys else ''
+
 class IssueType(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     description = models.TextField(max_length=1000, null=True, blank=True)
 
     def __str__(self):
         return self.name
     
+# common.cache version of everything the beeping_alarms list shows: alarms and the
+# records embedded in them. Bumped after each commit that changes one (see signals)
+ALARM_LIST_VERSION = 'beeping_alarm_list'
+
+def alarm_list_changed():
+    transaction.on_commit(lambda: bump_version(ALARM_LIST_VERSION))
+
+class BeepingAlarmQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Bulk updates move updated_at too, so the changes feed sees them, expire
+        cached lists, and are recorded in the alarms' history (maintenance.audit).
+        """
+        from .audit import audited_update
+        kwargs.setdefault('updated_at', timezone.now())
+        alarm_list_changed()
+        return audited_update(self, kwargs, super().update)
+
+    def touch(self):
+        """Mark the alarms changed without changing anything else (e.g. after an M2M edit)."""
+        return self.update(updated_at=timezone.now())
+
 class BeepingAlarm(models.Model):
     STATUS_CHOICES = [
         ('new', 'New'),
@@ -23,7 +62,7 @@ class BeepingAlarm(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     allocation = models.ManyToManyField('auth.User', related_name='alarm_issues', blank=True)
     status = models.CharField(max_length=100, choices=STATUS_CHOICES, default='new')  
     issue_type = models.ForeignKey(IssueType, on_delete=models.CASCADE)
@@ -37,9 +76,37 @@ class BeepingAlarm(models.Model):
     tenant = models.ManyToManyField(Tenant, related_name='alarm_issues', blank=True)
     is_customer_contacted = models.BooleanField(default=False, verbose_name="Customer Contacted")
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
     is_completed = models.BooleanField(default=False)
     is_cancelled = models.BooleanField(default=False)
+    # Denormalized sort keys for the beeping_alarms table (see maintenance.ordering);
+    # allocation_sort is the primary (first by name) technician
+    allocation_sort = models.CharField(max_length=255, blank=True, default='', db_default='', editable=False)
+    property_sort = models.CharField(max_length=255, blank=True, default='', db_default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # One per ordering in maintenance.ordering.ORDERINGS, over open alarms unless
+            # the ordering is mostly used with a status filter; descending sorts scan backwards
+            models.Index(fields=['-created_at', '-id'], name='beepingalarm_open_created',
+                         condition=models.Q(is_completed=False, is_cancelled=False)),
+            models.Index(fields=['status', '-created_at', '-id'], name='beepingalarm_status_created'),
+            models.Index(fields=['allocation_sort', 'id'], name='beepingalarm_open_allocation',
+                         condition=models.Q(is_completed=False, is_cancelled=False)),
+            models.Index(fields=['property_sort', 'id'], name='beepingalarm_open_property',
+                         condition=models.Q(is_completed=False, is_cancelled=False)),
+            models.Index(fields=['is_agency', '-created_at', '-id'], name='beepingalarm_open_agency',
+                         condition=models.Q(is_completed=False, is_cancelled=False)),
+            models.Index(fields=['is_customer_contacted', '-created_at', '-id'], name='beepingalarm_open_contacted',
+                         condition=models.Q(is_completed=False, is_cancelled=False)),
+            # The changes feed walks (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='beepingalarm_updated'),
+        ]
+
+    objects = BeepingAlarmQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Alarm {self.pk} ({self.get_status_display()})"
 
     def clean(self):
         """
@@ -56,14 +123,103 @@ class BeepingAlarm(models.Model):
     def save(self, *args, **kwargs):
         """
         Override save to call clean() validation.
+
+        A save limited by update_fields still moves updated_at, and
+        property_sort follows the property. allocation_sort follows the M2M
+        links (maintenance.signals).
         """
         self.clean()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'property', 'property_id'} & set(update_fields):
+            prop = self.property
+            self.property_sort = property_sort_key(prop.street_name, prop.street_number, prop.unit_number)
+        if update_fields:
+            extra = ['updated_at'] + (['property_sort'] if {'property', 'property_id'} & set(update_fields) else [])
+            kwargs['update_fields'] = list(update_fields) + [name for name in extra if name not in update_fields]
         super().save(*args, **kwargs)
 
 class BeepingAlarmUpdate(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    """
+    One entry in an alarm's history: its status after the change, and
+    `changes` as {field: [old, new]} (written by maintenance.audit).
+    update_by is empty for changes made outside a user's request.
+    """
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     beeping_alarm = models.ForeignKey(BeepingAlarm, on_delete=models.CASCADE)
     status = models.CharField(max_length=100, choices=BeepingAlarm.STATUS_CHOICES)
     date = models.DateTimeField(auto_now_add=True)
+    notes = models.TextField(max_length=1000, blank=True, default='')
+    update_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    changes = models.JSONField(default=dict, db_default={}, blank=True)
+
+    class Meta:
+        indexes = [
+            # Supports the per-alarm LAG/LEAD windows used by maintenance.analytics
+            models.Index(fields=['beeping_alarm', 'date'], name='beepingalarmupdate_alarm_date'),
+        ]
+
+class BeepingAlarmTombstone(models.Model):
+    """A deleted alarm, kept for a while so the changes feed can tell clients to drop it."""
+    alarm_id = models.BigIntegerField()
+    uid = models.UUIDField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='beepingalarmtombstone_deleted'),
+        ]
+
+class ArchivedBeepingAlarm(models.Model):
+    """
+    A completed or cancelled alarm moved out of BeepingAlarm by maintenance.archive.
+
+    Keeps the alarm's id, uid and columns as they were when it was archived,
+    under the same names, so filters, orderings and serializers written for
+    BeepingAlarm work on it unchanged. Read only.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    uid = models.UUIDField(unique=True, editable=False)
+    allocation = models.ManyToManyField('auth.User', related_name='archived_alarm_issues', blank=True)
+    status = models.CharField(max_length=100, choices=BeepingAlarm.STATUS_CHOICES)
+    issue_type = models.ForeignKey(IssueType, on_delete=models.CASCADE)
     notes = models.TextField(max_length=1000)
-    update_by = models.ForeignKey(User, on_delete=models.CASCADE)
\ No newline at end of file
+    agency = models.ForeignKey(Agency, on_delete=models.CASCADE, null=True, blank=True)
+    private_owner = models.ForeignKey(PrivateOwner, on_delete=models.CASCADE, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    is_agency = models.BooleanField(default=True)
+    is_private_owner = models.BooleanField(default=True)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE)
+    tenant = models.ManyToManyField(Tenant, related_name='archived_alarm_issues', blank=True)
+    is_customer_contacted = models.BooleanField(default=False, verbose_name="Customer Contacted")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_completed = models.BooleanField(default=False)
+    is_cancelled = models.BooleanField(default=False)
+    allocation_sort = models.CharField(max_length=255, blank=True, default='', editable=False)
+    property_sort = models.CharField(max_length=255, blank=True, default='', editable=False)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Archived alarms are only listed with a status filter
+            models.Index(fields=['status', '-created_at', '-id'], name='archivedalarm_status_created'),
+        ]
+
+    def __str__(self):
+        return f"Archived alarm {self.pk} ({self.get_status_display()})"
+
+class ArchivedBeepingAlarmUpdate(models.Model):
+    """BeepingAlarmUpdate history of an archived alarm."""
+    id = models.BigIntegerField(primary_key=True)
+    uid = models.UUIDField(unique=True, editable=False)
+    beeping_alarm = models.ForeignKey(ArchivedBeepingAlarm, on_delete=models.CASCADE)
+    status = models.CharField(max_length=100, choices=BeepingAlarm.STATUS_CHOICES)
+    date = models.DateTimeField()
+    notes = models.TextField(max_length=1000, blank=True, default='')
+    update_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    changes = models.JSONField(default=dict, db_default={}, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['beeping_alarm', 'date'], name='archivedalarmupdate_alarm_date'),
+        ]
@@ -0,0 +1,67 @@
+"""
+Orderings accepted by the beeping_alarms list.
+
+Each key maps to a full order_by ending in a unique column, so pages never
+overlap or skip rows, and each one (or its exact reverse, for '-key') matches
+an index in BeepingAlarm.Meta.indexes. Sorting by allocation or property reads
+the denormalized allocation_sort / property_sort columns instead of joining,
+so an alarm with two technicians is still one row. Anything else is rejected.
+"""
+from collections import defaultdict
+
+from properties.models import Property
+from .models import ArchivedBeepingAlarm, BeepingAlarm, allocation_sort_key, property_sort_key
+
+ORDERINGS = {
+    'created_at': ('created_at', 'id'),
+    'status': ('status', '-created_at', '-id'),
+    'allocation': ('allocation_sort', 'id'),
+    'property': ('property_sort', 'id'),
+    'agency_private': ('is_agency', '-created_at', '-id'),
+    'customer_contacted': ('is_customer_contacted', '-created_at', '-id'),
+}
+DEFAULT_ORDERING = '-created_at'
+
+
+def _reverse(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def ordering_fields(ordering):
+    """order_by() fields for a whitelisted ordering such as 'property' or '-created_at'; ValueError otherwise."""
+    key = ordering[1:] if ordering.startswith('-') else ordering
+    if key not in ORDERINGS:
+        choices = ', '.join(sorted(ORDERINGS))
+        raise ValueError(f"Unknown ordering '{ordering}'; use one of {choices}, optionally prefixed with '-'")
+    fields = ORDERINGS[key]
+    return tuple(map(_reverse, fields)) if ordering.startswith('-') else fields
+
+
+def order_alarms(queryset, ordering):
+    return queryset.order_by(*ordering_fields(ordering))
+
+
+def refresh_allocation_sort(alarm_ids):
+    """Recompute allocation_sort for `alarm_ids`, writing only the rows that change."""
+    alarm_ids = set(alarm_ids)
+    if not alarm_ids:
+        return
+    names = defaultdict(list)
+    links = (BeepingAlarm.allocation.through.objects.filter(beepingalarm_id__in=alarm_ids)
+             .values_list('beepingalarm_id', 'user__first_name', 'user__last_name'))
+    for alarm_id, first_name, last_name in links:
+        names[alarm_id].append((first_name, last_name))
+    current = BeepingAlarm.objects.filter(pk__in=alarm_ids).values_list('pk', 'allocation_sort')
+    changed = [BeepingAlarm(pk=alarm_id, allocation_sort=allocation_sort_key(names[alarm_id]))
+               for alarm_id, key in current if key != allocation_sort_key(names[alarm_id])]
+    BeepingAlarm.objects.bulk_update(changed, ['allocation_sort'], batch_size=1000)
+
+
+def refresh_property_sort(property_id):
+    """Recompute property_sort on the alarms (archived ones too) of one property after its address changed."""
+    address = (Property.objects.filter(pk=property_id)
+               .values_list('street_name', 'street_number', 'unit_number').first())
+    if address is not None:
+        key = property_sort_key(*address)
+        for model in (BeepingAlarm, ArchivedBeepingAlarm):
+            model.objects.filter(property_id=property_id).exclude(property_sort=key).update(property_sort=key)
@@ -0,0 +1,318 @@
+"""
+Daily run planning for alarms waiting to be scheduled.
+
+Alarms in 'to_be_scheduled' are split into N balanced runs by clustering their
+property coordinates (k-means with a capacity-constrained assignment step), and
+each run is ordered with a nearest-neighbour tour improved by 2-opt. All
+distance work is vectorised with NumPy on a local flat projection, which is
+accurate to well under 1% at the scale of a city. Ordering a run never builds
+its full stop-to-stop distance matrix: 2-opt only tries each stop's nearest
+neighbours, so memory grows linearly with the size of the run.
+"""
+import math
+
+import numpy as np
+
+from .models import BeepingAlarm
+from .suggestions import property_label
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG_AT_EQUATOR = 111.320
+
+MAX_KMEANS_ITERATIONS = 25
+BALANCING_ROUNDS = 3
+MAX_TWO_OPT_PASSES = 200
+TWO_OPT_NEIGHBOURS = 10
+# Distances worked out at once when an outlier's neighbours are searched for
+# among all the stops (~8MB of floats)
+NEIGHBOUR_BLOCK_SIZE = 1_000_000
+
+
+def _project(latitudes, longitudes):
+    """Equirectangular projection to km around the points' mean latitude."""
+    scale = KM_PER_DEGREE_LNG_AT_EQUATOR * math.cos(math.radians(float(latitudes.mean())))
+    return np.column_stack((longitudes * scale, latitudes * KM_PER_DEGREE_LAT))
+
+
+def _pairwise(a, b):
+    return np.hypot(a[:, 0, None] - b[None, :, 0], a[:, 1, None] - b[None, :, 1])
+
+
+def _distance(points, i, j):
+    """Distances between points[i] and points[j], for index arrays that broadcast together."""
+    delta = points[i] - points[j]
+    return np.hypot(delta[..., 0], delta[..., 1])
+
+
+def _closest(points, members, candidates, k):
+    """The k candidates nearest each member (not counting itself), nearest first, with their distances."""
+    distances = _pairwise(points[members], points[candidates])
+    distances[members[:, None] == candidates[None, :]] = np.inf
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+    by_distance = np.argsort(nearest_distances, axis=1, kind='stable')
+    return (candidates[np.take_along_axis(nearest, by_distance, axis=1)],
+            np.take_along_axis(nearest_distances, by_distance, axis=1))
+
+
+def _nearest_neighbours(points, k):
+    """
+    Each point's k nearest other points, nearest first.
+
+    Points are bucketed into a grid of cells holding about k points each, and
+    a cell's points are compared with the cells around it. That answer is
+    exact once every k-th neighbour found is closer than the edge of the
+    surrounding block; points where it isn't (outliers) are compared with
+    everything. Memory stays linear in the number of points.
+    """
+    n = len(points)
+    k = min(k, n - 1)
+    origin = points.min(axis=0)
+    span = points.max(axis=0) - origin
+    cell = max(math.sqrt(span[0] * span[1] * k / n), float(span.max()) * k / n) or 1.0
+    cells = np.floor((points - origin) / cell).astype(np.int64)
+    order = np.lexsort((cells[:, 1], cells[:, 0]))
+    boundaries = np.flatnonzero(np.any(np.diff(cells[order], axis=0), axis=1)) + 1
+    buckets = {tuple(cells[members[0]].tolist()): members for members in np.split(order, boundaries)}
+
+    neighbours = np.empty((n, k), dtype=np.int64)
+    everyone = np.arange(n)
+    for (x, y), members in buckets.items():
+        for ring in (1, 2):
+            candidates = [buckets.get((x + dx, y + dy)) for dx in range(-ring, ring + 1)
+                          for dy in range(-ring, ring + 1)]
+            candidates = np.concatenate([bucket for bucket in candidates if bucket is not None])
+            if len(candidates) > k:
+                found, distances = _closest(points, members, candidates, k)
+                if len(candidates) == n or distances[:, -1].max() <= ring * cell:
+                    break
+        else:
+            rows = max(1, NEIGHBOUR_BLOCK_SIZE // n)
+            found = np.concatenate([_closest(points, members[begin:begin + rows], everyone, k)[0]
+                                    for begin in range(0, len(members), rows)])
+        neighbours[members] = found
+    return neighbours
+
+
+def _init_centroids(points, k, rng):
+    """k-means++ seeding."""
+    centroids = [points[rng.integers(len(points))]]
+    closest = ((points - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        index = rng.integers(len(points)) if total == 0 else rng.choice(len(points), p=closest / total)
+        centroids.append(points[index])
+        closest = np.minimum(closest, ((points - points[index]) ** 2).sum(axis=1))
+    return np.array(centroids)
+
+
+def _balanced_assign(distances, capacity):
+    """
+    Assign each point to its nearest centroid that still has room.
+
+    Points with the most to lose from not getting their first choice (largest
+    gap to their second choice) are placed first.
+    """
+    n, k = distances.shape
+    preferences = np.argsort(distances, axis=1)
+    if k > 1:
+        ordered = np.take_along_axis(distances, preferences[:, :2], axis=1)
+        regret = ordered[:, 1] - ordered[:, 0]
+    else:
+        regret = np.zeros(n)
+    labels = np.empty(n, dtype=np.int64)
+    load = np.zeros(k, dtype=np.int64)
+    for point in np.argsort(-regret):
+        for cluster in preferences[point]:
+            if load[cluster] < capacity:
+                labels[point] = cluster
+                load[cluster] += 1
+                break
+    return labels
+
+
+def _update_centroids(points, labels, centroids):
+    k = len(centroids)
+    counts = np.bincount(labels, minlength=k)
+    sums = np.zeros_like(centroids)
+    np.add.at(sums, labels, points)
+    occupied = counts > 0
+    centroids[occupied] = sums[occupied] / counts[occupied, None]
+    return centroids
+
+
+def balanced_kmeans(points, k, seed=0):
+    """
+    Cluster `points` (n x 2, km) into k clusters of at most ceil(n / k) points.
+
+    Plain Lloyd iterations (fully vectorised) find the shape of the clusters; a
+    few capacity-constrained rounds then even out their sizes.
+    """
+    n = len(points)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    capacity = math.ceil(n / k)
+    centroids = _init_centroids(points, k, rng)
+
+    labels = None
+    for _ in range(MAX_KMEANS_ITERATIONS):
+        new_labels = np.argmin(_pairwise(points, centroids), axis=1)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        centroids = _update_centroids(points, labels, centroids)
+
+    for _ in range(BALANCING_ROUNDS):
+        new_labels = _balanced_assign(_pairwise(points, centroids), capacity)
+        if np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        centroids = _update_centroids(points, labels, centroids)
+    return labels
+
+
+def _nearest_neighbour_tour(points, neighbours, start):
+    """
+    Always go to the closest unvisited stop: the first unvisited one in the
+    current stop's `neighbours` list, or from a full scan once they are all
+    visited.
+    """
+    n = len(points)
+    visited = np.zeros(n, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    candidates = neighbours.tolist()
+    for _ in range(n - 1):
+        nxt = next((stop for stop in candidates[tour[-1]] if not visited[stop]), None)
+        if nxt is None:
+            current = points[tour[-1]]
+            row = np.hypot(points[:, 0] - current[0], points[:, 1] - current[1])
+            row[visited] = np.inf
+            nxt = int(np.argmin(row))
+        tour.append(nxt)
+        visited[nxt] = True
+    return np.array(tour)
+
+
+def _two_opt(tour, points, neighbours):
+    """
+    Improve an open tour with 2-opt moves.
+
+    Each pass scores, for every edge (a, b), the moves that reconnect `a` to one
+    of its `neighbours` (its TWO_OPT_NEIGHBOURS nearest stops), all in one vectorised step, then
+    applies the improving moves best-first as long as they don't overlap a move
+    already applied in that pass.
+    """
+    tour = tour.copy()
+    n = len(tour)
+    if n < 4:
+        return tour
+    first = np.arange(1, n - 1)
+    position = np.empty(n, dtype=np.int64)
+
+    for _ in range(MAX_TWO_OPT_PASSES):
+        position[tour] = np.arange(n)
+        a = tour[first - 1]
+        b = tour[first]
+        c = neighbours[a]
+        # Reversing tour[i:j + 1] replaces edges (a, b), (c, d) with (a, c), (b, d)
+        last = position[c]
+        has_next = last + 1 < n
+        d = tour[np.minimum(last + 1, n - 1)]
+        gain = _distance(points, a, b)[:, None] - _distance(points, a[:, None], c)
+        gain += np.where(has_next, _distance(points, c, d) - _distance(points, b[:, None], d), 0.0)
+        gain = np.where(last > first[:, None], gain, -np.inf)
+
+        rows, columns = np.nonzero(gain > 1e-9)
+        if len(rows) == 0:
+            break
+        locked = np.zeros(n + 1, dtype=bool)
+        for index in np.argsort(-gain[rows, columns]):
+            i = first[rows[index]]
+            j = last[rows[index], columns[index]]
+            if locked[i - 1:j + 2].any():
+                continue
+            tour[i:j + 1] = tour[i:j + 1][::-1]
+            locked[i - 1:j + 2] = True
+    return tour
+
+
+def order_stops(points, start=None):
+    """
+    Order the stops of one run. Starts from the stop nearest `start` (km point)
+    when given, otherwise from the stop furthest from the run's centre.
+    """
+    if len(points) == 1:
+        return np.array([0]), 0.0
+    if start is not None:
+        first = int(np.argmin(((points - start) ** 2).sum(axis=1)))
+    else:
+        first = int(np.argmax(((points - points.mean(axis=0)) ** 2).sum(axis=1)))
+    neighbours = _nearest_neighbours(points, TWO_OPT_NEIGHBOURS)
+    tour = _two_opt(_nearest_neighbour_tour(points, neighbours, first), points, neighbours)
+    length = float(_distance(points, tour[:-1], tour[1:]).sum())
+    return tour, length
+
+
+def schedulable_alarms():
+    """Open 'to_be_scheduled' alarms with their property coordinates, in one query."""
+    return list(
+        BeepingAlarm.objects.filter(status='to_be_scheduled', is_completed=False, is_cancelled=False)
+        .order_by('id')
+        .values_list(
+            'id', 'property_id', 'property__latitude', 'property__longitude',
+            'property__unit_number', 'property__street_number', 'property__street_name',
+            'property__suburb', 'property__state', 'property__postcode',
+        )
+    )
+
+
+def plan_runs(runs, technicians=None, start=None, seed=0):
+    """
+    Split schedulable alarms into `runs` ordered runs.
+
+    `technicians` (optional) is a list of labels/ids, one per run, attached to
+    the runs in order. `start` is an optional (lat, lng) every run begins near.
+    Alarms whose property has no coordinates are returned under 'unplaced'.
+    """
+    rows = schedulable_alarms()
+    placed = [row for row in rows if row[2] is not None and row[3] is not None]
+    unplaced = [{'alarm_id': row[0], 'property_id': row[1], 'label': property_label(*row[4:])}
+                for row in rows if row[2] is None or row[3] is None]
+
+    plan = {'runs': [], 'unplaced': unplaced}
+    if not placed:
+        return plan
+
+    latitudes = np.array([float(row[2]) for row in placed])
+    longitudes = np.array([float(row[3]) for row in placed])
+    points = _project(latitudes, longitudes)
+    start_point = None
+    if start is not None:
+        scale = KM_PER_DEGREE_LNG_AT_EQUATOR * math.cos(math.radians(float(latitudes.mean())))
+        start_point = np.array([start[1] * scale, start[0] * KM_PER_DEGREE_LAT])
+
+    labels = balanced_kmeans(points, runs, seed=seed)
+    for run_index in range(labels.max() + 1):
+        members = np.flatnonzero(labels == run_index)
+        if len(members) == 0:
+            continue
+        tour, length = order_stops(points[members], start_point)
+        stops = []
+        for position, member in enumerate(members[tour], start=1):
+            row = placed[member]
+            stops.append({
+                'position': position,
+                'alarm_id': row[0],
+                'property_id': row[1],
+                'label': property_label(*row[4:]),
+                'latitude': float(row[2]),
+                'longitude': float(row[3]),
+            })
+        plan['runs'].append({
+            'run': len(plan['runs']) + 1,
+            'technician': technicians[len(plan['runs'])] if technicians else None,
+            'distance_km': round(length, 2),
+            'stops': stops,
+        })
+    return plan
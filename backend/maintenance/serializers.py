@@ -21,4 +21,12 @@ class BeepingAlarmSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = BeepingAlarm
-        fields = '__all__'
\ No newline at end of file
+        # Denormalized ordering keys (see maintenance.ordering) are internal
+        exclude = ['allocation_sort', 'property_sort']
+
+class BeepingAlarmWriteSerializer(serializers.ModelSerializer):
+    """Partial updates from the alarm drawer; related records are given by id."""
+
+    class Meta:
+        model = BeepingAlarm
+        exclude = ['id', 'uid', 'created_at', 'updated_at']
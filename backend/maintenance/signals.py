@@ -0,0 +1,190 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from properties.models import Property, Tenant
+from .audit import loaded_state, record_create, record_links, record_save
+from .details import alarm_records_changed
+from .live import publish_alarm, publish_deleted_alarm, snapshot
+from .ordering import refresh_allocation_sort, refresh_property_sort
+from .models import BeepingAlarm, BeepingAlarmTombstone, alarm_list_changed
+from .suggestions import property_index, tenant_index
+
+
+@receiver(post_init, sender=BeepingAlarm)
+def remember_alarm_property(sender, instance, **kwargs):
+    # Kept so a save that moves the alarm to another property refreshes both
+    instance._suggestion_property_id = instance.__dict__.get('property_id')
+
+
+@receiver(post_save, sender=BeepingAlarm)
+def refresh_suggestions_for_alarm(sender, instance, created, **kwargs):
+    property_index.refresh({instance.property_id, getattr(instance, '_suggestion_property_id', None)})
+    instance._suggestion_property_id = instance.property_id
+    if not created:
+        tenant_index.refresh(instance.tenant.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=BeepingAlarm)
+def refresh_suggestions_for_deleted_alarm(sender, instance, **kwargs):
+    # The tenant links are already gone at this point, so rebuild rather than patch
+    property_index.refresh({instance.property_id})
+    tenant_index.changed()
+
+
+@receiver(m2m_changed, sender=BeepingAlarm.tenant.through)
+def refresh_suggestions_for_alarm_tenants(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        tenant_index.refresh({instance.pk} if reverse else pk_set)
+    elif action == 'post_clear':
+        tenant_index.changed()
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def refresh_tenant_suggestion(sender, instance, **kwargs):
+    tenant_index.refresh({instance.pk})
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def refresh_property_suggestion(sender, instance, **kwargs):
+    property_index.refresh({instance.pk})
+
+
+@receiver(post_delete, sender=BeepingAlarm)
+def record_alarm_tombstone(sender, instance, **kwargs):
+    BeepingAlarmTombstone.objects.create(alarm_id=instance.pk, uid=instance.uid)
+
+
+@receiver(m2m_changed, sender=BeepingAlarm.allocation.through)
+@receiver(m2m_changed, sender=BeepingAlarm.tenant.through)
+def touch_alarms_for_links(sender, instance, action, reverse, pk_set, **kwargs):
+    # Link changes don't save the alarm, but the changes feed needs to see them
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        BeepingAlarm.objects.filter(pk=instance.pk).touch()
+    elif action == 'pre_clear':
+        instance.alarm_issues.touch()
+    else:
+        BeepingAlarm.objects.filter(pk__in=pk_set).touch()
+
+
+@receiver(pre_delete, sender=Tenant)
+@receiver(pre_delete, sender=User)
+def touch_alarms_for_deleted_links(sender, instance, **kwargs):
+    instance.alarm_issues.touch()
+
+
+@receiver(post_init, sender=BeepingAlarm)
+def remember_alarm_view_fields(sender, instance, **kwargs):
+    instance._live_previous = snapshot(instance)
+
+
+@receiver(post_save, sender=BeepingAlarm)
+def publish_saved_alarm(sender, instance, created, **kwargs):
+    publish_alarm(instance.pk, previous=None if created else instance._live_previous, created=created)
+    instance._live_previous = snapshot(instance)
+
+
+@receiver(post_delete, sender=BeepingAlarm)
+def publish_alarm_deletion(sender, instance, **kwargs):
+    publish_deleted_alarm(instance)
+
+
+@receiver(m2m_changed, sender=BeepingAlarm.allocation.through)
+@receiver(m2m_changed, sender=BeepingAlarm.tenant.through)
+def publish_alarm_links(sender, instance, action, reverse, pk_set, **kwargs):
+    name = 'allocation' if sender is BeepingAlarm.allocation.through else 'tenant'
+    if action == 'pre_clear':
+        pk_set = set((instance.alarm_issues if reverse else getattr(instance, name)).values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if reverse:
+        for alarm_id in pk_set:
+            publish_alarm(alarm_id, links={name: {instance.pk}})
+    else:
+        publish_alarm(instance.pk, links={name: pk_set})
+
+
+@receiver(m2m_changed, sender=BeepingAlarm.allocation.through)
+def refresh_alarm_allocation_sort(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_alarm_ids = list(instance.alarm_issues.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            refresh_allocation_sort([instance.pk])
+        else:
+            refresh_allocation_sort(pk_set if action != 'post_clear' else instance._cleared_alarm_ids)
+
+
+@receiver(post_save, sender=User)
+def refresh_allocation_sort_for_user(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields != frozenset({'last_login'}):
+        refresh_allocation_sort(instance.alarm_issues.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=User)
+def remember_user_alarms(sender, instance, **kwargs):
+    # The links are gone by post_delete
+    instance._allocated_alarm_ids = list(instance.alarm_issues.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def refresh_allocation_sort_for_deleted_user(sender, instance, **kwargs):
+    refresh_allocation_sort(getattr(instance, '_allocated_alarm_ids', []))
+
+
+@receiver(post_save, sender=Property)
+def refresh_property_sort_for_property(sender, instance, created, **kwargs):
+    if not created:
+        refresh_property_sort(instance.pk)
+
+
+@receiver(post_save, sender=BeepingAlarm)
+@receiver(post_delete, sender=BeepingAlarm)
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=User)
+def expire_alarm_lists(sender, instance, update_fields=None, **kwargs):
+    # Link changes and deleted tenants or users touch() the alarms, which expires them too
+    if update_fields != frozenset({'last_login'}):
+        alarm_list_changed()
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=User)
+def expire_alarm_details(sender, instance, created, update_fields=None, **kwargs):
+    # Cached alarms embed these; the alarms' own changes move their updated_at instead
+    if not created and update_fields != frozenset({'last_login'}):
+        alarm_records_changed()
+
+
+@receiver(post_init, sender=BeepingAlarm)
+def remember_alarm_audit_state(sender, instance, **kwargs):
+    instance._audit_loaded = loaded_state(instance)
+
+
+@receiver(post_save, sender=BeepingAlarm)
+def record_alarm_changes(sender, instance, created, update_fields=None, using=None, **kwargs):
+    if created:
+        record_create(instance, using)
+    else:
+        record_save(instance, update_fields, using)
+
+
+@receiver(m2m_changed, sender=BeepingAlarm.allocation.through)
+@receiver(m2m_changed, sender=BeepingAlarm.tenant.through)
+def record_alarm_link_changes(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    # Edits from the user or tenant side (and their deletion) are not recorded per alarm
+    if reverse:
+        return
+    name = 'allocation' if sender is BeepingAlarm.allocation.through else 'tenant'
+    if action == 'post_add':
+        record_links(instance, name, added=pk_set, using=using)
+    elif action == 'post_remove':
+        record_links(instance, name, removed=pk_set, using=using)
+    elif action == 'pre_clear':
+        record_links(instance, name, removed=set(getattr(instance, name).values_list('pk', flat=True)), using=using)
@@ -0,0 +1,111 @@
+"""
+Typeahead indexes for the BeepingAlarms filter bar.
+
+Only tenants and properties attached to active alarms (not completed, not
+cancelled) are indexed, matching what tenant_suggestions/property_suggestions
+have always returned.
+"""
+from common.directory import filter_users, get_user_directory
+from common.suggestions import SuggestionIndex, digit_suffixes, digits_only, tokenize
+from properties.models import Property, Tenant
+from .models import BeepingAlarm
+
+
+def active_alarms():
+    return BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False)
+
+
+def tenant_label(first_name, last_name, phone):
+    return f"{first_name} {last_name} - {phone}"
+
+
+def property_label(unit_number, street_number, street_name, suburb, state, postcode):
+    return f"{unit_number + '/' if unit_number else ''}{street_number} {street_name}, {suburb} {state} {postcode}"
+
+
+def load_tenants(ids=None):
+    tenants = Tenant.objects.filter(id__in=active_alarms().filter(tenant__isnull=False).values('tenant'))
+    if ids is not None:
+        tenants = tenants.filter(id__in=ids)
+    for tenant_id, first_name, last_name, phone in tenants.values_list('id', 'first_name', 'last_name', 'phone'):
+        tokens = tokenize(f"{first_name} {last_name or ''}") + digit_suffixes(phone)
+        yield tenant_id, tenant_label(first_name, last_name, phone), ((first_name or '').casefold(),), tokens
+
+
+def load_properties(ids=None):
+    properties = Property.objects.filter(id__in=active_alarms().values('property_id'))
+    if ids is not None:
+        properties = properties.filter(id__in=ids)
+    fields = ('id', 'unit_number', 'street_number', 'street_name', 'suburb', 'state', 'postcode')
+    for property_id, *address in properties.values_list(*fields):
+        label = property_label(*address)
+        unit_number, street_number, street_name = address[:3]
+        yield property_id, label, ((street_name or '').casefold(), street_number or ''), tokenize(label)
+
+
+tenant_index = SuggestionIndex('maintenance.tenant_suggestions', load_tenants)
+property_index = SuggestionIndex('maintenance.property_suggestions', load_properties)
+
+
+def search_terms(search):
+    """
+    Split a typeahead query into index terms.
+
+    Anything that looks like a phone number (digits plus spacing/punctuation)
+    is searched as one digit string so '0412 345' matches '0412345678'.
+    """
+    digits = digits_only(search)
+    if len(digits) >= 3 and not any(char.isalpha() for char in search):
+        return [digits]
+    return tokenize(search)
+
+
+def tenant_suggestions(search, browse_limit=20, search_limit=10):
+    if len(search) == 0:
+        results = tenant_index.browse(browse_limit)
+    elif len(search) < 2:
+        results = []
+    else:
+        results = tenant_index.search(search_terms(search), search_limit)
+    return [{'value': str(tenant_id), 'label': label} for tenant_id, label in results]
+
+
+def property_suggestions(search, browse_limit=20, search_limit=10):
+    if len(search) == 0:
+        results = property_index.browse(browse_limit)
+    elif len(search) < 2:
+        results = []
+    else:
+        results = property_index.search(tokenize(search), search_limit)
+    return [{'value': str(property_id), 'label': label} for property_id, label in results]
+
+
+def user_label(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
+
+def user_suggestions(search, search_limit=10):
+    """
+    Active users for the allocation filter, from the cached user directory.
+
+    An empty query returns every active user, like common/users does.
+    """
+    _, users = get_user_directory()
+    if search:
+        users = filter_users(users, search)[:search_limit]
+    return [
+        {'value': str(user['id']), 'label': user_label(user['first_name'], user['last_name'], user['username'])}
+        for user in users
+    ]
+
+
+SUGGESTERS = {
+    'tenant': tenant_suggestions,
+    'property': property_suggestions,
+    'user': user_suggestions,
+}
+
+
+def suggest(search, kinds):
+    """Grouped suggestions for several entity kinds, keyed by kind."""
+    return {kind: SUGGESTERS[kind](search) for kind in kinds}
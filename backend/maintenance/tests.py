@@ -1,3 +1,1020 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import math
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import QueryDict
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import numpy as np
+
+from .analytics import alarm_time_in_status
+from .archive import archive_closed_alarms
+from .benchmark import BENCHMARK_TOKEN, request_matrix, stubbed_auth
+from .cold_storage import ColdStorageError, export_alarm_history, restore_alarm_history
+from .changes import TOMBSTONE_RETENTION_DAYS, changes_page, encode_cursor
+from assets.models import AlarmModel, BatteryType, InstalledAlarm, Manufacturer
+from common.events import get_event_bus
+from common.generations import bump_generation
+from common.testing import AUTH, QueryBudgetTestCase, seed
+from properties.models import Property, Tenant
+from . import planning, suggestions
+from .fake_data import FakeDataError, generate
+from .filters import BeepingAlarmFilters
+from .live import ALARM_CHANNEL, AlarmView
+from .models import (ALARM_LIST_VERSION, ArchivedBeepingAlarm, ArchivedBeepingAlarmUpdate, BeepingAlarm,
+                     BeepingAlarmTombstone, BeepingAlarmUpdate, allocation_sort_key)
+from .views import beeping_alarm_queryset
+
+# Tables big enough in production that a sequential scan on them is a regression
+LARGE_TABLES = {
+    'maintenance_beepingalarm', 'maintenance_beepingalarmupdate', 'maintenance_beepingalarm_tenant',
+    'maintenance_beepingalarm_allocation', 'properties_property', 'properties_tenant',
+}
+
+
+@override_settings(SUGGESTION_INDEX_CHECK_INTERVAL=3600)
+class QueryBudgetTests(QueryBudgetTestCase):
+    """
+    Exact query counts per endpoint and parameters, the same for every page size.
+
+    Each request is made once first so in-process caches (suggestion indexes,
+    user directory, reference data) are warm; the budget is the steady state.
+    Reading a shared cache version (common.cache) counts as a query too.
+    """
+    # beeping_alarms: user, list version, page, allocation and tenant
+    # prefetches; the count is cached per filter signature
+    ALARM_BUDGET = 5
+    # No matches: user and list version only
+    EMPTY_ALARM_BUDGET = 2
+    BUDGETS = {
+        # Closed statuses read the archive too: one merged id page, then each table's rows
+        'alarms.status.completed': 6,
+        'alarms.status.cancelled': 6,
+        # Users come from the user directory: its version
+        'typeahead.suggest': 2,
+        'typeahead.users': 2,
+        'typeahead': 1,
+        'reference_data': 2,
+        'alarm_detail': 3,  # the alarm's updated_at and the records version, then the per-alarm cache
+    }
+
+    def setUp(self):
+        super().setUp()
+        # Counts cached by earlier tests were for other data
+        cache.clear()
+
+    def budget(self, name, response):
+        for prefix, budget in self.BUDGETS.items():
+            if name.startswith(prefix):
+                return budget
+        return self.ALARM_BUDGET if response.json()['count'] else self.EMPTY_ALARM_BUDGET
+
+    def test_request_matrix(self):
+        for name, path, params in request_matrix(page_size=10):
+            with self.subTest(name):
+                response = self.client.get(path, params, **AUTH)
+                self.assertBudget(self.budget(name, response), path, params)
+
+    def test_run_plan(self):
+        self.client.get('/api/maintenance/run-plan/', {'runs': 3}, **AUTH)
+        self.assertBudget(2, '/api/maintenance/run-plan/', {'runs': 3})
+
+    def test_time_in_status(self):
+        # Cached for the rest of the day once computed
+        self.client.get('/api/maintenance/analytics/time-in-status/', **AUTH)
+        self.assertBudget(1, '/api/maintenance/analytics/time-in-status/', {})
+
+    def test_time_in_status_for_alarm(self):
+        self.client.get('/api/maintenance/analytics/time-in-status/', {'alarm': 1}, **AUTH)
+        self.assertBudget(3, '/api/maintenance/analytics/time-in-status/', {'alarm': 1})
+
+
+class OrderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(200)
+
+    def setUp(self):
+        self.enterContext(stubbed_auth())
+
+    def ids(self, ordering, page_size=200):
+        response = self.client.get('/api/maintenance/beeping_alarms/', {'ordering': ordering, 'page_size': page_size},
+                                   **AUTH)
+        self.assertEqual(response.status_code, 200)
+        return [alarm['id'] for alarm in response.json()['results']]
+
+    def test_unknown_orderings_rejected(self):
+        for ordering in ['notes', 'tenant', 'allocation__first_name', '--status']:
+            with self.subTest(ordering):
+                response = self.client.get('/api/maintenance/beeping_alarms/', {'ordering': ordering}, **AUTH)
+                self.assertEqual(response.status_code, 400)
+
+    def test_multi_technician_alarms_are_one_row(self):
+        open_alarms = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).count()
+        for ordering in ['allocation', '-allocation', 'property', '-property']:
+            with self.subTest(ordering):
+                ids = self.ids(ordering)
+                self.assertEqual(len(ids), open_alarms)
+                self.assertEqual(len(set(ids)), open_alarms)
+                self.assertEqual(self.ids(ordering[1:] if ordering.startswith('-') else f'-{ordering}'), ids[::-1])
+
+    def test_pages_follow_the_full_ordering(self):
+        ids = self.ids('status')
+        pages = [self.client.get('/api/maintenance/beeping_alarms/', {'ordering': 'status', 'page_size': 10,
+                                                                      'page': page}, **AUTH).json()['results']
+                 for page in range(1, 4)]
+        self.assertEqual([alarm['id'] for page in pages for alarm in page], ids[:30])
+
+    def test_sort_keys_follow_changes(self):
+        alarm = BeepingAlarm.objects.filter(allocation__isnull=True).order_by('id').first()
+        user = User.objects.order_by('id').first()
+        alarm.allocation.add(user)
+        alarm.refresh_from_db()
+        self.assertEqual(alarm.allocation_sort, f'{user.first_name} {user.last_name}'.strip().casefold())
+
+        user.first_name = 'Aaron'
+        user.save()
+        alarm.refresh_from_db()
+        self.assertTrue(alarm.allocation_sort.startswith('aaron'))
+        user.alarm_issues.clear()
+        alarm.refresh_from_db()
+        self.assertEqual(alarm.allocation_sort, '')
+
+        prop = alarm.property
+        prop.street_name, prop.street_number, prop.unit_number = 'Abbey Road', '12', None
+        prop.save()
+        alarm.refresh_from_db()
+        self.assertEqual(alarm.property_sort, 'abbey road 00000012')
+
+
+@override_settings(SUGGESTION_INDEX_CHECK_INTERVAL=3600)
+class SuggestionIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(50)
+
+    def setUp(self):
+        for index in (suggestions.tenant_index, suggestions.property_index):
+            index.invalidate()
+            self.addCleanup(index.invalidate)
+        self.alarm = (BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False, tenant__isnull=False)
+                      .order_by('id').first())
+        self.tenant = self.alarm.tenant.order_by('id').first()
+
+    def tenant_ids(self, search):
+        return [int(row['value']) for row in suggestions.tenant_suggestions(search)]
+
+    def property_ids(self, search):
+        return [int(row['value']) for row in suggestions.property_suggestions(search)]
+
+    def test_tenant_rename_updates_tokens_and_phone(self):
+        self.assertNotIn(self.tenant.pk, self.tenant_ids('zebedee'))
+        generation = suggestions.tenant_index._generation
+        self.tenant.first_name, self.tenant.last_name, self.tenant.phone = 'Zebedee', 'Quux', '0499 123 456'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tenant.save()
+        # Patched in place rather than rebuilt
+        self.assertEqual(suggestions.tenant_index._generation, generation + 1)
+
+        for search in ('zeb', 'ZEBEDEE', 'quux zeb', '0499 123', '123456', '456'):
+            with self.subTest(search):
+                self.assertIn(self.tenant.pk, self.tenant_ids(search))
+        for search in ('zebedee smith', 'quuxx', '999'):
+            with self.subTest(search):
+                self.assertNotIn(self.tenant.pk, self.tenant_ids(search))
+
+    def test_links_and_closing_alarms_add_and_remove(self):
+        tenant = Tenant.objects.create(first_name='Xanthe', last_name='Ormond', phone='0400 000 111')
+        self.assertEqual(self.tenant_ids('xanthe'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alarm.tenant.add(tenant)
+        self.assertEqual(self.tenant_ids('xanthe'), [tenant.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alarm.tenant.remove(tenant)
+        self.assertEqual(self.tenant_ids('xanthe'), [])
+
+        place = Property.objects.create(street_number='9', street_name='Quokka Parade', suburb='Yallingup',
+                                        state='WA', postcode='6282', country='Australia')
+        self.assertEqual(self.property_ids('quokka'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            alarm = BeepingAlarm.objects.create(property=place, issue_type=self.alarm.issue_type, notes='')
+        self.assertEqual(self.property_ids('quokka par'), [place.pk])
+        alarm.is_completed = True
+        with self.captureOnCommitCallbacks(execute=True):
+            alarm.save()
+        self.assertEqual(self.property_ids('quokka'), [])
+
+    def test_rebuilds_when_another_process_bumps_the_generation(self):
+        self.tenant_ids('')
+        # Another worker's change: no signal reaches this process's index
+        Tenant.objects.filter(pk=self.tenant.pk).update(first_name='Wolfgang')
+        self.assertNotIn(self.tenant.pk, self.tenant_ids('wolfgang'))
+        bump_generation(suggestions.tenant_index.name)
+        with self.settings(SUGGESTION_INDEX_CHECK_INTERVAL=0):
+            self.assertIn(self.tenant.pk, self.tenant_ids('wolfgang'))
+
+
+class SuggestEndpointTests(TestCase):
+    PATH = '/api/maintenance/suggest/'
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(200)
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(stubbed_auth())
+
+    def suggest(self, params):
+        response = self.client.get(self.PATH, params, **AUTH)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_groups_the_per_kind_suggestions(self):
+        tenant = Tenant.objects.filter(alarm_issues__is_completed=False, alarm_issues__is_cancelled=False).first()
+        search = tenant.first_name[:3]
+        results = self.suggest({'q': search})
+        self.assertEqual(set(results), {'tenant', 'property', 'user'})
+        self.assertEqual(results['tenant'], suggestions.tenant_suggestions(search))
+        self.assertEqual(results['property'], suggestions.property_suggestions(search))
+        self.assertEqual(results['user'], suggestions.user_suggestions(search))
+        self.assertIn(str(tenant.pk), [row['value'] for row in results['tenant']])
+
+        only = self.suggest({'q': search, 'kinds': 'tenant, user'})
+        self.assertEqual(set(only), {'tenant', 'user'})
+        response = self.client.get(self.PATH, {'kinds': 'tenant,landlord'}, **AUTH)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('landlord', response.json()['error'])
+
+    def test_limits(self):
+        browse = self.suggest({'kinds': 'tenant,property'})
+        self.assertEqual(len(browse['tenant']), 20)
+        self.assertEqual(len(browse['property']), 20)
+        # Single characters are too short to search
+        self.assertEqual(self.suggest({'q': 'a', 'kinds': 'tenant,property'}), {'tenant': [], 'property': []})
+        common = Tenant.objects.filter(alarm_issues__is_completed=False).values_list('first_name', flat=True)
+        prefix = max({name[:2] for name in common}, key=lambda prefix: sum(name.startswith(prefix) for name in common))
+        self.assertEqual(len(self.suggest({'q': prefix, 'kinds': 'tenant'})['tenant']), 10)
+        users = self.suggest({'kinds': 'user'})['user']
+        self.assertEqual(len(users), User.objects.filter(is_active=True).count())
+        self.assertLessEqual(len(self.suggest({'q': 'a', 'kinds': 'user'})['user']), 10)
+
+
+class FilterTests(TestCase):
+    LIST = '/api/maintenance/beeping_alarms/'
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(200)
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(stubbed_auth())
+
+    def test_equivalent_params_share_a_signature(self):
+        first = BeepingAlarmFilters.parse(QueryDict(urlencode({
+            'status': 'new', 'is_customer_contacted': 'TRUE', 'search': ' Smith  john smith',
+            'created_at_from': '2025-03-01', 'agency_private': 'Agency', 'tenant': '',
+        })))
+        second = BeepingAlarmFilters.parse(QueryDict(urlencode({
+            'agency_private': 'agency', 'search': 'JOHN SMITH', 'created_at_from': '2025-03-01T00:00:00',
+            'is_customer_contacted': 'true', 'status': 'new',
+        })))
+        self.assertEqual(first, second)
+        self.assertEqual(first.key, second.key)
+        self.assertEqual(first.get('search'), ('john', 'smith'))
+
+    def test_invalid_values_rejected(self):
+        for params in [{'status': 'bogus'}, {'is_customer_contacted': 'maybe'}, {'property': 'abc'},
+                       {'agency_private': 'both'}, {'created_at_from': 'yesterday'},
+                       {'created_at_from': '2025-06-01', 'created_at_to': '2025-05-01'},
+                       {'near': '-33.8,151.2', 'radius_km': '500'}]:
+            with self.subTest(params):
+                response = self.client.get(self.LIST, params, **AUTH)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_search_across_technicians_returns_each_alarm_once(self):
+        alarm = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).order_by('id').first()
+        alarm.allocation.add(User.objects.create(username='tech_zz1', first_name='Zebedee'),
+                             User.objects.create(username='tech_zz2', last_name='Zebedee'))
+        response = self.client.get(self.LIST, {'search': 'zebedee'}, **AUTH)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual([row['id'] for row in response.json()['results']], [alarm.id])
+        self.assertFalse({'allocation_sort', 'property_sort'} & set(response.json()['results'][0]))
+
+    def test_cached_count_and_etag_follow_changes(self):
+        params = {'status': 'new'}
+        response = self.client.get(self.LIST, params, **AUTH)
+        count, etag = response.json()['count'], response['ETag']
+        self.assertEqual(count, BeepingAlarm.objects.filter(status='new', is_completed=False,
+                                                            is_cancelled=False).count())
+        self.assertEqual(self.client.get(self.LIST, params, HTTP_IF_NONE_MATCH=etag, **AUTH).status_code, 304)
+
+        alarm = BeepingAlarm.objects.filter(status='new', is_completed=False, is_cancelled=False).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            alarm.status = 'to_be_quoted'
+            alarm.save()
+        response = self.client.get(self.LIST, params, HTTP_IF_NONE_MATCH=etag, **AUTH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], count - 1)
+
+        # Bulk updates skip signals but still expire the cached count
+        with self.captureOnCommitCallbacks(execute=True):
+            BeepingAlarm.objects.filter(status='new').update(status='to_be_quoted')
+        self.assertEqual(self.client.get(self.LIST, params, **AUTH).json()['count'], 0)
+
+    def test_count_and_etag_follow_the_shared_version(self):
+        params = {'status': 'new'}
+        first = self.client.get(self.LIST, params, **AUTH)
+        count = first.json()['count']
+        # Another worker's write: no signal here, only the shared version moves
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {BeepingAlarm._meta.db_table} SET status = 'to_be_quoted' WHERE id = %s",
+                           [first.json()['results'][0]['id']])
+        self.assertEqual(self.client.get(self.LIST, params, HTTP_IF_NONE_MATCH=first['ETag'], **AUTH).status_code,
+                         304)
+        bump_generation(ALARM_LIST_VERSION)
+        response = self.client.get(self.LIST, params, HTTP_IF_NONE_MATCH=first['ETag'], **AUTH)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['count'], count - 1)
+
+
+class AlarmDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(50)
+
+    def setUp(self):
+        self.enterContext(stubbed_auth())
+        self.alarm = BeepingAlarm.objects.filter(tenant__isnull=False).order_by('id').first()
+        self.path = f'/api/maintenance/beeping_alarms/{self.alarm.uid}/'
+
+    def get(self):
+        response = self.client.get(self.path, **AUTH)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cached_read(self):
+        # user, updated_at, records version, alarm, allocation and tenant prefetches
+        with self.assertNumQueries(6):
+            self.get()
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get()['uid'], str(self.alarm.uid))
+        self.assertFalse({'allocation_sort', 'property_sort'} & set(self.get()))
+        response = self.client.get('/api/maintenance/beeping_alarms/00000000-0000-4000-8000-000000000000/', **AUTH)
+        self.assertEqual(response.status_code, 404)
+
+    def test_patch_writes_only_changed_columns(self):
+        self.get()
+        status = 'completed' if self.alarm.status != 'completed' else 'new'
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.path, {'status': status, 'notes': self.alarm.notes},
+                                         content_type='application/json', **AUTH)
+        self.assertEqual(response.status_code, 200, response.content)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"status"', updates[0])
+        self.assertNotIn('"notes"', updates[0])
+        self.assertEqual(self.get()['status'], status)
+
+    def test_patch_rejects_completed_and_cancelled(self):
+        response = self.client.patch(self.path, {'is_completed': True, 'is_cancelled': True},
+                                     content_type='application/json', **AUTH)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalidated_by_links_and_embedded_records(self):
+        self.get()
+        user = User.objects.order_by('id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alarm.allocation.add(user)
+        self.assertIn(user.id, [allocated['id'] for allocated in self.get()['allocation']])
+
+        tenant = self.alarm.tenant.first()
+        tenant.first_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            tenant.save()
+        self.assertIn('Renamed', [linked['first_name'] for linked in self.get()['tenant']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.alarm_issues.clear()
+        self.assertNotIn(user.id, [allocated['id'] for allocated in self.get()['allocation']])
+
+    def test_delete(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(self.path, **AUTH)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(self.path, **AUTH).status_code, 404)
+
+    def test_keys_are_shared_through_the_database(self):
+        self.get()
+        # Another worker's write: no signal here, only the row's updated_at moves
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {BeepingAlarm._meta.db_table} SET notes = %s WHERE id = %s',
+                           ['Changed elsewhere', self.alarm.pk])
+        self.assertNotEqual(self.get()['notes'], 'Changed elsewhere')
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {BeepingAlarm._meta.db_table} SET updated_at = now() WHERE id = %s',
+                           [self.alarm.pk])
+        self.assertEqual(self.get()['notes'], 'Changed elsewhere')
+
+    def test_other_alarms_stay_cached(self):
+        other = BeepingAlarm.objects.exclude(pk=self.alarm.pk).order_by('id').first()
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            other.notes = 'Edited'
+            other.save()
+        with self.assertNumQueries(3):
+            self.get()
+
+
+class ArchiveTests(TestCase):
+    LIST = '/api/maintenance/beeping_alarms/'
+    TIME_IN_STATUS = '/api/maintenance/analytics/time-in-status/'
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(200)
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(stubbed_auth())
+        self.now = timezone.now()
+        closed = BeepingAlarm.objects.filter(is_completed=True).order_by('id')
+        # Half the completed alarms last changed long ago, everything else just now
+        BeepingAlarm.objects.update(updated_at=self.now)
+        self.old_ids = list(closed.values_list('id', flat=True)[::2])
+        BeepingAlarm.objects.filter(pk__in=self.old_ids).update(updated_at=self.now - timedelta(days=365))
+        self.expected = {
+            alarm.pk: (alarm.uid, set(alarm.tenant.values_list('id', flat=True)),
+                       set(alarm.allocation.values_list('id', flat=True)),
+                       alarm.beepingalarmupdate_set.count())
+            for alarm in BeepingAlarm.objects.filter(pk__in=self.old_ids)
+        }
+        self.spans = alarm_time_in_status(self.old_ids[0], now=self.now)
+
+    def archive(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archive_closed_alarms(days=90, batch_size=7, now=self.now, log=lambda message: None)
+
+    def test_moves_old_closed_alarms_with_links_and_history(self):
+        open_count = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).count()
+        self.assertEqual(self.archive(), len(self.old_ids))
+        self.assertFalse(BeepingAlarm.objects.filter(pk__in=self.old_ids).exists())
+        self.assertEqual(BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).count(), open_count)
+        for alarm in ArchivedBeepingAlarm.objects.prefetch_related('tenant', 'allocation'):
+            uid, tenants, allocations, updates = self.expected[alarm.pk]
+            self.assertEqual(alarm.uid, uid)
+            self.assertEqual({tenant.id for tenant in alarm.tenant.all()}, tenants)
+            self.assertEqual({user.id for user in alarm.allocation.all()}, allocations)
+            self.assertEqual(ArchivedBeepingAlarmUpdate.objects.filter(beeping_alarm=alarm).count(), updates)
+        self.assertEqual(set(BeepingAlarmTombstone.objects.values_list('alarm_id', flat=True)), set(self.old_ids))
+        # Nothing left to move
+        self.assertEqual(self.archive(), 0)
+
+    def test_list_detail_and_analytics_read_the_archive(self):
+        params = {'status': 'completed', 'ordering': 'created_at', 'page_size': 100}
+        before = self.client.get(self.LIST, params, **AUTH).json()
+        self.archive()
+        after = self.client.get(self.LIST, params, **AUTH).json()
+        self.assertEqual(after['count'], before['count'])
+        self.assertEqual([row['uid'] for row in after['results']], [row['uid'] for row in before['results']])
+
+        uid = self.expected[self.old_ids[0]][0]
+        path = f'{self.LIST}{uid}/'
+        response = self.client.get(path, **AUTH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.old_ids[0])
+        response = self.client.patch(path, {'notes': 'Reopened'}, content_type='application/json', **AUTH)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.delete(path, **AUTH).status_code, 409)
+
+        self.assertEqual(alarm_time_in_status(self.old_ids[0], now=self.now), self.spans)
+        response = self.client.get(self.TIME_IN_STATUS, {'alarm': self.old_ids[0]}, **AUTH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['spans']), len(self.spans))
+
+    def test_time_in_status_rejects_bad_dates(self):
+        for params in ({'entered_from': 'yesterday'}, {'entered_to': '2025-13-45T00:00:00'}):
+            with self.subTest(params):
+                response = self.client.get(self.TIME_IN_STATUS, params, **AUTH)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertEqual(self.client.get(self.TIME_IN_STATUS, {'alarm': 10 ** 9}, **AUTH).status_code, 404)
+
+
+class ColdStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(200)
+        BeepingAlarm.objects.update(updated_at=timezone.now() - timedelta(days=365))
+        archive_closed_alarms(log=lambda message: None)
+
+    def setUp(self):
+        self.root = self.enterContext(tempfile.TemporaryDirectory())
+        self.before = datetime(2025, 7, 1, tzinfo=dt_timezone.utc)
+        self.old = ArchivedBeepingAlarm.objects.filter(created_at__lt=self.before)
+
+    def snapshot(self, alarms):
+        return {alarm.pk: (alarm.uid, alarm.status, alarm.created_at, alarm.archived_at, alarm.property_sort,
+                           sorted(alarm.tenant.values_list('id', flat=True)),
+                           sorted(alarm.allocation.values_list('id', flat=True)),
+                           list(alarm.archivedbeepingalarmupdate_set.order_by('id').values_list('uid', 'date')))
+                for alarm in alarms}
+
+    def export(self):
+        return export_alarm_history(self.root, self.before, batch_size=7, log=lambda message: None)
+
+    def test_export_verify_delete_and_restore(self):
+        expected = self.snapshot(self.old)
+        remaining = ArchivedBeepingAlarm.objects.count() - len(expected)
+        manifest = self.export()
+        self.assertEqual([partition['month'] for partition in manifest['partitions']],
+                         [f'2025-{month:02}' for month in range(1, 7)])
+        self.assertEqual(sum(partition['rows'] for partition in manifest['partitions']), len(expected))
+        self.assertEqual(ArchivedBeepingAlarm.objects.count(), remaining)
+        self.assertFalse(ArchivedBeepingAlarmUpdate.objects.filter(beeping_alarm_id__in=expected).exists())
+
+        with gzip.open(f"{self.root}/{manifest['partitions'][0]['path']}", 'rt') as lines:
+            record = json.loads(next(lines))
+        self.assertIn('street_name', record['property'])
+        self.assertNotIn('password', json.dumps(record['allocation']))
+
+        start, end = datetime(2025, 3, 15, tzinfo=dt_timezone.utc), datetime(2025, 5, 1, tzinfo=dt_timezone.utc)
+        in_range = {pk for pk, values in expected.items() if start <= values[2] < end}
+        self.assertEqual(restore_alarm_history(self.root, start, end, batch_size=5, log=lambda message: None),
+                         len(in_range))
+        self.assertEqual(self.snapshot(ArchivedBeepingAlarm.objects.filter(pk__in=expected)),
+                         {pk: expected[pk] for pk in in_range})
+        # Restoring again, or a wider range, only adds what is missing
+        self.assertEqual(restore_alarm_history(self.root, start, end, log=lambda message: None), 0)
+        restore_alarm_history(self.root, datetime(2025, 1, 1, tzinfo=dt_timezone.utc), self.before,
+                              log=lambda message: None)
+        self.assertEqual(self.snapshot(self.old), expected)
+
+    def test_export_pages_through_equal_timestamps(self):
+        # Batches start after the last (created_at, id), so ties across a batch boundary are neither lost nor repeated
+        january = self.old.filter(created_at__lt=datetime(2025, 2, 1, tzinfo=dt_timezone.utc))
+        january.update(created_at=datetime(2025, 1, 15, tzinfo=dt_timezone.utc))
+        expected = sorted(january.values_list('id', flat=True))
+        self.assertGreater(len(expected), 3)
+        manifest = export_alarm_history(self.root, self.before, batch_size=3, delete=False, log=lambda message: None)
+        with gzip.open(f"{self.root}/{manifest['partitions'][0]['path']}", 'rt') as lines:
+            self.assertEqual([json.loads(line)['id'] for line in lines], expected)
+
+    def test_restore_refuses_altered_files(self):
+        manifest = self.export()
+        path = f"{self.root}/{manifest['partitions'][0]['path']}"
+        with gzip.open(path, 'rt') as lines:
+            kept = lines.readlines()[1:]
+        with gzip.open(path, 'wt') as lines:
+            lines.writelines(kept)
+        with self.assertRaises(ColdStorageError):
+            restore_alarm_history(self.root, datetime(2025, 1, 1, tzinfo=dt_timezone.utc), self.before,
+                                  log=lambda message: None)
+
+
+class AuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(50)
+
+    def setUp(self):
+        self.enterContext(stubbed_auth())
+        self.alarm = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).order_by('id').first()
+        self.path = f'/api/maintenance/beeping_alarms/{self.alarm.uid}/'
+
+    def history(self, alarm):
+        # Generated history has no recorded changes
+        return list(BeepingAlarmUpdate.objects.filter(beeping_alarm=alarm).exclude(changes={}).order_by('id'))
+
+    def test_request_writes_one_row_from_the_loaded_state(self):
+        technician = User.objects.exclude(alarm_issues=self.alarm).order_by('id').first()
+        new_status = 'to_be_quoted' if self.alarm.status != 'to_be_quoted' else 'awaiting_response'
+        data = {'status': new_status, 'notes': self.alarm.notes,
+                'allocation': list(self.alarm.allocation.values_list('id', flat=True)) + [technician.id]}
+        # History is written as the request's transaction commits
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.path, data, content_type='application/json', **AUTH)
+        self.assertEqual(response.status_code, 200, response.content)
+        table = BeepingAlarmUpdate._meta.db_table
+        self.assertEqual(len([query for query in queries if query['sql'].startswith(f'INSERT INTO "{table}"')]), 1)
+
+        [update] = self.history(self.alarm)
+        self.assertEqual(update.status, new_status)
+        self.assertEqual(update.changes['status'], [self.alarm.status, new_status])
+        self.assertNotIn('notes', update.changes)
+        self.assertEqual(update.changes['allocation'], {'added': [technician.id], 'removed': []})
+        self.assertEqual(update.update_by.username, 'benchmark')
+
+        # Saving without changes records nothing
+        with self.captureOnCommitCallbacks(execute=True):
+            BeepingAlarm.objects.get(pk=self.alarm.pk).save()
+        self.assertEqual(len(self.history(self.alarm)), 1)
+
+    def test_rolled_back_changes_leave_no_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.alarm.status = 'cancelled'
+                    self.alarm.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.alarm.refresh_from_db()
+            self.alarm.is_customer_contacted = not self.alarm.is_customer_contacted
+            self.alarm.save(update_fields=['is_customer_contacted'])
+        [update] = self.history(self.alarm)
+        self.assertEqual(list(update.changes), ['is_customer_contacted'])
+        self.assertIsNone(update.update_by)
+
+    def test_bulk_updates(self):
+        alarms = BeepingAlarm.objects.filter(status='new').order_by('id')
+        before = dict(alarms.values_list('id', 'is_customer_contacted'))
+        with self.captureOnCommitCallbacks(execute=True):
+            alarms.update(status='requires_call_back')
+        for alarm_id in before:
+            [update] = self.history(alarm_id)
+            self.assertEqual(update.changes, {'status': ['new', 'requires_call_back']})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BeepingAlarm.objects.filter(pk__in=before).update(is_customer_contacted=~F('is_customer_contacted'))
+        for alarm_id, contacted in before.items():
+            update = self.history(alarm_id)[-1]
+            self.assertEqual(update.status, 'requires_call_back')
+            self.assertEqual(update.changes, {'is_customer_contacted': [contacted, not contacted]})
+
+        # Bookkeeping-only updates cost no extra queries
+        with self.assertNumQueries(1):
+            BeepingAlarm.objects.filter(pk__in=before).touch()
+
+    def test_creation_status_starts_the_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            plain = BeepingAlarm.objects.create(property=self.alarm.property, issue_type=self.alarm.issue_type)
+            called = BeepingAlarm.objects.create(property=self.alarm.property, issue_type=self.alarm.issue_type,
+                                                 status='requires_call_back')
+        self.assertEqual(self.history(plain), [])
+        [update] = self.history(called)
+        self.assertEqual((update.status, update.changes), ('requires_call_back', {'status': [None, 'requires_call_back']}))
+
+        # Analytics start the alarm in the status it was created in, not 'new'
+        with self.captureOnCommitCallbacks(execute=True):
+            called.status = 'to_be_scheduled'
+            called.save()
+        spans = alarm_time_in_status(called.pk)
+        self.assertEqual([span['status'] for span in spans], ['requires_call_back', 'to_be_scheduled'])
+        self.assertEqual(spans[0]['entered_at'], called.created_at)
+        self.assertEqual([span['status'] for span in alarm_time_in_status(plain.pk)], ['new'])
+
+
+class ChangesFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(50)
+
+    def setUp(self):
+        self.enterContext(stubbed_auth())
+        # Test writes commit instantly; waiting for them to settle only slows the test
+        self.enterContext(mock.patch('maintenance.changes.SETTLE_SECONDS', 0))
+
+    def sync(self, cursor=None, limit=100):
+        changed, deleted = {}, []
+        while True:
+            page = changes_page(cursor, limit)
+            changed.update({alarm['id']: alarm for alarm in page['changed']})
+            deleted += [tombstone['id'] for tombstone in page['deleted']]
+            cursor = page['cursor']
+            if not page['has_more']:
+                return changed, deleted, cursor
+
+    def test_full_then_incremental(self):
+        changed, deleted, cursor = self.sync(limit=7)
+        self.assertEqual(set(changed), set(BeepingAlarm.objects.values_list('id', flat=True)))
+        self.assertEqual(deleted, [])
+        self.assertEqual(self.sync(cursor)[:2], ({}, []))
+
+        first, second, third, fourth = BeepingAlarm.objects.order_by('id')[:4]
+        first.notes = 'Edited'
+        first.save(update_fields=['notes'])
+        second.allocation.add(User.objects.order_by('id').first())
+        BeepingAlarm.objects.filter(pk=third.pk).update(is_customer_contacted=True)
+        deleted_id = fourth.pk
+        fourth.delete()
+
+        changed, deleted, cursor = self.sync(cursor)
+        self.assertEqual(set(changed), {first.pk, second.pk, third.pk})
+        self.assertEqual(changed[first.pk]['notes'], 'Edited')
+        self.assertIn(User.objects.order_by('id').first().pk, changed[second.pk]['allocation'])
+        self.assertEqual(deleted, [deleted_id])
+
+    def test_settle_window(self):
+        changed, deleted, cursor = self.sync()
+        BeepingAlarm.objects.filter(pk=next(iter(changed))).touch()
+        with mock.patch('maintenance.changes.SETTLE_SECONDS', 5):
+            self.assertEqual(changes_page(cursor)['changed'], [])
+        self.assertEqual(len(changes_page(cursor)['changed']), 1)
+
+    def test_endpoint(self):
+        path = '/api/maintenance/beeping_alarms/changes/'
+        with self.assertNumQueries(5):  # user, alarms, tombstones, allocation and tenant links
+            response = self.client.get(path, {'limit': 10}, **AUTH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['changed']), 10)
+        self.assertTrue(response.json()['has_more'])
+
+        self.assertEqual(self.client.get(path, {'since': 'nonsense'}, **AUTH).status_code, 400)
+        self.assertEqual(self.client.get(path, {'limit': 0}, **AUTH).status_code, 400)
+        expired = timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS + 1)
+        response = self.client.get(path, {'since': encode_cursor((expired, 0), (expired, 0))}, **AUTH)
+        self.assertEqual(response.status_code, 410)
+
+
+@override_settings(EVENT_BUS_BACKEND='common.events.LocalBackend')
+class LiveEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(50)
+
+    def setUp(self):
+        self.enterContext(stubbed_auth())
+
+    def published(self, change):
+        with mock.patch.object(get_event_bus(), 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            change()
+        return [call.args[1] for call in publish.call_args_list]
+
+    def test_view_matching(self):
+        alarm = {'id': 1, 'status': 'new', 'is_completed': False, 'is_cancelled': False, 'allocation': [3],
+                 'tenant': [], 'property_id': 7, 'created_at': '2025-05-01T00:00:00Z'}
+        moved = {'type': 'alarm.status_changed', 'alarm': {**alarm, 'status': 'to_be_quoted'},
+                 'previous': {'status': 'new'}}
+        self.assertTrue(AlarmView({'status': 'new'}).matches(moved))
+        self.assertTrue(AlarmView({'status': 'to_be_quoted'}).matches(moved))
+        self.assertFalse(AlarmView({'status': 'completed'}).matches(moved))
+        self.assertTrue(AlarmView({'allocation': '3', 'created_at_from': '2025-04-01T00:00:00Z'}).matches(moved))
+        self.assertFalse(AlarmView({'allocation': '4'}).matches(moved))
+        self.assertFalse(AlarmView({'property': '8'}).matches(moved))
+        deleted = {'type': 'alarm.deleted', 'alarm': {'id': 1}, 'previous': {'status': 'new'}}
+        self.assertTrue(AlarmView({'allocation': '3'}).matches(deleted))
+        self.assertFalse(AlarmView({'status': 'to_be_quoted'}).matches(deleted))
+
+    def test_signals_publish(self):
+        alarm = BeepingAlarm.objects.exclude(status='to_be_quoted').order_by('id').first()
+        previous_status = alarm.status
+        alarm.status = 'to_be_quoted'
+        [event] = self.published(lambda: alarm.save(update_fields=['status']))
+        self.assertEqual(event['type'], 'alarm.status_changed')
+        self.assertEqual(event['previous']['status'], previous_status)
+
+        user = User.objects.exclude(alarm_issues=alarm).order_by('id').first()
+        [event] = self.published(lambda: alarm.allocation.add(user))
+        self.assertEqual(event['type'], 'alarm.updated')
+        self.assertIn(user.pk, event['alarm']['allocation'])
+
+        alarm_id = alarm.pk
+        events = self.published(alarm.delete)
+        self.assertEqual([(event['type'], event['alarm']['id']) for event in events], [('alarm.deleted', alarm_id)])
+
+    async def test_stream(self):
+        response = await AsyncClient().get('/api/maintenance/beeping_alarms/events/',
+                                           {'token': BENCHMARK_TOKEN, 'status': 'new'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'event: ready\n'))
+
+        bus = get_event_bus()
+        base = {'is_completed': False, 'is_cancelled': False, 'allocation': [], 'tenant': []}
+        bus.publish(ALARM_CHANNEL, {'type': 'alarm.created', 'alarm': {**base, 'id': 1, 'status': 'to_be_quoted'}})
+        bus.publish(ALARM_CHANNEL, {'type': 'alarm.created', 'alarm': {**base, 'id': 2, 'status': 'new'}})
+        frame = (await anext(stream)).decode()
+        self.assertTrue(frame.startswith('event: alarm.created\n'))
+        self.assertEqual(json.loads(frame.split('data: ', 1)[1])['alarm']['id'], 2)
+
+        # A client going away cancels the response task, as the ASGI handler does
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(bus.subscribers[ALARM_CHANNEL], set())
+
+    async def test_stream_requires_token(self):
+        response = await AsyncClient().get('/api/maintenance/beeping_alarms/events/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_refused_where_it_cannot_work(self):
+        # An endless response would tie up a WSGI worker
+        with self.assertLogs('maintenance.views', 'WARNING'):
+            response = self.client.get('/api/maintenance/beeping_alarms/events/', {'token': BENCHMARK_TOKEN})
+        self.assertEqual(response.status_code, 503)
+
+    @override_settings(WEB_CONCURRENCY=2)
+    async def test_stream_refused_on_a_local_bus_across_workers(self):
+        with self.assertLogs('maintenance.views', 'WARNING'):
+            response = await AsyncClient().get('/api/maintenance/beeping_alarms/events/', {'token': BENCHMARK_TOKEN})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('PostgresNotifyBackend', response.json()['error'])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL only')
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the page query behind each beeping_alarms request on a seeded,
+    analyzed dataset and fail when it sequentially scans a large table.
+
+    KNOWN_SEQ_SCANS lists the plans that scan today; shrink it as they get
+    fixed, never grow it without a reason.
+    """
+    SCALE = 20000
+    PAGE_SIZE = 10
+
+    _PAGE_JOIN = {'maintenance_beepingalarm', 'properties_property'}
+    KNOWN_SEQ_SCANS = {
+        # A deep OFFSET reads everything before the page anyway; since uids
+        # became 16 byte uuids the narrower rows make this true half way in too
+        'alarms.page.middle': _PAGE_JOIN,
+        'alarms.page.last': _PAGE_JOIN,
+        'alarms.page.last_by_property': _PAGE_JOIN,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(cls.SCALE)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def seq_scans(self, node):
+        tables = {node['Relation Name']} if node.get('Node Type') == 'Seq Scan' else set()
+        for child in node.get('Plans', []):
+            tables |= self.seq_scans(child)
+        return tables
+
+    def plan(self, params):
+        size = int(params.get('page_size', self.PAGE_SIZE))
+        offset = (int(params.get('page', 1)) - 1) * size
+        queryset = beeping_alarm_queryset(QueryDict(urlencode(params)))[offset:offset + size]
+        return json.loads(queryset.explain(format='json'))[0]['Plan']
+
+    def test_list_and_search_plans(self):
+        for name, path, params in request_matrix(page_size=self.PAGE_SIZE):
+            if not name.startswith('alarms.'):
+                continue
+            with self.subTest(name):
+                plan = self.plan(params)
+                unexpected = (self.seq_scans(plan) & LARGE_TABLES) - self.KNOWN_SEQ_SCANS.get(name, set())
+                self.assertFalse(unexpected, f'{name} now sequentially scans {sorted(unexpected)}:\n'
+                                             f'{json.dumps(plan, indent=2)}')
+
+
+class RunPlanTests(TestCase):
+    PATH = '/api/maintenance/run-plan/'
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(200)
+        BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).update(status='to_be_scheduled')
+        unmapped = BeepingAlarm.objects.filter(status='to_be_scheduled').order_by('id').first()
+        Property.objects.filter(pk=unmapped.property_id).update(latitude=None, longitude=None)
+        cls.schedulable = set(BeepingAlarm.objects.filter(status='to_be_scheduled', is_completed=False,
+                                                          is_cancelled=False).values_list('id', flat=True))
+
+    def setUp(self):
+        self.enterContext(stubbed_auth())
+
+    def plan(self, params):
+        response = self.client.get(self.PATH, params, **AUTH)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_every_alarm_placed_once_in_balanced_runs(self):
+        plan = self.plan({'runs': 4})
+        placed = [stop['alarm_id'] for run in plan['runs'] for stop in run['stops']]
+        unplaced = [alarm['alarm_id'] for alarm in plan['unplaced']]
+        self.assertTrue(unplaced)
+        self.assertEqual(sorted(placed + unplaced), sorted(self.schedulable))
+        sizes = [len(run['stops']) for run in plan['runs']]
+        self.assertEqual(len(sizes), 4)
+        self.assertLessEqual(max(sizes), math.ceil(len(placed) / 4))
+        for run in plan['runs']:
+            self.assertEqual([stop['position'] for stop in run['stops']], list(range(1, len(run['stops']) + 1)))
+
+    def test_deterministic_for_a_seed(self):
+        params = {'runs': 3, 'seed': 7, 'start': '-33.87,151.21'}
+        self.assertEqual(self.plan(params), self.plan(params))
+
+    def test_runs_begin_near_the_start(self):
+        start = (-33.87, 151.21)
+        for run in self.plan({'runs': 3, 'start': '%s,%s' % start})['runs']:
+            nearest = min(run['stops'], key=lambda stop: math.dist((stop['latitude'], stop['longitude']), start))
+            self.assertEqual(run['stops'][0]['alarm_id'], nearest['alarm_id'])
+
+    def test_technicians(self):
+        users = list(User.objects.order_by('id')[:2])
+        plan = self.plan({'technicians': ','.join(str(user.id) for user in users)})
+        self.assertEqual([run['technician']['id'] for run in plan['runs']], [user.id for user in users])
+
+    def test_invalid_parameters(self):
+        for params in [{'runs': 0}, {'runs': 51}, {'runs': 'two'}, {'technicians': '999999'},
+                       {'technicians': 'abc'}, {'start': '91,151'}, {'start': 'depot'}, {'seed': 'x'}]:
+            with self.subTest(params):
+                response = self.client.get(self.PATH, params, **AUTH)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_two_opt_never_lengthens_the_nearest_neighbour_tour(self):
+        rng = np.random.default_rng(0)
+        for size in (4, 50, 500):
+            points = np.concatenate([rng.normal(centre, 1.5, (size // 4, 2)) for centre in rng.uniform(0, 30, (4, 2))])
+            neighbours = planning._nearest_neighbours(points, planning.TWO_OPT_NEIGHBOURS)
+            greedy = planning._nearest_neighbour_tour(points, neighbours, 0)
+            improved = planning._two_opt(greedy, points, neighbours)
+            self.assertEqual(sorted(improved), list(range(len(points))))
+            self.assertEqual(improved[0], 0)
+
+            def length(tour):
+                return planning._distance(points, tour[:-1], tour[1:]).sum()
+            self.assertLessEqual(length(improved), length(greedy) + 1e-9)
+
+    def test_nearest_neighbours_are_exact(self):
+        rng = np.random.default_rng(1)
+        # A dense cluster, scattered stops, repeated coordinates and an outlier
+        points = np.concatenate([rng.normal(5, 0.2, (200, 2)), rng.uniform(0, 10, (100, 2)),
+                                 np.zeros((15, 2)), [[80, 80]]])
+        neighbours = planning._nearest_neighbours(points, 10)
+        distances = planning._pairwise(points, points)
+        np.fill_diagonal(distances, np.inf)
+        np.testing.assert_allclose(np.take_along_axis(distances, neighbours, axis=1),
+                                   np.sort(distances, axis=1)[:, :10])
+
+
+class FakeDataTests(TestCase):
+    def generate(self, seed=0, **kwargs):
+        return generate(scale=120, seed=seed, start=datetime(2025, 1, 1, tzinfo=dt_timezone.utc),
+                        end=datetime(2026, 1, 1, tzinfo=dt_timezone.utc), log=lambda message: None, **kwargs)
+
+    def snapshot(self):
+        alarms = BeepingAlarm.objects.order_by('uid').prefetch_related('allocation', 'tenant').select_related('property')
+        return [
+            (alarm.id, alarm.uid, alarm.status, alarm.created_at, alarm.notes, str(alarm.property),
+             sorted(user.username for user in alarm.allocation.all()),
+             sorted((tenant.first_name, tenant.last_name, tenant.phone) for tenant in alarm.tenant.all()))
+            for alarm in alarms
+        ]
+
+    def test_same_seed_gives_the_same_data(self):
+        self.generate(seed=3)
+        first = self.snapshot()
+        technicians = list(User.objects.filter(username__startswith='fake_tech_').values_list('username', 'first_name'))
+        self.generate(seed=3)
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(list(User.objects.filter(username__startswith='fake_tech_')
+                              .values_list('username', 'first_name')), technicians)
+        self.generate(seed=4)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_allocates_only_its_own_technicians(self):
+        staff = User.objects.create(username='real_staff', first_name='Real', is_staff=True)
+        counts = self.generate()
+        allocated = set(User.objects.filter(alarm_issues__isnull=False).values_list('username', flat=True))
+        self.assertTrue(allocated)
+        self.assertTrue(all(username.startswith('fake_tech_') for username in allocated))
+        self.assertEqual(User.objects.filter(username__startswith='fake_tech_').count(), counts['technicians'])
+        self.assertFalse(User.objects.filter(username__startswith='fake_tech_', is_staff=True).exists())
+        staff.refresh_from_db()
+        self.assertTrue(staff.is_staff)
+
+        # Another seed renames the technicians; alarms kept from the first run follow
+        self.generate(seed=1, clear=False)
+        for alarm in BeepingAlarm.objects.prefetch_related('allocation'):
+            names = [(user.first_name, user.last_name) for user in alarm.allocation.all()]
+            self.assertEqual(alarm.allocation_sort, allocation_sort_key(names))
+
+    def test_refuses_to_clear_referenced_data(self):
+        self.generate()
+        battery = BatteryType.objects.create(name='9V', life_span=10)
+        alarm_model = AlarmModel.objects.create(manufacturer=Manufacturer.objects.create(name='Acme'), name='A1',
+                                                description='', battery_type=battery)
+        InstalledAlarm.objects.create(property=Property.objects.order_by('id').first(), alarm_model=alarm_model)
+        alarms = BeepingAlarm.objects.count()
+        with self.assertRaises(FakeDataError):
+            self.generate()
+        self.assertEqual(BeepingAlarm.objects.count(), alarms)
+        self.assertEqual(InstalledAlarm.objects.count(), 1)
+        # Appending doesn't clear anything
+        self.generate(seed=5, clear=False)
+        self.assertEqual(InstalledAlarm.objects.count(), 1)
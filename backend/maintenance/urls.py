@@ -4,6 +4,12 @@ from . import views
 
 urlpatterns = [
     path('beeping_alarms/', beeping_alarms, name='beeping_alarms'),
+    path('beeping_alarms/changes/', views.beeping_alarm_changes, name='beeping_alarm_changes'),
+    path('beeping_alarms/events/', views.beeping_alarm_events, name='beeping_alarm_events'),
+    path('beeping_alarms/<uuid:uid>/', views.beeping_alarm_detail, name='beeping_alarm_detail'),
     path('tenant-suggestions/', views.tenant_suggestions, name='tenant-suggestions'),
     path('property-suggestions/', views.property_suggestions, name='property_suggestions'),
+    path('suggest/', views.suggest, name='suggest'),
+    path('run-plan/', views.run_plan, name='run_plan'),
+    path('analytics/time-in-status/', views.time_in_status, name='time_in_status'),
 ]
\ No newline at end of file
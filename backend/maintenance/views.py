@@ -1,151 +1,101 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import BeepingAlarm, Tenant
-from .serializers import BeepingAlarmSerializer
+from .models import ALARM_LIST_VERSION, ArchivedBeepingAlarm, BeepingAlarm, Tenant
+from .serializers import BeepingAlarmSerializer, BeepingAlarmWriteSerializer
 from rest_framework import status
-from backend.authentication import validate_kinde_token
+from backend.authentication import KindeAuthError, kinde_user, validate_kinde_token
+from common.events import get_event_bus, stream_unavailable
 from common.pagination import CustomPageNumberPagination
-from django.db.models import Q
-from properties.models import Tenant as PropertyTenant, Property
+from common.queue import enqueue
+from common.views import job_accepted
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from django.utils.dateparse import parse_datetime
+from common.cache import etag_matches, get_version, make_etag
+from common.geo import parse_point
+from common.directory import get_user_directory
+from .archive import AlarmHistory
+from .filters import CLOSED_STATUSES, BeepingAlarmFilters, count_alarms
+from .changes import DEFAULT_LIMIT, MAX_LIMIT, CursorExpired, InvalidCursor, changes_page
+from .details import get_alarm_detail, update_alarm
+from .live import ALARM_CHANNEL, AlarmView, alarm_stream
+from .ordering import DEFAULT_ORDERING, order_alarms
+from .analytics import alarm_time_in_status, get_time_in_status
+from .planning import plan_runs
+from . import suggestions
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Most runs the run planner will split the day into
+MAX_RUNS = 50
+
+def alarm_list_queryset(signature, ordering=DEFAULT_ORDERING):
+    """
+    BeepingAlarm queryset for the list endpoint, filtered by a parsed
+    BeepingAlarmFilters signature. Raises ValueError for an unknown ordering.
+    """
+    queryset = BeepingAlarm.objects.select_related('property', 'agency', 'private_owner').prefetch_related('allocation', 'tenant')
+    queryset = BeepingAlarmFilters.apply(queryset, signature)
+    # Only whitelisted, index-backed orderings
+    return order_alarms(queryset, ordering or DEFAULT_ORDERING)
+
+def beeping_alarm_queryset(params):
+    """
+    Filtered and ordered BeepingAlarm queryset for the list endpoint.
+
+    `params` is the request's query params. Raises ValueError for an invalid
+    filter or an unknown ordering.
+    """
+    return alarm_list_queryset(BeepingAlarmFilters.parse(params), params.get('ordering'))
+
 @api_view(['GET', 'POST'])
 @validate_kinde_token
 def beeping_alarms(request):
+    """
+    Alarms for the table, filtered by BeepingAlarmFilters (see maintenance.filters).
+
+    Counts are cached per filter signature and responses carry an ETag; both
+    move on with every change to an alarm or a record shown in one. Filtering
+    for completed or cancelled alarms includes archived ones.
+    """
     if request.method == 'GET':
         # Initialize pagination
         paginator = CustomPageNumberPagination()
-        
-        # Get query parameters
-        search = request.query_params.get('search', '').strip()
-        status_filter = request.query_params.get('status', None)
-        is_customer_contacted_filter = request.query_params.get('is_customer_contacted', None)
-        property_filter = request.query_params.get('property', None)
-        agency_private_filter = request.query_params.get('agency_private', None)
-        ordering = request.query_params.get('ordering', '-created_at')  # Default sort by created_at desc
-        
-        # Get date filter parameters
-        created_at_from = request.query_params.get('created_at_from', None)
-        created_at_to = request.query_params.get('created_at_to', None)
-        
-        # Start with all alarms - Fixed: moved tenant to prefetch_related since it's now ManyToManyField
-        queryset = BeepingAlarm.objects.select_related('property', 'agency', 'private_owner').prefetch_related('allocation', 'tenant')
-        
-        # Exclude completed and cancelled alarms from table load UNLESS specifically searching for them
-        if status_filter not in ['completed', 'cancelled']:
-            queryset = queryset.filter(is_completed=False, is_cancelled=False)
-        
-        # Apply date filters if provided
-        if created_at_from:
-            try:
-                from_datetime = parse_datetime(created_at_from)
-                if from_datetime:
-                    queryset = queryset.filter(created_at__gte=from_datetime)
-                    logger.info(f"Applied created_at_from filter: {from_datetime}")
-                else:
-                    logger.warning(f"Could not parse created_at_from: {created_at_from}")
-            except Exception as e:
-                logger.error(f"Error parsing created_at_from '{created_at_from}': {e}")
-        
-        if created_at_to:
-            try:
-                to_datetime = parse_datetime(created_at_to)
-                if to_datetime:
-                    queryset = queryset.filter(created_at__lte=to_datetime)
-                    logger.info(f"Applied created_at_to filter: {to_datetime}")
-                else:
-                    logger.warning(f"Could not parse created_at_to: {created_at_to}")
-            except Exception as e:
-                logger.error(f"Error parsing created_at_to '{created_at_to}': {e}")
-        
-        # Apply status filter if provided
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        # Apply customer contacted filter if provided
-        if is_customer_contacted_filter is not None:
-            if is_customer_contacted_filter.lower() == 'true':
-                queryset = queryset.filter(is_customer_contacted=True)
-            elif is_customer_contacted_filter.lower() == 'false':
-                queryset = queryset.filter(is_customer_contacted=False)
-        
-        # Apply property filter if provided
-        if property_filter:
-            queryset = queryset.filter(property_id=property_filter)
-        
-        # Apply agency/private filter if provided
-        if agency_private_filter:
-            if agency_private_filter.lower() == 'agency':
-                queryset = queryset.filter(is_agency=True)
-            elif agency_private_filter.lower() == 'private':
-                queryset = queryset.filter(is_private_owner=True)
-        
-        # Apply search filter
-        if search:
-            search_terms = search.split()
-            q_objects = Q()
-            
-            for term in search_terms:
-                term_q = (
-                    Q(notes__icontains=term) |
-                    Q(property__street_number__icontains=term) |
-                    Q(property__street_name__icontains=term) |
-                    Q(property__suburb__icontains=term) |
-                    Q(property__state__icontains=term) |
-                    Q(property__postcode__icontains=term) |
-                    Q(allocation__first_name__icontains=term) |
-                    Q(allocation__last_name__icontains=term) |
-                    Q(allocation__username__icontains=term)
-                )
-                q_objects &= term_q
-            
-            queryset = queryset.filter(q_objects).distinct()
-        
-        # Get allocation filter
-        allocation_id = request.query_params.get('allocation', None)
-        
-        # Apply allocation filter if provided
-        if allocation_id:
-            queryset = queryset.filter(allocation__id=allocation_id)
-        
-        # Get tenant filter - Fixed: updated for ManyToManyField
-        tenant_id = request.query_params.get('tenant', None)
-        if tenant_id:
-            queryset = queryset.filter(tenant__id=tenant_id)
-        
-        # Apply ordering
-        if ordering:
-            # Handle custom ordering for specific fields
-            if ordering == 'allocation':
-                queryset = queryset.order_by('allocation__first_name')
-            elif ordering == '-allocation':
-                queryset = queryset.order_by('-allocation__first_name')
-            elif ordering == 'agency_private':
-                queryset = queryset.order_by('is_agency')
-            elif ordering == '-agency_private':
-                queryset = queryset.order_by('-is_agency')
-            elif ordering == 'customer_contacted':
-                queryset = queryset.order_by('is_customer_contacted')
-            elif ordering == '-customer_contacted':
-                queryset = queryset.order_by('-is_customer_contacted')
-            elif ordering == 'property':
-                queryset = queryset.order_by('property__street_name', 'property__street_number')
-            elif ordering == '-property':
-                queryset = queryset.order_by('-property__street_name', '-property__street_number')
+
+        try:
+            signature = BeepingAlarmFilters.parse(request.query_params)
+            ordering = request.query_params.get('ordering') or DEFAULT_ORDERING
+            if signature.get('status') in CLOSED_STATUSES:
+                # Older closed alarms live in the archive
+                alarms = AlarmHistory(signature, ordering)
             else:
-                # For other fields, use the ordering directly
-                queryset = queryset.order_by(ordering)
-        
-        # Log the final query for debugging
-        logger.info(f"Final queryset count: {queryset.count()}")
-        
+                alarms = alarm_list_queryset(signature, ordering)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One read of the shared version for both the ETag and the cached count
+        version = get_version(ALARM_LIST_VERSION)
+        etag = make_etag('beeping_alarms', version, signature.key, ordering,
+                         paginator.get_page_size(request), request.query_params.get('page'))
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
         # Paginate the results
-        page = paginator.paginate_queryset(queryset, request)
+        if isinstance(alarms, AlarmHistory):
+            count = alarms.count(version)
+        else:
+            count = count_alarms(alarms, signature, version)
+        page = paginator.paginate_queryset(alarms, request, count=count)
         serializer = BeepingAlarmSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        response = paginator.get_paginated_response(serializer.data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
         
     elif request.method == 'POST':
         serializer = BeepingAlarmSerializer(data=request.data)
@@ -154,157 +104,223 @@ def beeping_alarms(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@validate_kinde_token
+def beeping_alarm_changes(request):
+    """
+    Alarms changed and deleted since `since` (a cursor from an earlier call).
+
+    Without `since` the feed starts from the beginning. Keep calling with the
+    returned cursor while `has_more` is true, then poll with it. A 410 means
+    the cursor is too old and the client should start again.
+    """
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= limit <= MAX_LIMIT:
+        return Response({'error': f'limit must be between 1 and {MAX_LIMIT}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        return Response(changes_page(request.query_params.get('since') or None, limit))
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except CursorExpired as e:
+        return Response({'error': str(e), 'reset': True}, status=status.HTTP_410_GONE)
+
+@require_GET
+async def beeping_alarm_events(request):
+    """
+    Server-Sent Events stream of alarm changes for one table view (see maintenance.live).
+
+    Takes the beeping_alarms filter parameters. EventSource can't send headers,
+    so the token may be passed as `token` instead of an Authorization header.
+    Needs an ASGI server: each open stream is a coroutine, not a thread. Answers
+    503 where streams can't work (see common.events.stream_unavailable).
+    """
+    problem = stream_unavailable(request)
+    if problem:
+        logger.warning(problem)
+        return JsonResponse({'error': problem}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    token = request.GET.get('token') or (auth_header.split(' ')[1] if auth_header.startswith('Bearer ') else None)
+    if not token:
+        return JsonResponse({'error': 'No token provided'}, status=status.HTTP_401_UNAUTHORIZED)
+    try:
+        await sync_to_async(kinde_user)(token)
+    except KindeAuthError as e:
+        return JsonResponse({'error': str(e)}, status=e.status_code)
+
+    try:
+        view = AlarmView(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(alarm_stream(view, get_event_bus().subscribe(ALARM_CHANNEL)),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_view(['GET', 'PATCH', 'DELETE'])
+@validate_kinde_token
+def beeping_alarm_detail(request, uid):
+    """
+    One alarm by uid. Reads come from the per-alarm cache (see maintenance.details)
+    and fall back to the archive; PATCH writes only the fields that changed.
+    """
+    if request.method == 'GET':
+        data = get_alarm_detail(uid)
+        if data is None:
+            return Response({'error': 'Alarm not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
+    alarm = BeepingAlarm.objects.filter(uid=uid).first()
+    if alarm is None:
+        if ArchivedBeepingAlarm.objects.filter(uid=uid).exists():
+            return Response({'error': 'Archived alarms are read only'}, status=status.HTTP_409_CONFLICT)
+        return Response({'error': 'Alarm not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'DELETE':
+        alarm.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    serializer = BeepingAlarmWriteSerializer(alarm, data=request.data, partial=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        changed = update_alarm(alarm, dict(serializer.validated_data))
+    except DjangoValidationError as e:
+        return Response(e.message_dict, status=status.HTTP_400_BAD_REQUEST)
+    if changed:
+        logger.info(f"Updated alarm {uid}: {', '.join(changed)}")
+    # The commit moved the list version on; this reads back and caches the new entry
+    return Response(get_alarm_detail(uid))
+
 @api_view(['GET'])
 @validate_kinde_token
 def tenant_suggestions(request):
-    print(f"=== TENANT SUGGESTIONS DEBUG ===")
-    print(f"Query params: {request.query_params}")
-    
+    """
+    Typeahead for tenants on active alarms, matched on name tokens and phone digits.
+
+    Answered from the in-process suggestion index (see maintenance.suggestions).
+    """
     search = request.query_params.get('q', '').strip()
-    print(f"Search query: '{search}'")
-    
-    # Get tenants that are actually used in active BeepingAlarms (exclude completed and cancelled)
-    # Fixed: changed tenant_id to tenant for ManyToManyField
-    used_tenant_ids = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).values_list('tenant', flat=True).distinct()
-    
-    # If no search query, return all used tenants (limited)
-    if len(search) == 0:
-        print("No search query, returning all used tenants")
-        tenants = PropertyTenant.objects.filter(id__in=used_tenant_ids).order_by('first_name')[:20]
-        tenants = list(tenants)
-        
-        print(f"Returning {len(tenants)} all tenants")
-        for tenant in tenants[:5]:  # Show first 5 in debug
-            print(f"All tenant: ID={tenant.id}, name='{tenant.first_name} {tenant.last_name}', phone='{tenant.phone}'")
-        
-        results = [
-            {
-                'value': str(tenant.id),
-                'label': f"{tenant.first_name} {tenant.last_name} - {tenant.phone}"
-            }
-            for tenant in tenants
-        ]
-        
-        print(f"Returning {len(results)} results for empty search")
-        print(f"=== END DEBUG ===")
-        return Response(results)
-    
-    # If search is too short but not empty, still return empty to avoid too many results while typing
-    if len(search) < 2:
-        print("Search query too short (but not empty), returning empty list")
-        return Response([])
-    
-    # For phone number search, remove spaces and common formatting characters
-    search_clean_phone = ''.join(char for char in search if char.isdigit())
-    print(f"Cleaned phone search: '{search_clean_phone}'")
-    
-    # Build the search query
-    query_filter = (
-        Q(first_name__icontains=search) |
-        Q(last_name__icontains=search) |
-        Q(phone__icontains=search)  # Original phone search with spaces
-    )
-    
-    # If the search looks like a phone number (contains digits), add flexible phone matching
-    if search_clean_phone and len(search_clean_phone) >= 3:
-        print(f"Added flexible phone search for: '{search_clean_phone}'")
-    
-    print(f"Search filter applied")
-    
-    # Search in tenants that are used by BeepingAlarms
-    tenants = PropertyTenant.objects.filter(id__in=used_tenant_ids).filter(query_filter)[:10]
-    
-    # If no results with standard search and it looks like a phone number, try manual matching
-    if not tenants.exists() and search_clean_phone and len(search_clean_phone) >= 3:
-        print("No results with standard search, trying custom phone matching...")
-        
-        # Get all used tenants and filter manually
-        all_used_tenants = PropertyTenant.objects.filter(id__in=used_tenant_ids)
-        matching_tenants = []
-        
-        for tenant in all_used_tenants:
-            # Clean the tenant's phone number
-            tenant_clean_phone = ''.join(char for char in (tenant.phone or '') if char.isdigit())
-            
-            # Check if search phone is contained in tenant phone or vice versa
-            if (search_clean_phone in tenant_clean_phone or 
-                tenant_clean_phone in search_clean_phone):
-                matching_tenants.append(tenant)
-                print(f"Manual match: tenant phone '{tenant.phone}' -> '{tenant_clean_phone}' matches search '{search_clean_phone}'")
-                
-                if len(matching_tenants) >= 10:  # Limit results
-                    break
-        
-        tenants = matching_tenants
-    else:
-        tenants = list(tenants)
-    
-    print(f"Found {len(tenants)} tenants matching query")
-    
-    # Show matching tenants for debugging
-    for tenant in tenants:
-        tenant_clean_phone = ''.join(char for char in (tenant.phone or '') if char.isdigit())
-        print(f"Matching tenant: ID={tenant.id}, name='{tenant.first_name} {tenant.last_name}', phone='{tenant.phone}' (clean: '{tenant_clean_phone}')")
-    
-    # Format results
-    results = [
-        {
-            'value': str(tenant.id),
-            'label': f"{tenant.first_name} {tenant.last_name} - {tenant.phone}"
-        }
-        for tenant in tenants
-    ]
-    
-    print(f"Returning {len(results)} results: {results}")
-    print(f"=== END DEBUG ===")
-    return Response(results)
+    return Response(suggestions.tenant_suggestions(search))
 
 @api_view(['GET'])
 @validate_kinde_token
 def property_suggestions(request):
+    """
+    Typeahead for properties on active alarms, matched on address tokens.
+
+    Answered from the in-process suggestion index (see maintenance.suggestions).
+    """
     search = request.query_params.get('q', '').strip()
-    
-    # Get properties that are actually used in active BeepingAlarms (exclude completed and cancelled)
-    used_property_ids = BeepingAlarm.objects.filter(is_completed=False, is_cancelled=False).values_list('property_id', flat=True).distinct()
-    
-    # If no search query, return all used properties (limited)
-    if len(search) == 0:
-        properties = Property.objects.filter(id__in=used_property_ids).order_by('street_name', 'street_number')[:20]
-        
-        results = [
-            {
-                'value': str(prop.id),
-                'label': f"{prop.unit_number + '/' if prop.unit_number else ''}{prop.street_number} {prop.street_name}, {prop.suburb} {prop.state} {prop.postcode}"
-            }
-            for prop in properties
-        ]
-        
-        return Response(results)
-    
-    # If search is too short but not empty, return empty to avoid too many results while typing
-    if len(search) < 2:
-        return Response([])
-    
-    # Build the search query for property address components
-    query_filter = (
-        Q(street_number__icontains=search) |
-        Q(street_name__icontains=search) |
-        Q(suburb__icontains=search) |
-        Q(state__icontains=search) |
-        Q(postcode__icontains=search) |
-        Q(unit_number__icontains=search)
-    )
-    
-    # Search in properties that are used by BeepingAlarms
-    properties = Property.objects.filter(id__in=used_property_ids).filter(query_filter).order_by('street_name', 'street_number')[:10]
-    
-    # Format results
-    results = [
-        {
-            'value': str(prop.id),
-            'label': f"{prop.unit_number + '/' if prop.unit_number else ''}{prop.street_number} {prop.street_name}, {prop.suburb} {prop.state} {prop.postcode}"
-        }
-        for prop in properties
-    ]
-    
+    return Response(suggestions.property_suggestions(search))
+
+@api_view(['GET'])
+@validate_kinde_token
+def suggest(request):
+    """
+    Combined typeahead for the filter bar: one query, several entity kinds.
+
+    `kinds` is a comma separated subset of tenant, property and user (default: all).
+    Results are grouped by kind and use the same labels and limits as the
+    per-kind endpoints.
+    """
+    search = request.query_params.get('q', '').strip()
+    kinds = request.query_params.get('kinds', None)
+    kinds = [k.strip() for k in kinds.split(',') if k.strip()] if kinds else list(suggestions.SUGGESTERS)
+
+    unknown = [kind for kind in kinds if kind not in suggestions.SUGGESTERS]
+    if unknown:
+        return Response({'error': f"Unknown kinds: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(suggestions.suggest(search, kinds))
+
+@api_view(['GET'])
+@validate_kinde_token
+def run_plan(request):
+    """
+    Group open 'to_be_scheduled' alarms into balanced technician runs by location.
+
+    `runs` sets the number of runs, or pass `technicians=<user id>,...` to get
+    one run per technician. `start=lat,lng` makes every run begin near a depot.
+    """
+    technician_ids = request.query_params.get('technicians', None)
+    technicians = None
+    try:
+        if technician_ids:
+            ids = [int(t) for t in technician_ids.split(',') if t.strip()]
+            _, users = get_user_directory()
+            users_by_id = {user['id']: user for user in users}
+            missing = [user_id for user_id in ids if user_id not in users_by_id]
+            if missing:
+                return Response({'error': f'Unknown technicians: {missing}'}, status=status.HTTP_400_BAD_REQUEST)
+            technicians = [users_by_id[user_id] for user_id in ids]
+            runs = len(technicians)
+        else:
+            runs = int(request.query_params.get('runs', 1))
+        start = request.query_params.get('start', None)
+        start = parse_point(start) if start else None
+        seed = int(request.query_params.get('seed', 0))
+    except ValueError:
+        return Response({'error': 'Invalid runs, technicians, start or seed'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not 1 <= runs <= MAX_RUNS:
+        return Response({'error': f'runs must be between 1 and {MAX_RUNS}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(plan_runs(runs, technicians=technicians, start=start, seed=seed))
+
+@api_view(['GET'])
+@validate_kinde_token
+def time_in_status(request):
+    """
+    Time-in-status analytics (p50/p90 seconds by status, agency and technician).
+
+    Pass `alarm=<id>` to get the individual status spans of one alarm instead,
+    or `refresh=true` to rebuild the cached report in the background (202 and
+    the job to poll).
+    """
+    alarm_id = request.query_params.get('alarm', None)
+    statuses = request.query_params.get('statuses', None)
+    statuses = [s.strip() for s in statuses.split(',') if s.strip()] if statuses else None
+
+    valid_statuses = {choice[0] for choice in BeepingAlarm.STATUS_CHOICES}
+    if statuses and not set(statuses) <= valid_statuses:
+        return Response({'error': 'Invalid status in statuses'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if alarm_id:
+        if not alarm_id.isdigit():
+            return Response({'error': 'Invalid alarm id'}, status=status.HTTP_400_BAD_REQUEST)
+        # Archived alarms keep their history too
+        if not (BeepingAlarm.objects.filter(id=alarm_id).exists()
+                or ArchivedBeepingAlarm.objects.filter(id=alarm_id).exists()):
+            return Response({'error': 'Alarm not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'alarm': int(alarm_id), 'spans': alarm_time_in_status(alarm_id, statuses)})
+
+    dates = {}
+    for name in ('entered_from', 'entered_to'):
+        value = request.query_params.get(name)
+        try:
+            dates[name] = parse_datetime(value) if value else None
+        except ValueError:
+            dates[name] = None
+        if value and dates[name] is None:
+            return Response({'error': f'Invalid {name}'}, status=status.HTTP_400_BAD_REQUEST)
+    entered_from, entered_to = dates['entered_from'], dates['entered_to']
+    include_open = request.query_params.get('include_open', 'false').lower() == 'true'
+
+    if request.query_params.get('refresh', 'false').lower() == 'true':
+        # Rebuilding takes a while on a big table: do it in a worker
+        payload = {'statuses': sorted(statuses) if statuses else None, 'include_open': include_open,
+                   'entered_from': entered_from.isoformat() if entered_from else None,
+                   'entered_to': entered_to.isoformat() if entered_to else None}
+        job = enqueue('maintenance.time_in_status', payload, user=request.user,
+                      unique_key=json.dumps(payload, sort_keys=True))
+        return job_accepted(request, job)
+
+    results = get_time_in_status(statuses, entered_from, entered_to, include_open)
     return Response(results)
@@ -1,35 +1,41 @@
 from django.contrib import admin
+from common.admin import LargeTableAdmin
 from .models import Tenant, Agency, PropertyManager, PrivateOwner, Property
 
+# Prefix ('^') searches: the big tables have matching indexes (see the models' Meta)
+
 @admin.register(Tenant)
-class TenantAdmin(admin.ModelAdmin):
+class TenantAdmin(LargeTableAdmin):
     list_display = ('first_name', 'last_name', 'email', 'phone', 'notes')
-    search_fields = ('first_name', 'last_name', 'email', 'phone', 'notes')
+    search_fields = ('^first_name', '^last_name', '^email', '^phone')
 
 @admin.register(Agency)
 class AgencyAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'suburb', 'state')
-    list_filter = ('state', 'suburb')
-    search_fields = ('name', 'email', 'phone')
+    list_filter = ('state',)
+    search_fields = ('^name', '^email', '^phone')
 
 @admin.register(PropertyManager)
 class PropertyManagerAdmin(admin.ModelAdmin):
     list_display = ('first_name', 'last_name', 'email', 'phone', 'agency')
-    search_fields = ('first_name', 'last_name', 'email', 'phone', 'agency__name')
+    list_select_related = ('agency',)
+    autocomplete_fields = ('agency',)
+    search_fields = ('^first_name', '^last_name', '^email', '^phone')
 
 @admin.register(PrivateOwner)
-class PrivateOwnerAdmin(admin.ModelAdmin):
+class PrivateOwnerAdmin(LargeTableAdmin):
     list_display = ('first_name', 'last_name', 'email', 'phone', 'notes')
-    search_fields = ('first_name', 'last_name', 'email', 'phone', 'notes')
+    search_fields = ('^first_name', '^last_name', '^email', '^phone')
 
 @admin.register(Property)
-class PropertyAdmin(admin.ModelAdmin):
+class PropertyAdmin(LargeTableAdmin):
     list_display = ('street_address', 'suburb', 'state', 'agency', 'private_owner', 'unit_number', 'street_number', 'street_name')
-    list_filter = ('state', 'suburb', 'agency', 'private_owner')
-    search_fields = ('street_name', 'suburb', 'agency__name', 'private_owner__first_name', 'private_owner__last_name', 'unit_number', 'street_number', 'street_name')
+    list_select_related = ('agency', 'private_owner')
+    autocomplete_fields = ('agency', 'private_owner')
+    # "12 Smith" matches 12 Smith St: each word has to prefix one of these
+    search_fields = ('^street_number', '^street_name', '^suburb')
 
     def street_address(self, obj):
         unit = f"{obj.unit_number}/" if obj.unit_number else ""
         return f"{unit}{obj.street_number} {obj.street_name}"
     street_address.short_description = 'Address'
-
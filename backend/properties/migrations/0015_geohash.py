@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:37
+
+from django.db import migrations, models
+
+from common.geo import encode_geohash
+
+
+def populate_geohash(apps, schema_editor):
+    for model_name in ('Agency', 'Property'):
+        model = apps.get_model('properties', model_name)
+        rows = model.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude')
+        batch = []
+        for row in rows.iterator(chunk_size=2000):
+            row.geohash = encode_geohash(row.latitude, row.longitude)
+            batch.append(row)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['geohash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_alter_property_agency_alter_property_private_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agency',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from common.uid_migration import convert_uid_to_uuid
+
+
+class Migration(migrations.Migration):
+    # The conversion commits batch by batch and builds indexes concurrently
+    atomic = False
+
+    dependencies = [
+        ('properties', '0015_geohash'),
+    ]
+
+    operations = [
+        convert_uid_to_uuid('properties', 'tenant'),
+        convert_uid_to_uuid('properties', 'agency'),
+        convert_uid_to_uuid('properties', 'propertymanager'),
+        convert_uid_to_uuid('properties', 'privateowner'),
+        convert_uid_to_uuid('properties', 'property'),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:30
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently so writes to the tables aren't blocked
+    atomic = False
+
+    dependencies = [
+        ('properties', '0016_uid_uuid'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('street_name'), name='text_pattern_ops'), name='property_street_name_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('street_number'), name='text_pattern_ops'), name='property_street_number_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('suburb'), name='text_pattern_ops'), name='property_suburb_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='tenant',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='text_pattern_ops'), name='tenant_first_name_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='tenant',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='text_pattern_ops'), name='tenant_last_name_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='tenant',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='tenant_email_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='tenant',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('phone'), name='text_pattern_ops'), name='tenant_phone_prefix'),
+        ),
+    ]
@@ -1,20 +1,37 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from common.geo import encode_geohash
+from common.indexes import prefix_search_index
 import uuid
 
+
+def geohash_for(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(latitude, longitude)
+
 class Tenant(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100, null=True, blank=True)
     email = models.EmailField(max_length=100, null=True, blank=True)
     phone = models.CharField(max_length=100)
     notes = models.TextField(max_length=1000, null=True, blank=True)
 
+    class Meta:
+        # Admin search (see TenantAdmin.search_fields)
+        indexes = [
+            prefix_search_index('first_name', 'tenant_first_name_prefix'),
+            prefix_search_index('last_name', 'tenant_last_name_prefix'),
+            prefix_search_index('email', 'tenant_email_prefix'),
+            prefix_search_index('phone', 'tenant_phone_prefix'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
 class Agency(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     email = models.EmailField(max_length=100)
     phone = models.CharField(max_length=100)
@@ -27,12 +44,20 @@ class Agency(models.Model):
     country = models.CharField(max_length=100, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False, db_index=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
 class PropertyManager(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     agency = models.ForeignKey(Agency, on_delete=models.CASCADE, null=False, blank=False)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100, null=True, blank=True)
@@ -44,7 +69,7 @@ class PropertyManager(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 class PrivateOwner(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100, null=True, blank=True)
     email = models.EmailField(max_length=100, null=True, blank=True)
@@ -57,7 +82,7 @@ class PrivateOwner(models.Model):
         return self.first_name
 
 class Property(models.Model):
-    uid = models.CharField(max_length=100, unique=True, default=uuid.uuid4, editable=False)
+    uid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
     agency = models.ForeignKey(Agency, on_delete=models.CASCADE, null=True, blank=True)
     private_owner = models.ForeignKey(PrivateOwner, on_delete=models.CASCADE, null=True, blank=True)
     unit_number = models.CharField(max_length=100, null=True, blank=True)
@@ -69,6 +94,19 @@ class Property(models.Model):
     country = models.CharField(max_length=100)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        # Admin search (see PropertyAdmin.search_fields)
+        indexes = [
+            prefix_search_index('street_name', 'property_street_name_prefix'),
+            prefix_search_index('street_number', 'property_street_number_prefix'),
+            prefix_search_index('suburb', 'property_suburb_prefix'),
+        ]
+
+    def __str__(self):
+        unit = f"{self.unit_number}/" if self.unit_number else ""
+        return f"{unit}{self.street_number} {self.street_name}, {self.suburb}"
 
     def clean(self):
         if not self.agency and not self.private_owner:
@@ -81,4 +119,10 @@ class Property(models.Model):
             self.full_clean()
             super().save(*args, **kwargs)
 
-
+    def save(self, *args, **kwargs):
+        # Keeps the geohash used by properties.spatial in step with the coordinates
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
@@ -0,0 +1,25 @@
+from rest_framework import serializers
+from .models import Agency, PrivateOwner, Property, Tenant
+
+class AgencySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Agency
+        fields = ['id', 'uid', 'name', 'email', 'phone']
+
+class PrivateOwnerSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PrivateOwner
+        fields = ['id', 'uid', 'first_name', 'last_name', 'email', 'phone']
+
+class PropertyDetailSerializer(serializers.ModelSerializer):
+    agency = AgencySummarySerializer(read_only=True)
+    private_owner = PrivateOwnerSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Property
+        fields = '__all__'
+
+class TenantDetailSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tenant
+        fields = '__all__'
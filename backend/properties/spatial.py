@@ -0,0 +1,49 @@
+"""
+Radius and bounding-box lookups for models with latitude/longitude/geohash
+columns (Property, Agency).
+"""
+import math
+
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+from common.geo import EARTH_RADIUS_KM, covering_prefixes, radius_bounds, split_antimeridian
+
+
+def within_bounds(queryset, south, west, north, east):
+    """
+    Filter to rows inside the box: indexed geohash prefixes, then an exact
+    lat/lng range. A box with west > east wraps across the antimeridian.
+    """
+    box_filter = Q()
+    for box in split_antimeridian(south, west, north, east):
+        prefix_filter = Q()
+        for prefix in covering_prefixes(*box):
+            prefix_filter |= Q(geohash__startswith=prefix)
+        box_south, box_west, box_north, box_east = box
+        box_filter |= prefix_filter & Q(latitude__gte=box_south, latitude__lte=box_north,
+                                        longitude__gte=box_west, longitude__lte=box_east)
+    return queryset.filter(box_filter)
+
+
+def distance_km(latitude, longitude):
+    """Haversine distance from a point to each row's latitude/longitude, as a database expression."""
+    lat1, lng1 = math.radians(float(latitude)), math.radians(float(longitude))
+    lat2 = Radians(Cast('latitude', FloatField()))
+    lng2 = Radians(Cast('longitude', FloatField()))
+    a = (Power(Sin((lat2 - Value(lat1)) / 2.0), 2)
+         + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((lng2 - Value(lng1)) / 2.0), 2))
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(Least(Value(1.0), a)))
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Rows within `radius_km`, annotated with `distance_km`; order by it for
+    nearest first.
+
+    Everything runs in the database, so the result also works as a subquery:
+    the bounding box prefilter uses the geohash index, and only its candidates
+    get the exact haversine distance.
+    """
+    candidates = within_bounds(queryset, *radius_bounds(latitude, longitude, radius_km))
+    return candidates.annotate(distance_km=distance_km(latitude, longitude)).filter(distance_km__lte=radius_km)
@@ -1,3 +1,96 @@
 from django.test import TestCase
 
-# Create your tests here.
+from common.geo import haversine_km
+from common.testing import AUTH, QueryBudgetTestCase, destination
+from maintenance.benchmark import stubbed_auth
+from .models import Property, Tenant
+from .spatial import within_bounds, within_radius
+
+
+class QueryBudgetTests(QueryBudgetTestCase):
+    """Exact query counts for the properties endpoints."""
+
+    def test_property_map(self):
+        # South-east Queensland: covers most seeded properties
+        for params in [{'bounds': '-28.3,152.5,-26.3,153.6'}, {'bounds': '-28.3,152.5,-26.3,153.6', 'active': 'false'}]:
+            with self.subTest(**params):
+                for response in self.assertBudget(2, '/api/properties/map/', params):
+                    self.assertTrue(response.json()['results'])
+
+    def test_detail_by_uid(self):
+        prop = Property.objects.order_by('id').first()
+        tenant = Tenant.objects.order_by('id').first()
+        for path, uid in [('/api/properties/', prop.uid), ('/api/properties/tenants/', tenant.uid)]:
+            with self.subTest(path=path), self.assertNumQueries(2):
+                response = self.client.get(f'{path}{uid}/', **AUTH)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['uid'], str(uid))
+
+        response = self.client.get('/api/properties/00000000-0000-4000-8000-000000000000/', **AUTH)
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/api/properties/not-a-uuid/', **AUTH)
+        self.assertEqual(response.status_code, 404)
+
+
+class SpatialTests(TestCase):
+    # (centre, radius_km): a city, the antimeridian (Fiji), near the south pole
+    CASES = [((-27.4698, 153.0251), 2), ((-17.7134, 179.9990), 3), ((-89.9900, 45.0), 5)]
+
+    @classmethod
+    def setUpTestData(cls):
+        points = []
+        for (latitude, longitude), radius in cls.CASES:
+            for bearing in range(0, 360, 15):
+                # Just inside and just outside the circle, and further in
+                for km in (radius - 0.01, radius + 0.01, radius / 2):
+                    points.append(destination(latitude, longitude, bearing, km))
+        # Saved one by one: save() sets the geohash
+        cls.properties = [
+            Property.objects.create(street_number=str(number), street_name='Test', suburb='Test', state='QLD',
+                                    postcode='4000', country='Australia', latitude=round(latitude, 6),
+                                    longitude=round(longitude, 6))
+            for number, (latitude, longitude) in enumerate(points)
+        ]
+
+    def expected(self, latitude, longitude, radius):
+        return {prop.id for prop in self.properties
+                if haversine_km(latitude, longitude, prop.latitude, prop.longitude) <= radius}
+
+    def test_radius_matches_exact_distances(self):
+        for (latitude, longitude), radius in self.CASES:
+            with self.subTest(latitude=latitude, longitude=longitude):
+                found = within_radius(Property.objects.all(), latitude, longitude, radius)
+                expected = self.expected(latitude, longitude, radius)
+                self.assertEqual({prop.id for prop in found}, expected)
+                self.assertEqual(len(expected), 2 * 24)
+                for prop in found:
+                    self.assertAlmostEqual(prop.distance_km, haversine_km(latitude, longitude, prop.latitude,
+                                                                          prop.longitude), places=6)
+
+    def test_antimeridian(self):
+        found = within_radius(Property.objects.all(), -17.7134, 179.9990, 3)
+        self.assertTrue(any(prop.longitude < 0 for prop in found))
+        self.assertTrue(any(prop.longitude > 0 for prop in found))
+        # A box given with west > east wraps around too
+        boxed = within_bounds(Property.objects.all(), -17.8, 179.99, -17.6, -179.99)
+        self.assertEqual({prop.longitude > 0 for prop in boxed}, {True, False})
+
+    def test_map_bounds(self):
+        self.enterContext(stubbed_auth())
+        response = self.client.get('/api/properties/map/', {'bounds': '-17.8,179.99,-17.6,-179.99', 'active': 'false'},
+                                   **AUTH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['id'] for row in response.json()['results']},
+                         set(within_bounds(Property.objects.all(), -17.8, 179.99, -17.6, -179.99)
+                             .values_list('id', flat=True)))
+        self.assertEqual({float(row['longitude']) > 0 for row in response.json()['results']}, {True, False})
+        for bounds in ['-17.6,179.99,-17.8,-179.99', '-91,0,0,10', '0,0,10,181', 'nan,0,10,10', '0,0,10']:
+            with self.subTest(bounds):
+                response = self.client.get('/api/properties/map/', {'bounds': bounds, 'active': 'false'}, **AUTH)
+                self.assertEqual(response.status_code, 400)
+
+    def test_pole(self):
+        found = within_radius(Property.objects.all(), -89.99, 45.0, 5)
+        # Past the pole, on the other side of the globe
+        self.assertTrue(any(abs(float(prop.longitude) - 45) > 90 for prop in found))
+
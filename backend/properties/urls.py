@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('map/', views.property_map, name='property_map'),
+    path('<uuid:uid>/', views.property_detail, name='property_detail'),
+    path('tenants/<uuid:uid>/', views.tenant_detail, name='tenant_detail'),
+]
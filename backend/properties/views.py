@@ -1,3 +1,64 @@
-from django.shortcuts import render
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+from django.db.models import Count, Q
+from backend.authentication import validate_kinde_token
+from common.geo import parse_bounds
+from .models import Property, Tenant
+from .serializers import PropertyDetailSerializer, TenantDetailSerializer
+from .spatial import within_bounds
 
-# Create your views here.
+# Most points a single map request returns; zoom in to see the rest
+MAP_POINT_LIMIT = 2000
+
+@api_view(['GET'])
+@validate_kinde_token
+def property_map(request):
+    """
+    Properties inside the visible map area.
+
+    `bounds=south,west,north,east` is required. By default only properties with
+    active alarms are returned; pass `active=false` to include every property.
+    """
+    bounds = request.query_params.get('bounds', None)
+    if not bounds:
+        return Response({'error': 'bounds is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        south, west, north, east = parse_bounds(bounds)
+    except ValueError:
+        return Response({'error': 'bounds must be south,west,north,east'}, status=status.HTTP_400_BAD_REQUEST)
+
+    active_filter = Q(beepingalarm__is_completed=False, beepingalarm__is_cancelled=False)
+    queryset = within_bounds(Property.objects.all(), south, west, north, east).annotate(
+        active_alarms=Count('beepingalarm', filter=active_filter)
+    )
+    if request.query_params.get('active', 'true').lower() != 'false':
+        queryset = queryset.filter(active_alarms__gt=0)
+
+    rows = list(queryset.order_by('geohash').values(
+        'id', 'latitude', 'longitude', 'unit_number', 'street_number', 'street_name',
+        'suburb', 'state', 'postcode', 'active_alarms',
+    )[:MAP_POINT_LIMIT + 1])
+
+    return Response({
+        'truncated': len(rows) > MAP_POINT_LIMIT,
+        'results': rows[:MAP_POINT_LIMIT],
+    })
+
+@api_view(['GET'])
+@validate_kinde_token
+def property_detail(request, uid):
+    """A property by uid, with its agency or private owner."""
+    prop = Property.objects.select_related('agency', 'private_owner').filter(uid=uid).first()
+    if prop is None:
+        return Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(PropertyDetailSerializer(prop).data)
+
+@api_view(['GET'])
+@validate_kinde_token
+def tenant_detail(request, uid):
+    """A tenant by uid."""
+    tenant = Tenant.objects.filter(uid=uid).first()
+    if tenant is None:
+        return Response({'error': 'Tenant not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(TenantDetailSerializer(tenant).data)